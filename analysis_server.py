@@ -0,0 +1,388 @@
+# analysis_server.py
+"""
+コード・遷移・進行・メロディの解析を JSON Lines（1行に1リクエスト / 1レスポンス）で提供する asyncio サーバー（標準ライブラリのみ）。
+同時に届いたリクエストを短い待ち時間（--batch-delay）の間まとめてバッチにし、エグゼキュータで解析するので
+イベントループは解析でブロックしない。キューはすべて上限付きで、あふれそうなときは読み込みを止めて送信側を待たせる。
+
+実行例:
+    python analysis_server.py --port 8765 --workers 4
+    python analysis_server.py --unix /tmp/chord.sock --batch-delay 1
+
+リクエスト（"id" は任意の値で、レスポンスにそのまま返る。"key" の既定は "C"、"threshold" の既定は 40）:
+    {"id": 1, "op": "chord", "notes": "C3, E3, G3, B3", "k": 3}
+    {"id": 2, "op": "transition", "from": "D3, F3, A3, C4", "to": "G2, B2, D3, F3", "key": "C"}
+    {"id": 3, "op": "progression", "voicings": ["C3, E3, G3", "A2, C3, E3"], "key": "C"}   # "track_key": true で転調を追跡、"decode": true で進行全体の最適な解釈
+    {"id": 4, "op": "melody", "melody": "F5", "chord": "C3, E3, G3"}
+    {"id": 5, "op": "stats"}
+音は parse_notes の形式の文字列、または ["C3", "E3", "G3"] のような音名のリスト。
+レスポンスは {"id": ..., "ok": true, "result": {...}} か {"id": ..., "ok": false, "error": "..."}。
+"key" は文字列、"threshold" は整数でなければならない。解析中のエラーはそのリクエストだけの ok: false になる。
+1つの接続のレスポンスはリクエストの順に返る。
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from engine.analyzer_metrics import DURATION_BUCKETS, Histogram
+from models.note import Note, parse_notes
+
+# ワーカー（スレッドまたはプロセス）ごとの解析器（initializer で1度だけ作る）
+_ANALYZERS: Optional[dict] = None
+
+# バッチの大きさのヒストグラムのバケット
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _init_worker():
+    global _ANALYZERS
+    from engine.melody_analyzer import MelodyAnalyzer
+    from engine.progression_analyzer import ProgressionAnalyzer
+    progression = ProgressionAnalyzer()
+    _ANALYZERS = {
+        "chord": progression.chord_analyzer,
+        "transition": progression.transition_analyzer,
+        "progression": progression,
+        "melody": MelodyAnalyzer(),
+    }
+
+
+def _notes(value) -> List[Note]:
+    """"C3, E3, G3" 形式の文字列、または音名のリストを Note のリストにする"""
+    if isinstance(value, str):
+        notes = parse_notes(value)
+    elif isinstance(value, list) and all(isinstance(v, str) for v in value):
+        notes = [Note.from_string(v) for v in value]
+    else:
+        raise ValueError("notes must be a string like 'C3, E3, G3' or a list of note names")
+    if not notes:
+        raise ValueError("empty voicing")
+    return notes
+
+
+def _best_chord(notes: List[Note], key: str, threshold: int):
+    chord = _ANALYZERS["chord"].get_best_interpretation(notes, key=key, threshold=threshold, fast=True)
+    if chord is None:
+        raise ValueError(f"no chord found for [{', '.join(str(n) for n in notes)}]")
+    return chord
+
+
+def _op_chord(request: dict, key: str, threshold: int) -> dict:
+    notes = _notes(request["notes"])
+    k = int(request.get("k", 3))
+    candidates = _ANALYZERS["chord"].get_top_interpretations(notes, k=k, key=key, threshold=threshold, fast=True)
+    result = {"candidates": [c.to_dict() for c in candidates]}
+    if request.get("text"):
+        result["text"] = _ANALYZERS["chord"].analyze(notes, key=key, threshold=threshold).text
+    return result
+
+
+def _op_transition(request: dict, key: str, threshold: int) -> dict:
+    chord_a = _best_chord(_notes(request["from"]), key, threshold)
+    chord_b = _best_chord(_notes(request["to"]), key, threshold)
+    transition = _ANALYZERS["transition"].evaluate_transition(
+        chord_a.root_pc, chord_a.quality, chord_a.notes, chord_b.root_pc, chord_b.quality, chord_b.notes, key_name=key)
+    return {"from": chord_a.to_dict(), "to": chord_b.to_dict(), "transition": transition.to_dict()}
+
+
+def _op_progression(request: dict, key: str, threshold: int) -> dict:
+    voicings = request["voicings"]
+    if not isinstance(voicings, list):
+        raise ValueError("voicings must be a list")
+    key_tracker = None
+    if request.get("track_key"):
+        from engine.key_tracker import KeyTracker
+        key_tracker = KeyTracker(window=int(request.get("window", 8)), initial_key=key)
+    progression = _ANALYZERS["progression"]
+    analyze = progression.decode_progression if request.get("decode") else progression.iter_progression
+    records = []
+    for record in analyze([_notes(v) for v in voicings], key=key, threshold=threshold, key_tracker=key_tracker):
+        if record["type"] == "chord":
+            chord = record["chord"]
+            records.append({"type": "chord", "index": record["index"], "key": record["key"],
+                            "chord": chord.to_dict() if chord else None})
+        else:
+            records.append({"type": "transition", "index": record["index"], "transition": record["transition"].to_dict()})
+    return {"records": records}
+
+
+def _op_melody(request: dict, key: str, threshold: int) -> dict:
+    melody = request["melody"]
+    if not isinstance(melody, str):
+        raise ValueError("melody must be a note name like 'F5'")
+    chord = _best_chord(_notes(request["chord"]), key, threshold)
+    result = _ANALYZERS["melody"].analyze_melody(Note.from_string(melody), chord.root_pc, chord.quality, chord.notes)
+    return {"chord": chord.to_dict(), "melody": result.to_dict()}
+
+
+OPS = {
+    "chord": _op_chord,
+    "transition": _op_transition,
+    "progression": _op_progression,
+    "melody": _op_melody,
+}
+
+
+def handle_request(request: dict) -> Tuple[bool, str]:
+    """1リクエストを解析して (成功したか, レスポンスの JSON 文字列) を返す"""
+    request_id = request.get("id")
+    try:
+        op_name = request.get("op")
+        op = OPS.get(op_name) if isinstance(op_name, str) else None
+        if op is None:
+            raise ValueError(f"unknown op {op_name!r}")
+        key = request.get("key", "C")
+        if not isinstance(key, str):
+            raise ValueError("key must be a string like 'C' or 'Am'")
+        threshold = request.get("threshold", 40)
+        if isinstance(threshold, bool) or not isinstance(threshold, int):
+            raise ValueError("threshold must be an integer")
+        result = op(request, key, threshold)
+        return True, json.dumps({"id": request_id, "ok": True, "result": result}, ensure_ascii=False)
+    except KeyError as e:
+        error = f"missing field {e}"
+    except (TypeError, ValueError, IndexError) as e:
+        error = str(e) or type(e).__name__
+    except Exception as e:  # 想定外の例外もこのリクエストだけのエラーにし、同じバッチの他のリクエストを巻き込まない
+        error = f"internal error: {e!r}"
+    return False, json.dumps({"id": request_id, "ok": False, "error": error}, ensure_ascii=False)
+
+
+def process_batch(requests: List[dict]) -> List[Tuple[bool, str]]:
+    """ワーカーで1バッチを解析する（レスポンスの JSON 化までワーカー側で済ませ、イベントループの負荷を減らす）"""
+    if _ANALYZERS is None:
+        _init_worker()
+    return [handle_request(request) for request in requests]
+
+
+def _error_line(request_id, message: str) -> str:
+    return json.dumps({"id": request_id, "ok": False, "error": message}, ensure_ascii=False)
+
+
+class AnalysisServer:
+    """
+    接続ごとにリクエストを読み、解析待ちのキュー（全接続で共有・上限 queue_size）へ入れる。
+    バッチャーは空いているエグゼキュータの枠があればキューから最大 batch_size 件を取り出し、
+    batch_delay 秒待っても足りなければそのまま実行する（混んでいるときは待たずに大きなバッチになる）。
+    接続ごとの未返信のリクエストは max_pending 件までで、超えるとその接続の読み込みを止める。
+    """
+
+    def __init__(self, workers: int = 0, batch_size: int = 64, batch_delay: float = 0.002,
+                 queue_size: int = 4096, max_pending: int = 256, max_line: int = 1 << 20):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_pending = max_pending
+        self.max_line = max_line
+        self.queue: Optional[asyncio.Queue] = None
+        self.executor: Optional[Executor] = None
+        self._server = None
+        self._tasks = set()
+        self._queue_size = queue_size
+        # 統計（stats リクエストで返す）
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.connections = 0
+        self.batch_sizes = Histogram(BATCH_BUCKETS)
+        self.latency = Histogram(DURATION_BUCKETS + (0.1, 0.5, 1.0))
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, unix_path: Optional[str] = None):
+        """エグゼキュータとバッチャーを起動して待ち受けを始める（unix_path を指定すると Unix ソケット）"""
+        if self.workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        else:
+            # プロセスを使わない場合も、解析はループとは別の1スレッドで行う（解析器はスレッドセーフではない）
+            self.executor = ThreadPoolExecutor(max_workers=1, initializer=_init_worker)
+        self.queue = asyncio.Queue(self._queue_size)
+        self._slots = asyncio.Semaphore(max(1, self.workers))
+        self._spawn(self._batcher())
+        if unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=unix_path, limit=self.max_line)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port, limit=self.max_line)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in list(self._tasks):
+            task.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    # --- バッチ処理 ---
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+        while True:
+            await self._slots.acquire()
+            batch = [await queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._spawn(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[tuple]):
+        loop = asyncio.get_running_loop()
+        try:
+            responses = await loop.run_in_executor(self.executor, process_batch, [request for request, _f, _t in batch])
+        except Exception as e:  # ワーカープロセスの異常終了など。バッチ全体をエラーとして返す
+            responses = [(False, _error_line(request.get("id"), f"internal error: {e!r}")) for request, _f, _t in batch]
+        finally:
+            self._slots.release()
+        self.batches += 1
+        self.batch_sizes.observe(len(batch))
+        now = loop.time()
+        for (_request, future, enqueued), (ok, line) in zip(batch, responses):
+            if not ok:
+                self.errors += 1
+            self.latency.observe(now - enqueued)
+            if not future.done():
+                future.set_result(line)
+
+    # --- 接続 ---
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        self.connections += 1
+        pending: asyncio.Queue = asyncio.Queue(self.max_pending)
+        writer_task = self._spawn(self._write_responses(pending, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # 1行が max_line を超えた
+                    future = loop.create_future()
+                    future.set_result(_error_line(None, f"request line exceeds {self.max_line} bytes"))
+                    await pending.put(future)
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                line = line.strip()
+                if not line:
+                    continue
+                self.requests += 1
+                future = loop.create_future()
+                await pending.put(future)  # 未返信が max_pending 件あればここで待つ
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                except ValueError as e:
+                    self.errors += 1
+                    future.set_result(_error_line(None, f"invalid JSON: {e}"))
+                    continue
+                op = request.get("op")
+                if op == "stats":
+                    future.set_result(json.dumps({"id": request.get("id"), "ok": True, "result": self.stats()}))
+                elif op not in OPS:
+                    self.errors += 1
+                    future.set_result(_error_line(request.get("id"), f"unknown op {op!r}"))
+                else:
+                    await self.queue.put((request, future, loop.time()))  # 解析待ちが queue_size 件あればここで待つ
+        finally:
+            await pending.put(None)
+            await writer_task
+            self.connections -= 1
+
+    @staticmethod
+    async def _write_responses(pending: asyncio.Queue, writer: asyncio.StreamWriter):
+        """レスポンスをリクエストの順に書く（相手の受信が遅れて送信バッファがたまったら drain で待つ）"""
+        connected = True
+        while True:
+            future = await pending.get()
+            if future is None:
+                break
+            line = await future
+            if not connected:
+                continue
+            try:
+                writer.write(line.encode("utf-8") + b"\n")
+                await writer.drain()
+            except ConnectionError:
+                connected = False  # 相手が切断した。残りの結果は捨てる
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batches,
+            "connections": self.connections,
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "workers": self.workers,
+            "batch_size": self.batch_sizes.to_dict(),
+            "latency_seconds": self.latency.to_dict(),
+        }
+
+
+async def serve(args) -> None:
+    server = AnalysisServer(workers=args.workers, batch_size=args.batch_size, batch_delay=args.batch_delay / 1000,
+                            queue_size=args.queue_size, max_pending=args.max_pending)
+    listener = await server.start(args.host, args.port, args.unix)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    where = args.unix or "{}:{}".format(*listener.sockets[0].getsockname()[:2])
+    print(f"listening on {where} (workers={args.workers}, batch_size={args.batch_size}, "
+          f"batch_delay={args.batch_delay}ms)", file=sys.stderr)
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+        if args.unix:
+            try:
+                os.unlink(args.unix)
+            except OSError:
+                pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="解析を JSON Lines で提供する asyncio サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="TCP の代わりに Unix ソケットで待ち受ける")
+    parser.add_argument("--workers", "-j", type=int, default=0,
+                        help="解析するワーカープロセス数（既定: 0 = サーバー内の1スレッド）")
+    parser.add_argument("--batch-size", type=int, default=64, help="1バッチの最大リクエスト数（既定: 64）")
+    parser.add_argument("--batch-delay", type=float, default=2.0,
+                        help="バッチを集めるために待つ最大時間（ミリ秒。既定: 2）")
+    parser.add_argument("--queue-size", type=int, default=4096, help="全接続で共有する解析待ちの上限（既定: 4096）")
+    parser.add_argument("--max-pending", type=int, default=256, help="1接続あたりの未返信の上限（既定: 256）")
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# analyze_corpus.py
+"""
+進行ファイル（1行に1ボイシング、parse_notes が受け付ける "C3, E3, G3" 形式）をまとめて解析するコマンドラインツール。
+ファイルをチャンクに分けてプロセスプールへ配り、各ワーカーは ProgressionAnalyzer を1度だけ生成して使い回す。
+
+実行例:
+    python analyze_corpus.py corpus/ --jobs 32 --key C --threshold 40 > report.txt
+    python analyze_corpus.py a.txt b.txt --unordered
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from utils.note_text_reader import PackedVoicings, read_packed
+
+# ワーカープロセスごとの解析器と設定（initializer で1度だけ作る）
+_ANALYZER = None  # Optional[ProgressionAnalyzer]
+_KEY = "C"
+_THRESHOLD = 40
+_TRACK_KEY = False
+
+
+def _init_worker(key: str, threshold: int, track_key: bool = False):
+    global _ANALYZER, _KEY, _THRESHOLD, _TRACK_KEY
+    # エンジンは解析するプロセスでだけ読み込む（--help や引数エラー、親プロセスの起動を軽くする）
+    from engine.progression_analyzer import ProgressionAnalyzer
+    _ANALYZER = ProgressionAnalyzer()
+    _KEY = key
+    _THRESHOLD = threshold
+    _TRACK_KEY = track_key
+
+
+def read_voicings(path: str) -> PackedVoicings:
+    """
+    進行ファイル全体のボイシングを、全音を Note.pack() 形式で並べた1本の array('i') と行ごとの開始位置で読む
+    （空行と # で始まるコメント行は飛ばす。解釈できない行は行番号・列番号付きの NoteTextError）
+    """
+    return read_packed(path)
+
+
+def analyze_file(path: str) -> Tuple[str, str, Optional[str]]:
+    """1ファイルを解析して (パス, レポート, エラー) を返す。読めない・解釈できない行があればレポートは空でエラーに理由が入る"""
+    try:
+        # ファイル全体を先に読んで書式の誤りを解析前に見つける。保持は詰めた整数のままにし、Note には1行ずつ解析する直前に戻す
+        voicings = iter(read_voicings(path))
+        key_tracker = None
+        if _TRACK_KEY:
+            from engine.key_tracker import KeyTracker
+            key_tracker = KeyTracker(initial_key=_KEY)
+        records = _ANALYZER.iter_progression(voicings, key=_KEY, threshold=_THRESHOLD, key_tracker=key_tracker)
+        return path, "\n".join(_ANALYZER.format_progression(records)), None
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        return path, "", str(e)
+
+
+def _analyze_chunk(paths: List[str]) -> List[Tuple[str, str, Optional[str]]]:
+    return [analyze_file(path) for path in paths]
+
+
+def collect_files(inputs: Iterable[str], suffix: str) -> List[str]:
+    """引数のファイル・ディレクトリから解析対象のファイルを集める（ディレクトリは再帰的に、名前順）"""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, names in os.walk(item):
+                dirs.sort()
+                files.extend(os.path.join(root, name) for name in sorted(names) if name.endswith(suffix))
+        else:
+            files.append(item)
+    return files
+
+
+def run(files: List[str], jobs: int, key: str = "C", threshold: int = 40,
+        chunksize: Optional[int] = None, ordered: bool = True,
+        track_key: bool = False) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """
+    files を解析し (パス, レポート, エラー) を順次 yield する。
+    ordered=True なら入力順、False ならチャンクが終わった順に返す。jobs=1 のときはプロセスを使わずその場で解析する。
+    """
+    if jobs <= 1:
+        _init_worker(key, threshold, track_key)
+        for path in files:
+            yield analyze_file(path)
+        return
+
+    if chunksize is None:
+        # 各ワーカーに 4 チャンク程度ずつ行き渡る大きさ（プロセス間通信の回数と負荷の偏りの折り合い）
+        chunksize = max(1, min(64, len(files) // (jobs * 4)))
+    chunks = [files[i:i + chunksize] for i in range(0, len(files), chunksize)]
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(key, threshold, track_key)) as executor:
+        if ordered:
+            for results in executor.map(_analyze_chunk, chunks):
+                yield from results
+        else:
+            futures = [executor.submit(_analyze_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                yield from future.result()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="進行ファイルをプロセスプールで一括解析する")
+    parser.add_argument("inputs", nargs="+", help="進行ファイル、またはそれを含むディレクトリ")
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 1, help="ワーカープロセス数（既定: CPU数）")
+    parser.add_argument("--key", default="C", help="解析に使う Key（既定: C）")
+    parser.add_argument("--threshold", type=int, default=40, help="コード判定に採用する最低スコア（既定: 40）")
+    parser.add_argument("--chunksize", type=int, default=None, help="1回にワーカーへ渡すファイル数（既定: 自動）")
+    parser.add_argument("--unordered", action="store_true", help="入力順を保たず、解析が終わった順に出力する")
+    parser.add_argument("--track-key", action="store_true", help="--key を最初の Key として、ファイルごとに転調を追跡する")
+    parser.add_argument("--suffix", default=".txt", help="ディレクトリから拾うファイルの拡張子（既定: .txt）")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.inputs, args.suffix)
+    errors = 0
+    out = sys.stdout
+    for path, report, error in run(files, args.jobs, key=args.key, threshold=args.threshold,
+                                   chunksize=args.chunksize, ordered=not args.unordered,
+                                   track_key=args.track_key):
+        if error is not None:
+            errors += 1
+            report = f"Error: {error}"
+        out.write(f"=== {path} ===\n{report}\n\n")
+    if errors:
+        print(f"{errors} / {len(files)} files failed", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# benchmarks/bench_analyze_many.py
+"""
+ChordAnalyzer.analyze_many（NumPyバッチ版）と get_best_interpretation のループを比較するベンチマーク。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_analyze_many --chords 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from engine.analyzer import ChordAnalyzer
+from benchmarks.corpus import generate_voicings
+
+def to_arrays(voicings, max_voices: int):
+    n = len(voicings)
+    semitones = np.zeros((n, max_voices), dtype=np.int64)
+    steps = np.zeros((n, max_voices), dtype=np.int64)
+    mask = np.zeros((n, max_voices), dtype=bool)
+    for i, notes in enumerate(voicings):
+        for j, note in enumerate(notes):
+            semitones[i, j] = note.absolute_semitone
+            steps[i, j] = note.step_index
+            mask[i, j] = True
+    return semitones, mask, steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chords", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--key", default="C")
+    args = parser.parse_args()
+
+    analyzer = ChordAnalyzer()
+    voicings = generate_voicings(args.chords, seed=args.seed)
+    max_voices = max(len(v) for v in voicings)
+    semitones, mask, steps = to_arrays(voicings, max_voices)
+
+    # ウォームアップ（テーブル構築・import を計測から除く）
+    analyzer.analyze_many(semitones[:10], mask[:10], steps[:10], key=args.key)
+
+    start = time.perf_counter()
+    loop_results = [analyzer.get_best_interpretation(notes, key=args.key) for notes in voicings]
+    loop_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = analyzer.analyze_many(semitones, mask, steps, key=args.key)
+    batch_sec = time.perf_counter() - start
+
+    mismatches = 0
+    for i, best in enumerate(loop_results):
+        expected = (best['root_pc'], best['quality'], best['score']) if best else (-1, None, -1)
+        if expected != (int(batch['root_pc'][i]), batch['quality'][i], int(batch['score'][i])):
+            mismatches += 1
+
+    print(f"chords              : {args.chords} (max voices {max_voices})")
+    print(f"get_best loop       : {args.chords / loop_sec:,.0f} chords/sec ({loop_sec:.3f}s)")
+    print(f"analyze_many (NumPy): {args.chords / batch_sec:,.0f} chords/sec ({batch_sec:.3f}s)")
+    print(f"speedup             : x{loop_sec / batch_sec:.1f}")
+    print(f"delegated to scalar : {int(batch['delegated'].sum())}")
+    print(f"mismatches          : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_musicxml.py
+"""
+MusicXML リーダー（utils.musicxml_reader）の処理時間とピークメモリを、DOM を丸ごと読む ElementTree.parse と比較するベンチマーク。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_musicxml --parts 24 --measures 1500
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from utils.musicxml_reader import iter_sonorities
+
+_STEPS = "CDEFGAB"
+
+
+def write_score(path: str, parts: int, measures: int, seed: int = 0):
+    """
+    4/4 拍子・8分音符主体の score-partwise をファイルへ書き出す（和音・タイ・休符を含む）。
+    2パート以上なら最初のパートを B♭ クラリネット（記譜は D major、<key> の後に <transpose>）にする
+    """
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<score-partwise version="3.1">\n<part-list>\n')
+        for p in range(parts):
+            f.write(f'<score-part id="P{p}"><part-name>Part {p}</part-name></score-part>\n')
+        f.write("</part-list>\n")
+        for p in range(parts):
+            f.write(f'<part id="P{p}">\n')
+            octave = 2 + p * 4 // parts
+            for m in range(1, measures + 1):
+                f.write(f'<measure number="{m}">\n')
+                if m == 1 and p == 0 and parts > 1:
+                    f.write("<attributes><divisions>2</divisions><key><fifths>2</fifths></key>"
+                            "<transpose><diatonic>-1</diatonic><chromatic>-2</chromatic></transpose></attributes>\n")
+                elif m == 1:
+                    f.write("<attributes><divisions>2</divisions><key><fifths>0</fifths></key></attributes>\n")
+                for _ in range(8):
+                    if rng.random() < 0.1:
+                        f.write("<note><rest/><duration>1</duration><type>eighth</type></note>\n")
+                        continue
+                    chord = 1 + (rng.random() < 0.3)
+                    for c in range(chord):
+                        step = rng.choice(_STEPS)
+                        alter = rng.choice([-1, 0, 0, 0, 1])
+                        f.write("<note>" + ("<chord/>" if c else "")
+                                + f"<pitch><step>{step}</step><alter>{alter}</alter><octave>{octave}</octave></pitch>"
+                                + "<duration>1</duration><voice>1</voice><type>eighth</type>"
+                                + "<notations><articulations><staccato/></articulations></notations></note>\n")
+                f.write("</measure>\n")
+            f.write("</part>\n")
+        f.write("</score-partwise>\n")
+
+
+def _measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--parts", type=int, default=24)
+    parser.add_argument("--measures", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".musicxml")
+    os.close(fd)
+    try:
+        write_score(path, args.parts, args.measures, args.seed)
+        size = os.path.getsize(path)
+
+        def read():
+            keys = set()
+            count = 0
+            for sonority in iter_sonorities(path):
+                keys.add(sonority.key)
+                count += 1
+            return count, keys
+
+        (count, keys), t_stream, peak_stream = _measure(read)
+        # 移調楽器の記譜上の調号（D）ではなく、実音の調号（C）になっていること
+        assert keys == {"C"}, f"unexpected keys {sorted(keys)}"
+        _tree, t_dom, peak_dom = _measure(lambda: ET.parse(path))
+
+        print(f"file: {size / 2**20:.1f} MiB, {args.parts} parts x {args.measures} measures, {count} sonorities")
+        print(f"iter_sonorities : {t_stream:6.2f} s, peak {peak_stream / 2**20:7.1f} MiB")
+        print(f"ET.parse (DOM)  : {t_dom:6.2f} s, peak {peak_dom / 2**20:7.1f} MiB  (parse only, for reference)")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_note.py
+"""
+不変タプル版 Note / NoteArray と、従来の dataclass 版 Note の生成時間・参照時間・メモリを比較するベンチマーク。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_note --notes 200000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from models.note import Note, NoteArray
+
+
+@dataclass
+class DataclassNote:
+    """比較用: 変更前の models.note.Note と同じ実装"""
+    step: str
+    alter: int
+    octave: int
+
+    def __post_init__(self):
+        self.step = self.step.upper()
+
+    STEP_TO_SEMITONE = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+    STEP_TO_INDEX = {'C': 0, 'D': 1, 'E': 2, 'F': 3, 'G': 4, 'A': 5, 'B': 6}
+
+    @property
+    def pitch_class(self) -> int:
+        return (self.STEP_TO_SEMITONE[self.step] + self.alter) % 12
+
+    @property
+    def absolute_semitone(self) -> int:
+        base = self.STEP_TO_SEMITONE[self.step]
+        return base + self.alter + (self.octave * 12)
+
+    @property
+    def step_index(self) -> int:
+        return self.STEP_TO_INDEX[self.step]
+
+
+def _time(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _memory(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    specs = [(rng.choice("CDEFGAB"), rng.choice([-1, 0, 0, 1]), rng.randint(2, 6)) for _ in range(args.notes)]
+    n = len(specs)
+
+    def access(notes):
+        def run():
+            total = 0
+            for note in notes:
+                total += note.pitch_class + note.absolute_semitone + note.step_index
+            return total
+        return run
+
+    legacy = [DataclassNote(*spec) for spec in specs]
+    compact = [Note(*spec) for spec in specs]
+
+    rows = [
+        ("construct dataclass Note", _time(lambda: [DataclassNote(*spec) for spec in specs])),
+        ("construct tuple Note", _time(lambda: [Note(*spec) for spec in specs])),
+        ("construct NoteArray", _time(lambda: NoteArray.from_notes(compact))),
+        ("access dataclass Note", _time(access(legacy))),
+        ("access tuple Note", _time(access(compact))),
+    ]
+    print(f"notes: {n}")
+    for label, sec in rows:
+        print(f"{label:<26}: {sec * 1e9 / n:8.1f} ns/note")
+
+    print(f"{'memory dataclass Note':<26}: {_memory(lambda: [DataclassNote(*spec) for spec in specs]) / n:8.1f} bytes/note")
+    print(f"{'memory tuple Note':<26}: {_memory(lambda: [Note(*spec) for spec in specs]) / n:8.1f} bytes/note")
+    print(f"{'memory NoteArray':<26}: {_memory(lambda: NoteArray.from_notes(compact)) / n:8.1f} bytes/note")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# benchmarks/bench_note_text.py
+"""
+テキストの進行ファイルの読み込みを、従来の parse_notes（1行ずつ、音ごとに正規表現）と
+utils.note_text_reader（解釈済みの音の表を引き、Note.pack() 形式の array('i') に直接詰める）で比較するベンチマーク。
+メモリは読み終えたボイシングを保持したときの1行あたりのバイト数（Note のリスト / 1行1つの array / ファイルで1本の array）。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_note_text --lines 200000
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from models.note import Note, parse_notes
+from utils.note_text_reader import iter_note_arrays, read_packed
+
+
+def legacy_parse_notes(notes_csv: str, start_octave: int = 4) -> List[Note]:
+    """比較用: 変更前の models.note.parse_notes / Note.from_string と同じ実装（音ごとに re.match と re.search）"""
+    notes = []
+    current_octave = start_octave
+    last_pc = -1
+    for n_str in [s.strip() for s in notes_csv.split(",")]:
+        match = re.match(r"^([a-gA-G])([#bx]*)(-?\d+)?$", n_str.strip())
+        if not match: raise ValueError(f"Invalid format: '{n_str}'")
+        step_str, alter_str, octave_str = match.groups()
+        alter = {'': 0, '#': 1, 'b': -1, 'bb': -2, 'x': 2}.get(alter_str.lower(), 0)
+        temp_note = Note(step_str, alter, int(octave_str) if octave_str is not None else 4)
+        if re.search(r"-?\d+$", n_str) is None:
+            if temp_note.pitch_class < last_pc:
+                current_octave += 1
+            temp_note = temp_note.with_octave(current_octave)
+            last_pc = temp_note.pitch_class
+        else:
+            current_octave = temp_note.octave
+            last_pc = temp_note.pitch_class
+        notes.append(temp_note)
+    return notes
+
+
+def generate_lines(n: int, seed: int) -> List[str]:
+    """3〜6音のボイシングの行（オクターブの省略・小文字・変化記号・コメント行を混ぜる）"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(n):
+        if i % 50 == 0:
+            lines.append("# section")
+        tokens = []
+        for j in range(rng.randint(3, 6)):
+            token = rng.choice("CDEFGABcdefgab") + rng.choice(["", "", "#", "b", "bb", "x"])
+            if j == 0 or rng.random() < 0.3:
+                token += str(rng.randint(2, 5))
+            tokens.append(token)
+        lines.append(", ".join(tokens))
+    return lines
+
+
+def read_legacy(path: str, parse) -> list:
+    """変更前の analyze_corpus.py と同じ読み方（strip してコメントを除き、1行ずつ parse）"""
+    voicings = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                voicings.append(parse(line))
+    return voicings
+
+
+def read_arrays(path: str) -> list:
+    return [codes for _line_number, codes in iter_note_arrays(path)]
+
+
+def read_unpacked(path: str) -> list:
+    """ファイル全体を詰めて読んだ後、Note のリストへ戻すところまで（解析器に渡す場合）"""
+    return list(read_packed(path))
+
+
+def _time(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _memory(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines, args.seed)
+    fd, path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        # 3通りの結果が一致することを確認してから計測する
+        legacy = read_legacy(path, legacy_parse_notes)
+        assert legacy == read_legacy(path, parse_notes) == read_unpacked(path)
+        assert [list(codes) for codes in read_arrays(path)] == [[note.pack() for note in v] for v in legacy]
+        n_lines = len(legacy)
+        n_notes = sum(len(voicing) for voicing in legacy)
+
+        rows = [
+            ("legacy parse_notes", _time(lambda: read_legacy(path, legacy_parse_notes))),
+            ("parse_notes", _time(lambda: read_legacy(path, parse_notes))),
+            ("iter_note_arrays", _time(lambda: read_arrays(path))),
+            ("read_packed", _time(lambda: read_packed(path))),
+            ("read_packed + unpack", _time(lambda: read_unpacked(path))),
+        ]
+        print(f"lines: {n_lines}, notes: {n_notes}")
+        for label, sec in rows:
+            print(f"{label:<22}: {sec * 1e9 / n_notes:8.1f} ns/note  {n_lines / sec:10.0f} lines/sec  "
+                  f"({rows[0][1] / sec:4.2f}x)")
+
+        print(f"{'memory list[Note]':<22}: {_memory(lambda: read_legacy(path, parse_notes)) / n_lines:8.1f} bytes/line")
+        print(f"{'memory array per line':<22}: {_memory(lambda: read_arrays(path)) / n_lines:8.1f} bytes/line")
+        print(f"{'memory read_packed':<22}: {_memory(lambda: read_packed(path)) / n_lines:8.1f} bytes/line")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
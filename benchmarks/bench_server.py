@@ -0,0 +1,145 @@
+# benchmarks/bench_server.py
+"""
+analysis_server.py の負荷試験。サーバーを別プロセスで起動し、複数の接続から並行してリクエストを送って
+スループット（req/s）とクライアントから見たレイテンシ（p50 / p99）を計測する。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_server
+    python -m benchmarks.bench_server --workers 4 --connections 32 --window 16 --requests 20000
+    python -m benchmarks.bench_server --op progression --batch-delay 0.5
+
+--window は1接続あたりの返信を待たずに送るリクエスト数（パイプラインの深さ）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import List
+
+from benchmarks.corpus import KEYS, generate_chords, generate_melody, generate_progression
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _voicing(notes) -> str:
+    return ", ".join(str(n) for n in notes)
+
+
+def build_requests(op: str, n: int, seed: int) -> List[bytes]:
+    """計測に使うリクエスト（JSON Lines の1行ずつ）。op="mixed" はコード7割・ほか1割ずつ"""
+    chords = generate_chords(max(n, 2), seed)
+    lines = []
+    for i in range(n):
+        kind = op
+        if op == "mixed":
+            kind = ["chord"] * 7 + ["transition", "progression", "melody"]
+            kind = kind[i % 10]
+        key = KEYS[i % len(KEYS)]
+        if kind == "chord":
+            request = {"op": "chord", "notes": _voicing(chords[i].notes), "key": key}
+        elif kind == "transition":
+            request = {"op": "transition", "from": _voicing(chords[i - 1].notes), "to": _voicing(chords[i].notes), "key": key}
+        elif kind == "progression":
+            request = {"op": "progression", "key": key,
+                       "voicings": [_voicing(c.notes) for c in generate_progression(8, seed + i, key)]}
+        else:
+            melody, chord = generate_melody([chords[i]], seed + i, key)[0]
+            request = {"op": "melody", "melody": str(melody), "chord": _voicing(chord.notes), "key": key}
+        request["id"] = i
+        lines.append(json.dumps(request).encode() + b"\n")
+    return lines
+
+
+async def _client(host: str, port: int, lines: List[bytes], window: int, latencies: List[float], errors: List[int]):
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    sent_at = {}
+    inflight = asyncio.Semaphore(window)
+    clock = time.perf_counter
+
+    async def send():
+        for i, line in enumerate(lines):
+            await inflight.acquire()
+            sent_at[i] = clock()
+            writer.write(line)
+            await writer.drain()
+
+    sender = asyncio.ensure_future(send())
+    for i in range(len(lines)):
+        response = await reader.readline()
+        latencies.append(clock() - sent_at.pop(i))
+        if not json.loads(response)["ok"]:
+            errors.append(i)
+        inflight.release()
+    await sender
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_load(host: str, port: int, requests: List[bytes], connections: int, window: int) -> dict:
+    latencies: List[float] = []
+    errors: List[int] = []
+    shares = [requests[i::connections] for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, share, window, latencies, errors) for share in shares if share))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(q):
+        return latencies[min(len(latencies) - 1, int(round(q * (len(latencies) - 1))))] * 1000
+
+    return {"requests": len(latencies), "errors": len(errors), "seconds": round(elapsed, 3),
+            "req_per_sec": round(len(latencies) / elapsed, 1), "p50_ms": round(pct(0.50), 3),
+            "p99_ms": round(pct(0.99), 3), "max_ms": round(latencies[-1] * 1000, 3)}
+
+
+async def _fetch_stats(host: str, port: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "stats"}\n')
+    stats = json.loads(await reader.readline())["result"]
+    writer.close()
+    await writer.wait_closed()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analysis_server.py のスループットとレイテンシを計測する")
+    parser.add_argument("--op", default="chord", choices=["chord", "transition", "progression", "melody", "mixed"])
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--window", type=int, default=8, help="1接続あたりのパイプラインの深さ（既定: 8）")
+    parser.add_argument("--workers", type=int, default=0, help="サーバーのワーカープロセス数（既定: 0）")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--batch-delay", type=float, default=2.0, help="ミリ秒（既定: 2）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    requests = build_requests(args.op, args.requests, args.seed)
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "analysis_server.py"), "--port", "0", "--workers", str(args.workers),
+         "--batch-size", str(args.batch_size), "--batch-delay", str(args.batch_delay)],
+        cwd=ROOT, stderr=subprocess.PIPE, text=True)
+    try:
+        banner = server.stderr.readline()
+        match = re.search(r"listening on ([\d.]+):(\d+)", banner)
+        if not match:
+            raise SystemExit(f"server failed to start: {banner}{server.stderr.read()}")
+        host, port = match.group(1), int(match.group(2))
+        # ワーカーの初期化と解釈キャッシュの影響を揃えるため、同じ入力で一度流してから計測する
+        asyncio.run(run_load(host, port, requests, args.connections, args.window))
+        result = asyncio.run(run_load(host, port, requests, args.connections, args.window))
+        stats = asyncio.run(_fetch_stats(host, port))
+    finally:
+        server.terminate()
+        server.wait()
+
+    batches = stats["batches"]
+    result["mean_batch_size"] = round((stats["requests"] - 1) / batches, 1) if batches else 0.0
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
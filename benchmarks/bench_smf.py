@@ -0,0 +1,106 @@
+# benchmarks/bench_smf.py
+"""
+SMF リーダー（utils.smf_reader）の読み込み・区間分割と、ProgressionAnalyzer までを通した処理速度を、曲の長さ（実時間）と比較するベンチマーク。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_smf --tracks 16 --minutes 10
+"""
+import argparse
+import random
+import struct
+import time
+
+from engine.progression_analyzer import ProgressionAnalyzer
+from utils.smf_reader import iter_chord_segments
+
+
+def _vlq(value: int) -> bytes:
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def _track(events) -> bytes:
+    """(ティック, イベントのバイト列) のリストから MTrk チャンクを作る（ランニングステータスを使う）"""
+    body = bytearray()
+    last_tick = 0
+    last_status = None
+    for tick, event in sorted(events, key=lambda e: e[0]):
+        body += _vlq(tick - last_tick)
+        if event[0] == last_status and event[0] < 0xF0:
+            body += event[1:]
+        else:
+            body += event
+            last_status = event[0] if event[0] < 0xF0 else None
+        last_tick = tick
+    body += _vlq(0) + b"\xff\x2f\x00"
+    return b"MTrk" + struct.pack(">I", len(body)) + bytes(body)
+
+
+def generate_smf(tracks: int, minutes: float, seed: int = 0, division: int = 480) -> bytes:
+    """
+    120 BPM で8分音符ごとにコードが変わる多トラックの SMF を生成する。
+    各トラックは和音の構成音の1つを担当し、半分のトラックは4分音符ごとに打ち直す。
+    """
+    rng = random.Random(seed)
+    eighth = division // 2
+    steps = int(minutes * 60 * 4)  # 120 BPM = 1秒に8分音符4つ
+    shapes = [(0, 4, 7, 11), (0, 3, 7, 10), (0, 4, 7, 10), (0, 3, 6, 10), (0, 4, 7, 14)]
+
+    chords = []
+    for _ in range(steps):
+        root = rng.randint(36, 47)
+        chords.append([root + offset for offset in rng.choice(shapes)])
+
+    chunks = [_track([(0, b"\xff\x51\x03\x07\xa1\x20"), (0, b"\xff\x59\x02\x00\x00")])]
+    for t in range(tracks):
+        channel = t % 16
+        if channel == 9:
+            channel = 10
+        events = []
+        for i, chord in enumerate(chords):
+            if t % 2 and i % 2:
+                continue  # 4分音符で鳴らすトラック
+            note = chord[t % len(chord)] + 12 * (t // len(chord))
+            note = min(note, 127)
+            length = eighth * (2 if t % 2 else 1)
+            events.append((i * eighth, bytes([0x90 | channel, note, 80])))
+            events.append((i * eighth + length - 1, bytes([0x90 | channel, note, 0])))
+        chunks.append(_track(events))
+    header = b"MThd" + struct.pack(">IHHH", 6, 1, len(chunks), division)
+    return header + b"".join(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tracks", type=int, default=16)
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    data = generate_smf(args.tracks, args.minutes, args.seed)
+    duration = args.minutes * 60
+
+    start = time.perf_counter()
+    segments = 0
+    for _ in iter_chord_segments(data):
+        segments += 1
+    t_read = time.perf_counter() - start
+
+    analyzer = ProgressionAnalyzer()
+    start = time.perf_counter()
+    records = 0
+    for _ in analyzer.iter_progression((seg.notes for seg in iter_chord_segments(data)), key="C"):
+        records += 1
+    t_full = time.perf_counter() - start
+
+    print(f"file: {len(data) / 1024:.0f} KiB, {args.tracks} tracks, {duration:.0f} s of music, {segments} segments")
+    print(f"read + segment : {t_read:7.2f} s  ({duration / t_read:8.1f}x real time)")
+    print(f"+ progression  : {t_full:7.2f} s  ({duration / t_full:8.1f}x real time, {records} records)")
+
+
+if __name__ == "__main__":
+    main()
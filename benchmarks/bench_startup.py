@@ -0,0 +1,116 @@
+# benchmarks/bench_startup.py
+"""
+起動時間（新しいインタプリタでの import から最初の解析が終わるまで）のベンチマーク。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 30 --budget-ms 60
+
+毎回 python -c で新しいプロセスを起動し、プロセス内で次の区間を計測する（インタプリタ自体の起動は含めない）:
+    import  エンジンと Note の import
+    init    ProgressionAnalyzer の生成
+    first   最初の analyze_progression（4コード）
+ディスクキャッシュ（engine.compiled_cache）の状態ごとに計測する:
+    cold      空のキャッシュディレクトリ（検索表を組み立てて保存する1回目）
+    warm      保存済みのキャッシュを読み込む（通常の2回目以降）
+    disabled  キャッシュを使わず毎回組み立てる
+--budget-ms を指定すると、warm の合計（import + init + first）の中央値が超えたとき終了コード 1 を返す。
+.pyc が古いと import にコンパイルの時間が乗るので、先に python -m compileall しておくこと。
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子プロセスで実行するスクリプト（計測結果を JSON で1行出力する）
+CHILD = """
+import json, sys, time
+clock = time.perf_counter
+t0 = clock()
+from engine.progression_analyzer import ProgressionAnalyzer
+from models.note import parse_notes
+t1 = clock()
+analyzer = ProgressionAnalyzer()
+t2 = clock()
+voicings = [parse_notes(v) for v in ["C3, E3, G3", "A2, C3, E3", "D3, F3, A3, C4", "G2, B2, D3, F3"]]
+analyzer.analyze_progression(voicings, key="C")
+t3 = clock()
+modules = sorted(m for m in sys.modules if m.split(".")[0] in ("engine", "dictionaries", "models", "utils"))
+print(json.dumps({"import": t1 - t0, "init": t2 - t1, "first": t3 - t2, "modules": modules}))
+"""
+
+PHASES = ["import", "init", "first"]
+
+
+def run_child(cache_dir: str) -> dict:
+    env = dict(os.environ, CHORD_ANALYZER_CACHE_DIR=cache_dir, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=ROOT, env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def measure(mode: str, runs: int) -> dict:
+    """mode（cold / warm / disabled）で runs 回起動し、区間ごとの中央値（ミリ秒）を返す"""
+    samples = {phase: [] for phase in PHASES + ["total"]}
+    modules = []
+    workdir = tempfile.mkdtemp(prefix="chord-analyzer-startup-")
+    try:
+        if mode == "warm":
+            run_child(workdir)  # キャッシュを作っておく
+        for i in range(runs):
+            if mode == "cold":
+                cache_dir = os.path.join(workdir, str(i))
+            elif mode == "warm":
+                cache_dir = workdir
+            else:
+                cache_dir = ""
+            result = run_child(cache_dir)
+            for phase in PHASES:
+                samples[phase].append(result[phase] * 1000)
+            samples["total"].append(sum(result[phase] for phase in PHASES) * 1000)
+            modules = result["modules"]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    report = {phase: round(statistics.median(values), 2) for phase, values in samples.items()}
+    report["total_max"] = round(max(samples["total"]), 2)
+    report["modules"] = len(modules)
+    report["dictionaries_loaded"] = [m for m in modules if m.startswith("dictionaries")]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="import から最初の解析までの起動時間を計測する")
+    parser.add_argument("--runs", type=int, default=15, help="状態ごとの起動回数（既定: 15）")
+    parser.add_argument("--modes", default="cold,warm,disabled", help="計測する状態（カンマ区切り）")
+    parser.add_argument("--budget-ms", type=float, default=None, help="warm の合計の中央値の上限（ミリ秒）")
+    parser.add_argument("--json", action="store_true", help="結果を JSON で出力する")
+    args = parser.parse_args()
+
+    results = {mode: measure(mode, args.runs) for mode in args.modes.split(",")}
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print(f"{'mode':10s} {'import':>9s} {'init':>9s} {'first':>9s} {'total':>9s} {'max':>9s}  dictionaries")
+        for mode, r in results.items():
+            loaded = ", ".join(name.split(".")[-1] for name in r["dictionaries_loaded"]) or "-"
+            print(f"{mode:10s} {r['import']:>9.2f} {r['init']:>9.2f} {r['first']:>9.2f} "
+                  f"{r['total']:>9.2f} {r['total_max']:>9.2f}  {loaded}")
+        print("(ms, median of", args.runs, "runs)")
+
+    if args.budget_ms is not None and "warm" in results:
+        total = results["warm"]["total"]
+        if total > args.budget_ms:
+            print(f"warm start {total:.2f} ms exceeds budget {args.budget_ms:.2f} ms", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
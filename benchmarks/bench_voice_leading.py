@@ -0,0 +1,93 @@
+# benchmarks/bench_voice_leading.py
+"""
+VoiceLeadingEngine（最小コスト割り当て）と、従来の貪欲法による声部対応付けの速度を比較するベンチマーク。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.bench_voice_leading --pairs 2000
+"""
+import argparse
+import random
+import time
+
+from engine.voice_leading import VoiceLeadingEngine
+from models.note import Note
+
+
+def greedy_assign(notes_a, notes_b):
+    """比較用: 変更前の TransitionAnalyzer と同じ貪欲法（保留音を優先し、残りは最寄りの音へ）"""
+    unmatched_a = list(notes_a)
+    unmatched_b = list(notes_b)
+    mappings = []
+    for nb in list(unmatched_b):
+        for na in unmatched_a:
+            if na.absolute_semitone == nb.absolute_semitone:
+                mappings.append((na, nb, 0))
+                unmatched_a.remove(na)
+                unmatched_b.remove(nb)
+                break
+    for nb in unmatched_b:
+        if not unmatched_a:
+            mappings.append((None, nb, None))
+            continue
+        unmatched_a.sort(key=lambda na: abs(na.absolute_semitone - nb.absolute_semitone))
+        na = unmatched_a.pop(0)
+        mappings.append((na, nb, nb.absolute_semitone - na.absolute_semitone))
+    for na in unmatched_a:
+        mappings.append((na, None, None))
+    return mappings
+
+
+def smoothness(mappings) -> int:
+    """TransitionAnalyzer と同じ Voice Leading スコア"""
+    movement = sum(abs(diff) for _, _, diff in mappings if diff)
+    common = sum(1 for _, _, diff in mappings if diff == 0)
+    return 80 - movement * 2 + common * 10
+
+
+def random_voicing(rng: random.Random, voices: int):
+    """バス C2〜C3 から 2〜7半音ずつ積み上げたボイシング（オーケストラのリダクション程度の音域）"""
+    semitone = rng.randint(36, 48)
+    notes = []
+    for _ in range(voices):
+        octave, pc = divmod(semitone, 12)
+        step, alter = [("C", 0), ("C", 1), ("D", 0), ("E", -1), ("E", 0), ("F", 0),
+                       ("F", 1), ("G", 0), ("A", -1), ("A", 0), ("B", -1), ("B", 0)][pc]
+        notes.append(Note(step, alter, octave))
+        semitone += rng.randint(2, 7)
+    return notes
+
+
+def _time(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for voices in (4, 6, 8):
+        pairs = [(random_voicing(rng, voices), random_voicing(rng, voices + rng.choice([-1, 0, 0, 1])))
+                 for _ in range(args.pairs)]
+        n = len(pairs)
+
+        engine = VoiceLeadingEngine(cache_size=0)
+        cached = VoiceLeadingEngine()
+        t_greedy = _time(lambda: [greedy_assign(a, b) for a, b in pairs])
+        t_optimal = _time(lambda: [engine.assign(a, b) for a, b in pairs])
+        [cached.assign(a, b) for a, b in pairs]
+        t_cached = _time(lambda: [cached.assign(a, b) for a, b in pairs])
+
+        gain = sum(smoothness([tuple(m) for m in engine.assign(a, b)]) - smoothness(greedy_assign(a, b))
+                   for a, b in pairs) / n
+        print(f"{voices} voices: greedy {t_greedy * 1e6 / n:7.1f} us/pair, "
+              f"optimal {t_optimal * 1e6 / n:7.1f} us/pair, cached {t_cached * 1e6 / n:6.1f} us/pair, "
+              f"avg smoothness gain {gain:+.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+# benchmarks/corpus.py
+"""
+ベンチマーク用の入力データ（シード固定で再現可能）を生成する。
+
+- generate_chords     : CHORD_DICT の形を様々なルート・音域・転回で実音化したコード（generate_voicings は Note のリストだけ）
+- generate_progression: CADENCE_DICT の遷移（to_degree -> 次の from_degree）をたどるコード進行
+- generate_melody     : 進行の各コードに対して Key の音階上を動くメロディ音
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+from models.note import Note
+from dictionaries.cadence_dict import CADENCE_DICT
+from dictionaries.chord_dict import CHORD_DICT
+from engine.cadence_index import CADENCE_INDEX
+from utils.formatter import KeyContext
+from utils.interval_calc import INTERVAL_MAP
+
+STEPS = "CDEFGAB"
+
+# ディグリー -> 主音からの半音差（CADENCE_DICT に現れる表記をすべて含む）
+DEGREE_TO_SEMITONE = {
+    "I": 0, "#I": 1, "bII": 1, "II": 2, "bIII": 3, "III": 4, "IV": 5, "#IV": 6,
+    "V": 7, "#V": 8, "bVI": 8, "VI": 9, "bVII": 10, "VII": 11,
+}
+
+# 長調・短調（自然短音階）の音階（主音からの半音差）
+MAJOR_SCALE = [0, 2, 4, 5, 7, 9, 11]
+MINOR_SCALE = [0, 2, 3, 5, 7, 8, 10]
+
+# 進行の生成に使うクオリティ（実際の曲でよく使われる3度堆積の和音に限る）
+PROGRESSION_QUALITIES = [
+    "Major", "Minor", "Dim", "Aug", "sus4", "6", "m6", "Maj7", "m7", "7", "m7b5", "dim7", "7sus4",
+    "aug7", "Maj9", "m9", "9", "7(b9)", "11", "m11", "13",
+]
+# CADENCE_DICT のクオリティ表記 -> CHORD_DICT 上の名前
+_QUALITY_ALIASES = {"": "Major", "m": "Minor"}
+
+# ベンチマークで使う Key（シャープ系・フラット系・短調を含む）
+KEYS = ["C", "G", "D", "A", "E", "F", "Bb", "Eb", "Ab", "Am", "Em", "Dm", "Cm"]
+
+
+class ChordSpec:
+    """生成したコード1つ: ルートのピッチクラス・クオリティ・ボイシング"""
+    __slots__ = ("root_pc", "quality", "notes")
+
+    def __init__(self, root_pc: int, quality: str, notes: List[Note]):
+        self.root_pc = root_pc
+        self.quality = quality
+        self.notes = notes
+
+
+def _interval_offsets() -> Dict[str, Tuple[int, int]]:
+    """インターバル名 -> (ステップ差, 半音差)。9・11・13度はオクターブ上に置く"""
+    offsets = {}
+    for (step_diff, semi_diff), name in INTERVAL_MAP.items():
+        if 0 <= semi_diff < 12:
+            offsets[name] = (step_diff, semi_diff)
+            number = int(name[1:])
+            if number in [2, 4, 6]:
+                offsets[f"{name[0]}{number + 7}"] = (step_diff + 7, semi_diff + 12)
+    return offsets
+
+
+_OFFSETS = _interval_offsets()
+# クオリティ名 -> ルートからの音程（低い順）
+_SHAPES: Dict[str, List[str]] = {
+    quality: sorted(intervals, key=lambda n: _OFFSETS[n][1]) for intervals, quality in CHORD_DICT.items()
+}
+
+
+def realize(root: Note, shape: List[str], inversion: int = 0) -> List[Note]:
+    """ルートの Note と音程名の列から、綴りを保ったボイシングを作る（下から inversion 音をオクターブ上げる）"""
+    notes = []
+    for name in shape:
+        step_diff, semi_diff = _OFFSETS[name]
+        step_index = root.step_index + step_diff
+        step = STEPS[step_index % 7]
+        octave = root.octave + step_index // 7
+        alter = root.absolute_semitone + semi_diff - (Note.STEP_TO_SEMITONE[step] + octave * 12)
+        notes.append(Note(step, alter, octave))
+    for i in range(inversion):
+        notes[i] = notes[i].with_octave(notes[i].octave + 1)
+    return notes
+
+
+def generate_chords(n_chords: int, seed: int = 0, voices: Optional[int] = None) -> List[ChordSpec]:
+    """CHORD_DICT の形を様々なルート・音域・転回で実音化したコードを返す（voices を指定するとその声部数の形だけ）"""
+    rng = random.Random(seed)
+    shapes = [(quality, shape) for quality, shape in _SHAPES.items() if voices is None or len(shape) == voices]
+    if not shapes:
+        raise ValueError(f"CHORD_DICT has no {voices}-note shapes")
+    chords = []
+    for _ in range(n_chords):
+        quality, shape = rng.choice(shapes)
+        root = Note(rng.choice(STEPS), rng.choice([0, 0, 1, -1]), rng.randint(2, 4))
+        notes = realize(root, shape, rng.randint(0, max(0, len(shape) - 2)))
+        chords.append(ChordSpec(root.pitch_class, quality, notes))
+    return chords
+
+
+def generate_voicings(n_chords: int, seed: int = 0, voices: Optional[int] = None) -> List[List[Note]]:
+    """generate_chords のボイシング（Note のリスト）だけを返す"""
+    return [chord.notes for chord in generate_chords(n_chords, seed, voices)]
+
+
+def _candidate_qualities():
+    """各カデンツについて (from_degree, to_degree, 条件を満たす from 側のクオリティ, to 側のクオリティ)"""
+    table = []
+    for cadence, entry in zip(CADENCE_DICT, CADENCE_INDEX.entries):
+        # "m" のように辞書上は別名（Minor）で登録されている三和音も候補に含める
+        aliases = {_QUALITY_ALIASES.get(q) for q in entry.from_quality}
+        from_q = [q for q in PROGRESSION_QUALITIES if entry.accepts_from(q) or q in aliases]
+        to_q = [q for q in PROGRESSION_QUALITIES if entry.accepts_to(q)]
+        if from_q and to_q:
+            table.append((cadence["from_degree"], cadence["to_degree"], from_q, to_q))
+    return table
+
+
+_CADENCES = _candidate_qualities()
+
+
+def _chord(rng: random.Random, key: str, degree: str, quality: str, register: int) -> ChordSpec:
+    kc = KeyContext(key)
+    key_root = Note.from_string(key.rstrip("m") + "4").pitch_class
+    root_pc = (key_root + DEGREE_TO_SEMITONE[degree]) % 12
+    root = Note.from_string(kc.get_note_name(root_pc), default_octave=register)
+    # 進行中のコードは基本形か第1転回形にする
+    return ChordSpec(root_pc, quality, realize(root, _SHAPES[quality], rng.randint(0, 1)))
+
+
+def generate_progression(length: int, seed: int = 0, key: str = "C") -> List[ChordSpec]:
+    """
+    CADENCE_DICT のカデンツを、直前のコード（ディグリーとクオリティ）から始められるものを選んでつないだ進行を返す。
+    つながるカデンツがなければランダムに選び直す。
+    """
+    rng = random.Random(seed)
+    from_degree, to_degree, from_q, to_q = rng.choice(_CADENCES)
+    chords = [_chord(rng, key, from_degree, rng.choice(from_q), rng.randint(2, 3))]
+    while len(chords) < length:
+        quality = rng.choice(to_q)
+        chords.append(_chord(rng, key, to_degree, quality, rng.randint(2, 3)))
+        following = [c for c in _CADENCES if c[0] == to_degree and quality in c[2]]
+        from_degree, to_degree, from_q, to_q = rng.choice(following or _CADENCES)
+    return chords
+
+
+def generate_melody(chords: List[ChordSpec], seed: int = 0, key: str = "C") -> List[Tuple[Note, ChordSpec]]:
+    """進行の各コードに1音ずつ、Key の音階上を順次・跳躍で動くメロディ音（4〜5オクターブ）を割り当てる"""
+    rng = random.Random(seed)
+    kc = KeyContext(key)
+    key_root = Note.from_string(key.rstrip("m") + "4").pitch_class
+    scale = MINOR_SCALE if key.endswith("m") else MAJOR_SCALE
+    degree = rng.randrange(7)
+    octave = 5
+    line = []
+    for chord in chords:
+        degree += rng.choice([-2, -1, -1, 1, 1, 2, 3])
+        if degree < 0:
+            degree += 7
+            octave = max(4, octave - 1)
+        elif degree > 6:
+            degree -= 7
+            octave = min(5, octave + 1)
+        pc = (key_root + scale[degree]) % 12
+        line.append((Note.from_string(kc.get_note_name(pc), default_octave=octave), chord))
+    return line
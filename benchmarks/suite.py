@@ -0,0 +1,307 @@
+# benchmarks/suite.py
+"""
+各エンジンの処理速度・レイテンシ・ピークメモリを、シード固定のコーパス（benchmarks.corpus）で計測して JSON で出力するベンチマークスイート。
+
+実行方法（リポジトリのルートで）:
+    python -m benchmarks.suite --output baseline.json          # 計測して保存
+    python -m benchmarks.suite --compare baseline.json         # 保存した結果と比較（劣化があれば終了コード 1）
+    python -m benchmarks.suite --filter chord. --quick         # ケース名で絞り込み、少ない回数で計測
+
+計測項目（ケースごと）:
+    ops_per_sec  1秒あたりの呼び出し回数（計測区間の合計時間から算出）
+    p50_us / p99_us  1回の呼び出しのレイテンシ（マイクロ秒）
+    peak_kib     新しいインスタンスで入力を一巡したときの tracemalloc のピーク（キャッシュの成長を含み、入力の生成は含まない）
+
+速度は同じマシン・同じ --seed で取ったベースラインとだけ比較すること（共有マシンでは --repeat や --tolerance を大きくする）。
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from engine.analyzer import ChordAnalyzer
+from engine.melody_analyzer import MelodyAnalyzer
+from engine.progression_analyzer import ProgressionAnalyzer
+from engine.transition_analyzer import TransitionAnalyzer
+from benchmarks.corpus import KEYS, generate_chords, generate_melody, generate_progression
+
+# 計測回数の既定値（--quick では 1/10）
+ITERATIONS = 2000
+
+
+class Case:
+    """
+    1つの計測ケース。
+    setup() は新しいエンジンのインスタンスと入力列から「呼び出し1回分の関数」のリストを作る
+    （計測はリストを先頭から繰り返し呼ぶ）。
+    """
+    def __init__(self, name: str, setup: Callable[[], List[Callable[[], object]]], iterations: int = ITERATIONS):
+        self.name = name
+        self.setup = setup
+        self.iterations = iterations
+
+
+def _chord_cases(seed: int) -> List[Case]:
+    cases = []
+    for voices in [3, 4, 5, 6]:
+        def analyze_setup(voices=voices):
+            analyzer = ChordAnalyzer()
+            chords = generate_chords(500, seed, voices)
+            return [lambda c=c, k=KEYS[i % len(KEYS)]: analyzer.analyze(c.notes, key=k) for i, c in enumerate(chords)]
+
+        def best_setup(voices=voices, fast=False):
+            analyzer = ChordAnalyzer()
+            chords = generate_chords(500, seed, voices)
+            return [lambda c=c, k=KEYS[i % len(KEYS)]: analyzer.get_best_interpretation(c.notes, key=k, fast=fast)
+                    for i, c in enumerate(chords)]
+
+        cases.append(Case(f"chord.analyze[voices={voices}]", analyze_setup))
+        cases.append(Case(f"chord.best[voices={voices}]", best_setup))
+        cases.append(Case(f"chord.best_fast[voices={voices}]", lambda voices=voices: best_setup(voices, fast=True)))
+    return cases
+
+
+def _transition_cases(seed: int) -> List[Case]:
+    cases = []
+    for voices in [3, 4, 5, 6]:
+        def setup(voices=voices):
+            analyzer = TransitionAnalyzer()
+            chords = generate_chords(501, seed, voices)
+            calls = []
+            for i, (a, b) in enumerate(zip(chords, chords[1:])):
+                calls.append(lambda a=a, b=b, k=KEYS[i % len(KEYS)]: analyzer.analyze_transition(
+                    a.root_pc, a.quality, a.notes, b.root_pc, b.quality, b.notes, key_name=k))
+            return calls
+
+        cases.append(Case(f"transition.analyze[voices={voices}]", setup))
+    return cases
+
+
+def _progression_cases(seed: int) -> List[Case]:
+    cases = []
+    for length in [4, 16, 64]:
+        def setup(length=length):
+            analyzer = ProgressionAnalyzer()
+            calls = []
+            for i in range(50):
+                key = KEYS[i % len(KEYS)]
+                voicings = [c.notes for c in generate_progression(length, seed + i, key)]
+                calls.append(lambda v=voicings, k=key: analyzer.analyze_progression(v, key=k))
+            return calls
+
+        cases.append(Case(f"progression.analyze[length={length}]", setup, iterations=max(50, ITERATIONS * 4 // length)))
+
+    def sweep_setup(length=16):
+        analyzer = ProgressionAnalyzer()
+        calls = []
+        for i in range(20):
+            voicings = [c.notes for c in generate_progression(length, seed + i, KEYS[i % len(KEYS)])]
+            calls.append(lambda v=voicings: analyzer.sweep_keys(v))
+        return calls
+
+    cases.append(Case("progression.sweep_keys[length=16,keys=24]", sweep_setup, iterations=100))
+    return cases
+
+
+def _melody_cases(seed: int) -> List[Case]:
+    cases = []
+    for voices in [3, 4, 5, 6]:
+        def setup(voices=voices):
+            analyzer = MelodyAnalyzer()
+            calls = []
+            for i in range(10):
+                key = KEYS[i % len(KEYS)]
+                line = generate_melody(generate_chords(50, seed + i, voices), seed + i, key)
+                calls.extend(lambda m=m, c=c: analyzer.analyze_melody(m, c.root_pc, c.quality, c.notes) for m, c in line)
+            return calls
+
+        cases.append(Case(f"melody.analyze[voices={voices}]", setup))
+
+    def line_setup(length=2000):
+        analyzer = MelodyAnalyzer()
+        calls = []
+        for i in range(5):
+            key = KEYS[i % len(KEYS)]
+            chords = generate_chords(length // 2, seed + i)
+            timeline = [(float(j), 1.0, c) for j, c in enumerate(chords)]
+            melody = [(j * 0.5, 0.5, m) for j, (m, _c) in enumerate(generate_melody(chords + chords, seed + i, key))]
+            calls.append(lambda m=melody, t=timeline: analyzer.analyze_line(m, t).summary())
+        return calls
+
+    cases.append(Case("melody.analyze_line[notes=2000]", line_setup, iterations=50))
+    return cases
+
+
+def _roughness_cases(seed: int) -> List[Case]:
+    def voicings_setup(n=1000):
+        # NumPy が必要なので、ケースを実行するときに読み込む
+        from engine.roughness import RoughnessModel
+        model = RoughnessModel()
+        calls = []
+        for i in range(5):
+            chords = generate_chords(n, seed + i)
+            width = max(len(c.notes) for c in chords)
+            semis = [[n.absolute_semitone for n in c.notes] + [0] * (width - len(c.notes)) for c in chords]
+            mask = [[True] * len(c.notes) + [False] * (width - len(c.notes)) for c in chords]
+            calls.append(lambda s=semis, m=mask: model.voicings(s, m))
+        return calls
+
+    def chord_setup():
+        from engine.roughness import RoughnessModel
+        analyzer = ChordAnalyzer(roughness=RoughnessModel())
+        chords = generate_chords(500, seed)
+        return [lambda c=c, k=KEYS[i % len(KEYS)]: analyzer.get_best_interpretation(c.notes, key=k)
+                for i, c in enumerate(chords)]
+
+    return [Case("roughness.voicings[n=1000]", voicings_setup, iterations=200),
+            Case("roughness.chord_best", chord_setup)]
+
+
+def build_cases(seed: int) -> List[Case]:
+    return (_chord_cases(seed) + _transition_cases(seed) + _progression_cases(seed) + _melody_cases(seed)
+            + _roughness_cases(seed))
+
+
+def _percentile(sorted_values: List[int], q: float) -> int:
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _time_calls(calls: List[Callable[[], object]], iterations: int) -> List[int]:
+    latencies = [0] * iterations
+    n = len(calls)
+    clock = time.perf_counter_ns
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for i in range(iterations):
+            call = calls[i % n]
+            start = clock()
+            call()
+            latencies[i] = clock() - start
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return latencies
+
+
+def run_case(case: Case, iterations: int, repeat: int = 3) -> Dict[str, float]:
+    """
+    1ケースを計測する。入力を一巡してキャッシュ等を温めてから、1回ずつ perf_counter_ns で計測する。
+    repeat 回計測して合計時間が最も短い回を採用する（他のプロセスによる揺らぎを除くため）。
+    ピークメモリは別の新しいインスタンスで測る（tracemalloc は実行を遅くするため。入力の生成は含めない）。
+    """
+    calls = case.setup()
+    for call in calls:
+        call()
+    latencies = min((_time_calls(calls, iterations) for _ in range(repeat)), key=sum)
+    del calls
+
+    gc.collect()
+    calls = case.setup()
+    tracemalloc.start()
+    for call in calls:
+        call()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(latencies)
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": round(iterations / (total / 1e9), 1) if total else 0.0,
+        "p50_us": round(_percentile(latencies, 0.50) / 1000, 2),
+        "p99_us": round(_percentile(latencies, 0.99) / 1000, 2),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_suite(seed: int = 0, name_filter: Optional[str] = None, quick: bool = False, repeat: int = 3) -> dict:
+    results = {}
+    for case in build_cases(seed):
+        if name_filter and name_filter not in case.name:
+            continue
+        iterations = max(10, case.iterations // 10) if quick else case.iterations
+        results[case.name] = run_case(case, iterations, repeat)
+        print(f"{case.name:36s} {results[case.name]['ops_per_sec']:>12,.1f} ops/s", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "quick": quick,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    baseline と比べて劣化したケース名のリストを返し、比較表を出力する。
+    ops_per_sec が (1 - tolerance) 倍未満、または p99_us / peak_kib が (1 + tolerance) 倍を超えたら劣化とみなす。
+    """
+    regressions = []
+    print(f"{'case':36s} {'ops/s':>12s} {'base':>12s} {'ratio':>7s} {'p99 ratio':>10s} {'mem ratio':>10s}")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:36s} {result['ops_per_sec']:>12,.1f} {'-':>12s}  (new)")
+            continue
+        speed = result["ops_per_sec"] / base["ops_per_sec"] if base["ops_per_sec"] else float("inf")
+        p99 = result["p99_us"] / base["p99_us"] if base["p99_us"] else 1.0
+        memory = result["peak_kib"] / base["peak_kib"] if base["peak_kib"] else 1.0
+        flags = []
+        if speed < 1 - tolerance:
+            flags.append("slower")
+        if p99 > 1 + tolerance:
+            flags.append("p99")
+        if memory > 1 + tolerance:
+            flags.append("memory")
+        if flags:
+            regressions.append(name)
+        mark = "  REGRESSION: " + ", ".join(flags) if flags else ""
+        print(f"{name:36s} {result['ops_per_sec']:>12,.1f} {base['ops_per_sec']:>12,.1f} "
+              f"{speed:>7.2f} {p99:>10.2f} {memory:>10.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", "-o", help="結果の JSON を書き出すファイル（省略時は --compare がなければ標準出力）")
+    parser.add_argument("--compare", metavar="BASELINE", help="比較対象の JSON（以前の --output）")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="劣化とみなす変化率（既定: 0.10 = 10%%）")
+    parser.add_argument("--filter", help="ケース名にこの文字列を含むものだけ計測する")
+    parser.add_argument("--quick", action="store_true", help="計測回数を 1/10 にする")
+    parser.add_argument("--repeat", type=int, default=3, help="ケースごとの計測回数。最も速い回を採用する（既定: 3）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = run_suite(seed=args.seed, name_filter=args.filter, quick=args.quick, repeat=args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    elif not args.compare:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("seed") != args.seed:
+            print(f"warning: baseline was measured with seed {baseline.get('meta', {}).get('seed')}", file=sys.stderr)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
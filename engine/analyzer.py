@@ -1,24 +1,202 @@
+import heapq
+import time
 from typing import List, Dict, Any, Set
 from models.note import Note
-from utils.interval_calc import get_interval
-from dictionaries.chord_dict import CHORD_DICT
-from engine.fallback_generator import RuleBasedGenerator
+from engine.fallback_generator import GENERATED_NAMES
+from engine.chord_lookup import CHORD_LOOKUP
+from engine.mask_tables import P5_PC_BIT, ROOTLESS_TABLE, UST_TABLE
+from engine.interpretation_cache import InterpretationCache, OffsetNameContext
+from engine.analyzer_metrics import AnalyzerMetrics
+from models.results import CATEGORIES, ChordAnalysis, ChordCandidate, KeyFreeChord
 from utils.formatter import KeyContext
 
-class ChordAnalyzer:
-    def __init__(self):
-        self.chord_dictionary = CHORD_DICT
+# ルールベース生成のスコアの上限の基準（fast モードの枝刈りに使う。基本形で、テンション1つにつき +5）
+# ルートレスは RootlessTable.max_score、UST は入力ごとに UpperStructureTable のスコアから上限を求める
+FALLBACK_BASE_SCORE = 55
+
+# ルールベース生成のクオリティ名 -> テンションによる加点（候補にしない名前は None）。名前の種類は有限なので都度埋める
+_GENERATED_BONUS: Dict[str, Any] = {}
+
 
-    def analyze(self, notes: List[Note], key: str = "C", threshold: int = 40) -> str:
+def _generated_bonus(quality: str):
+    """テンションを含む（または aug の）生成名ならテンション数 x 5 の加点、それ以外は None"""
+    if quality not in _GENERATED_BONUS:
+        bonus = None
+        if "(" in quality or "aug" in quality:
+            tension_count = quality.count(',') + 1 if "(" in quality and "omit5" not in quality else 0
+            bonus = tension_count * 5
+        _GENERATED_BONUS[quality] = bonus
+    return _GENERATED_BONUS[quality]
+
+class ChordAnalyzer:
+    def __init__(self, cache_size: int = 4096, metrics: AnalyzerMetrics = None, roughness=None,
+                 roughness_weight: float = 10.0):
+        # CHORD_DICT をビットマスク化した検索表（モジュール共通・コンパイル済み）
+        self.lookup_table = CHORD_LOOKUP
+        # ルートレス・UST 探索用の pc_mask の表（モジュール共通）
+        self.rootless_table = ROOTLESS_TABLE
+        self.ust_table = UST_TABLE
+        # ルールベース生成の名前（spell_mask ごとにメモ化。モジュール共通）
+        self.generated_names = GENERATED_NAMES
+        # 移調不変な正規形をキーにした解釈キャッシュ（cache_size=0 で無効）
+        self.cache = InterpretationCache(cache_size) if cache_size > 0 else None
+        # フェーズごとの計測（None なら計測しない）
+        self.metrics = metrics
+        # 辞書照合の累計回数（計測時はフェーズ前後の差分をとる）
+        self.dictionary_lookups = 0
+        # 候補のスコアに物理的な不協和を反映する RoughnessModel（None なら反映しない。_apply_roughness を参照）
+        self.roughness = roughness
+        self.roughness_weight = roughness_weight
+
+    @property
+    def chord_dictionary(self) -> Dict[frozenset, str]:
+        """元の CHORD_DICT（探索は lookup_table を引くので、参照されたときだけ読み込む）"""
+        from dictionaries.chord_dict import CHORD_DICT
+        return CHORD_DICT
+
+    def cache_stats(self) -> dict:
+        """解釈キャッシュのヒット・ミス・追い出し回数などを返す"""
+        return self.cache.stats() if self.cache else {}
+
+    @staticmethod
+    def _dummy_root_semitone(cand: Note, bass_note: Note) -> int:
+        """仮ルートをベースと同じオクターブに置き、ベースより上ならオクターブ下げた絶対半音数"""
+        semitone = Note.STEP_TO_SEMITONE[cand.step] + cand.alter + bass_note.octave * 12
+        if semitone > bass_note.absolute_semitone:
+            semitone -= 12
+        return semitone
+
+    def _match_dictionary(self, input_pc_mask: int, root_pc: int, root_step_index: int, root_semitone: int, sorted_notes: List[Note]):
+        """
+        仮ルートに対して辞書照合を行う。
+        戻り値: (完全一致のクオリティ, Omit5補完のクオリティ, spell_mask)
+        pcマスクの段階で辞書に形が無ければ、綴りの計算自体を省略する（spell_mask は None）
+        """
+        self.dictionary_lookups += 1
+        table = self.lookup_table
+        rel_mask = table.rotate(input_pc_mask, root_pc)
+        has_exact = table.has_shape(rel_mask)
+        has_omit5 = table.has_shape(rel_mask | P5_PC_BIT)
+        if not (has_exact or has_omit5):
+            return None, None, None
+
+        spell_mask, has_unknown = table.interval_mask(root_step_index, root_semitone, sorted_notes)
+        if has_unknown:
+            return None, None, spell_mask
+
+        quality = table.lookup(rel_mask, spell_mask) if has_exact else None
+        quality_omit = None
+        if not quality and not (spell_mask & table.P5_BIT) and has_omit5:
+            quality_omit = table.lookup(rel_mask | P5_PC_BIT, spell_mask | table.P5_BIT)
+        return quality, quality_omit, spell_mask
+
+    def analyze(self, notes: List[Note], key: str = "C", threshold: int = 40) -> ChordAnalysis:
         if not notes: return "No notes"
 
         # KeyContextの初期化
         key_context = KeyContext(key)
 
+        sorted_notes, bass_name, categorized_results = self._search_all(notes, key_context, threshold)
+        # テキストレポートは str() / .text で参照されたときに初めて組み立てる
+        return ChordAnalysis(sorted_notes, bass_name, categorized_results, threshold, self._format_output)
+    
+    def _search_all(self, notes: List[Note], key_context: KeyContext, threshold: int = 40, fast: bool = False, k: int = 1):
+        """
+        全探索フェーズを実行し、(sorted_notes, bass_name, カテゴリ別の候補) を返す。
+        fast=True なら、上位 k 件に入りえないフェーズを省略する（_run_search を参照。粗さを反映する場合は省略しない）。
+        計測が有効なら、解析1回全体の時間・候補数を phase="total" として記録する。
+        """
+        if self.roughness is not None:
+            # 粗さの減点は探索フェーズのスコアの上限を前提にした枝刈りと両立しないので、常に全フェーズを実行する
+            fast = False
+        metrics = self.metrics
+        if metrics is None:
+            return self._apply_roughness(*self._run_search(notes, key_context, threshold, fast, k))
+
+        start = time.perf_counter()
+        lookups = self.dictionary_lookups
+        sorted_notes, bass_name, categorized_results = self._apply_roughness(
+            *self._run_search(notes, key_context, threshold, fast, k))
+        candidates = [c for cands in categorized_results.values() for c in cands]
+        metrics.record("total", time.perf_counter() - start, len(candidates),
+                       sum(1 for c in candidates if c.score >= threshold), self.dictionary_lookups - lookups)
+        return sorted_notes, bass_name, categorized_results
+
+    def _apply_roughness(self, sorted_notes: List[Note], bass_name: str, categorized_results: Dict):
+        """
+        roughness が指定されていれば、各候補のスコアから「解釈のルートを鳴らしたときの濁り」を減点する。
+        ルートはベース以下で最も近い同じピッチクラスの音高（ルートレスなら仮想ルート）に置き、
+        入力の各音（ルートと同じ音高のものを除く）との粗さの合計に roughness_weight を掛けて丸めた値を引く。
+        入力の音どうしの粗さはどの解釈でも同じなので、解釈の順位を分けるのはルートと入力の音との響きになる。
+        """
+        if self.roughness is None:
+            return sorted_notes, bass_name, categorized_results
+        penalties: Dict[int, int] = {}
+        for cands in categorized_results.values():
+            for cand in cands:
+                cand.score -= self._root_penalty(penalties, sorted_notes, cand.root_pc)
+        return sorted_notes, bass_name, categorized_results
+
+    def _root_penalty(self, penalties: Dict[int, int], sorted_notes: List[Note], root_pc: int) -> int:
+        """_apply_roughness の減点（ルートのピッチクラスごとに penalties へメモ化する）"""
+        penalty = penalties.get(root_pc)
+        if penalty is None:
+            bass_semitone = sorted_notes[0].absolute_semitone
+            root = bass_semitone - (bass_semitone - root_pc) % 12
+            penalty = penalties[root_pc] = round(
+                self.roughness_weight * self.roughness.above(root, [n.absolute_semitone for n in sorted_notes]))
+        return penalty
+
+    def _run_phase(self, phase: str, threshold: int, search, *args):
+        """
+        探索フェーズを1つ実行する（args の最後から2番目がカテゴリ別の結果 dict）。
+        計測が有効なら、時間・追加された候補数・閾値以上の候補数・辞書照合回数を記録する。
+        """
+        metrics = self.metrics
+        if metrics is None:
+            search(*args)
+            return
+
+        results = args[-2]
+        sizes = {category: len(cands) for category, cands in results.items()}
+        lookups = self.dictionary_lookups
+        start = time.perf_counter()
+        search(*args)
+        elapsed = time.perf_counter() - start
+        added = [c for category, cands in results.items() for c in cands[sizes.get(category, 0):]]
+        metrics.record(phase, elapsed, len(added), sum(1 for c in added if c.score >= threshold),
+                       self.dictionary_lookups - lookups)
+
+    @staticmethod
+    def _prune_floor(results: Dict, threshold: int, k: int) -> int:
+        """これまでの候補での上位 k 件目のスコア（k 件に満たなければ閾値）。上限がこれ未満のフェーズは結果を変えない"""
+        scores = sorted((c.score for cands in results.values() for c in cands if c.score >= threshold), reverse=True)
+        return scores[k - 1] if len(scores) >= k else threshold
+
+    def _ust_upper_bound(self, input_pc_mask: int, bass_pc: int) -> int:
+        if bin(input_pc_mask).count("1") < 4:
+            return 0
+        structures = self.ust_table.structures(self.lookup_table.rotate(input_pc_mask, bass_pc))
+        return max((score for entries in structures.values() for _name, score, _bottom in entries), default=0)
+
+    @staticmethod
+    def _fallback_upper_bound(sorted_notes: List[Note]) -> int:
+        # テンションは根音と3度以外の音から1つずつ（最大7種）、"7(#5, ...)" の #5 も1つと数えられる
+        return FALLBACK_BASE_SCORE + 5 * (min(7, max(0, len(sorted_notes) - 2)) + 1)
+
+    def _run_search(self, notes: List[Note], key_context: KeyContext, threshold: int, fast: bool = False, k: int = 1):
+        """
+        各探索フェーズを実行する。
+        キャッシュが有効な場合は、ボイシングの正規形で過去の結果を引き、実際のルートと Key で綴り直す。
+
+        fast=True の場合は通常探索を先に行い、残りのフェーズはスコアの上限がその時点の上位 k 件目
+        （_prune_floor）に届かなければ実行しない。上限未満の候補は上位 k 件にも同点の並びにも影響しないため、
+        閾値以上の候補を上位から k 件取り出した結果は全探索と一致する（カテゴリ別の候補一覧は一部が欠ける）。
+        キャッシュ経由では、通常探索・UST・ルールベース生成は1つのエントリとしてまとめて保持するため常に実行し、
+        省略するのはルートレス探索だけになる。
+        """
         sorted_notes = sorted(notes, key=lambda n: n.absolute_semitone)
         bass_note = sorted_notes[0]
-        
-        # ★ 旧コード（bass_alter_str = ... など）を削除し、KeyContextに任せる
         bass_name = key_context.get_note_name(bass_note.pitch_class)
 
         spread = sorted_notes[-1].absolute_semitone - sorted_notes[0].absolute_semitone
@@ -27,147 +205,207 @@ class ChordAnalyzer:
         input_pcs = {n.pitch_class for n in sorted_notes}
         unique_cands = {n.pitch_class: n for n in sorted_notes}
 
-        categorized_results = {
-            "基本形 (Root Position)": [],
-            "転回形 (Inversion)": [],
-            "オンコード (On-Chord)": [],
-            "ルートレス (Rootless)": [],
-            "特殊形 (Special)": []
-        }
-
-        # 各探索フェーズの実行（今後フェーズが増えたらここに足す）
-        self._search_normal(sorted_notes, unique_cands, bass_note, bass_name, voicing_type, categorized_results, key_context)
-        self._search_rootless(sorted_notes, input_pcs, bass_note, bass_name, voicing_type, categorized_results, key_context)
-        self._search_ust_and_polychord(sorted_notes, unique_cands, input_pcs, bass_note, bass_name, voicing_type, categorized_results, key_context)
-        self._search_fallback_rulebased(sorted_notes, unique_cands, bass_note, bass_name, voicing_type, categorized_results, key_context)
-        # analyzeの最後をこう変えると、自動化の時に楽になります
-        return self._format_output(sorted_notes, bass_name, categorized_results, threshold), categorized_results
-    
+        categorized_results = {category: [] for category in CATEGORIES}
+        input_pc_mask = self.lookup_table.input_pc_mask(sorted_notes)
+        # ルートレス探索は、辞書の形になりうる仮想ルートがあるときだけ候補を出しうる
+        rootless_bound = self.rootless_table.max_score if self.rootless_table.roots(input_pc_mask) else 0
+
+        if self.cache is None:
+            # 各探索フェーズの実行（今後フェーズが増えたらここに足す）
+            # ルートレス探索は「ルートレス」カテゴリにしか書かないため、UST の後に回しても候補の並びは変わらない
+            results = categorized_results
+            self._run_phase("normal", threshold, self._search_normal, sorted_notes, unique_cands, bass_note, bass_name, voicing_type, results, key_context)
+            if not fast or self._ust_upper_bound(input_pc_mask, bass_note.pitch_class) >= self._prune_floor(results, threshold, k):
+                self._run_phase("ust_polychord", threshold, self._search_ust_and_polychord, sorted_notes, unique_cands, input_pcs, bass_note, bass_name, voicing_type, results, key_context)
+            if not fast or rootless_bound >= self._prune_floor(results, threshold, k):
+                self._run_phase("rootless", threshold, self._search_rootless, sorted_notes, input_pcs, bass_note, bass_name, voicing_type, results, key_context)
+            if not fast or self._fallback_upper_bound(sorted_notes) >= self._prune_floor(results, threshold, k):
+                self._run_phase("fallback_rulebased", threshold, self._search_fallback_rulebased, sorted_notes, unique_cands, bass_note, bass_name, voicing_type, results, key_context)
+            return sorted_notes, bass_name, categorized_results
+
+        # キャッシュ経由: 探索はベース相対のテンプレート名で行い、結果を綴り直して使う
+        # （ルートレスの候補は「ルートレス」カテゴリにしか入らないため、別キーで保持しても候補の並びは変わらない）
+        bass_pc = bass_note.pitch_class
+        shape_entry = self._shape_entry(sorted_notes, unique_cands, input_pcs, bass_note, voicing_type, threshold)
+        self.cache.render(shape_entry, categorized_results, key_context, bass_pc, sorted_notes)
+
+        if fast and rootless_bound < self._prune_floor(categorized_results, threshold, k):
+            return sorted_notes, bass_name, categorized_results
+
+        rootless_entry = self._rootless_entry(sorted_notes, input_pcs, bass_note, voicing_type, threshold)
+        self.cache.render(rootless_entry, categorized_results, key_context, bass_pc, sorted_notes)
+        return sorted_notes, bass_name, categorized_results
+
+    def _shape_entry(self, sorted_notes: List[Note], unique_cands: Dict[int, Note], input_pcs: Set[int], bass_note: Note,
+                     voicing_type: str, threshold: int) -> tuple:
+        """
+        通常探索・UST・ルールベース生成の候補を、ベース相対のテンプレート名で探索して凍結したもの（Key に依存しない）。
+        キャッシュが有効ならボイシングの正規形をキーに共有する。
+        """
+        bass_pc = bass_note.pitch_class
+        cache = self.cache
+        if cache is not None:
+            root_offsets = tuple(self._dummy_root_semitone(cand, bass_note) - bass_note.absolute_semitone for cand in unique_cands.values())
+            shape_key = cache.shape_key(sorted_notes, root_offsets)
+            entry = cache.get(shape_key)
+            if entry is not None:
+                return entry
+
+        template_context = OffsetNameContext(bass_pc)
+        template_bass = template_context.get_note_name(bass_pc)
+        fresh = {category: [] for category in CATEGORIES}
+        self._run_phase("normal", threshold, self._search_normal, sorted_notes, unique_cands, bass_note, template_bass, voicing_type, fresh, template_context)
+        self._run_phase("ust_polychord", threshold, self._search_ust_and_polychord, sorted_notes, unique_cands, input_pcs, bass_note, template_bass, voicing_type, fresh, template_context)
+        self._run_phase("fallback_rulebased", threshold, self._search_fallback_rulebased, sorted_notes, unique_cands, bass_note, template_bass, voicing_type, fresh, template_context)
+        entry = InterpretationCache.freeze(fresh, bass_pc)
+        if cache is not None:
+            cache.put(shape_key, entry)
+        return entry
+
+    def _rootless_entry(self, sorted_notes: List[Note], input_pcs: Set[int], bass_note: Note, voicing_type: str,
+                        threshold: int) -> tuple:
+        """ルートレス探索の候補を _shape_entry と同じ形で（キャッシュは音名の文字を含む別キーで）求める"""
+        bass_pc = bass_note.pitch_class
+        cache = self.cache
+        if cache is not None:
+            rootless_key = cache.rootless_key(sorted_notes)
+            entry = cache.get(rootless_key)
+            if entry is not None:
+                return entry
+
+        template_context = OffsetNameContext(bass_pc)
+        fresh = {"ルートレス (Rootless)": []}
+        self._run_phase("rootless", threshold, self._search_rootless, sorted_notes, input_pcs, bass_note,
+                        template_context.get_note_name(bass_pc), voicing_type, fresh, template_context)
+        entry = InterpretationCache.freeze(fresh, bass_pc)
+        if cache is not None:
+            cache.put(rootless_key, entry)
+        return entry
+
+    def analyze_key_free(self, notes: List[Note], threshold: int = 40, k: int = 1) -> KeyFreeChord:
+        """
+        Key に依存しない解析。探索はベース相対のテンプレート名で行い（キャッシュが有効なら get_best_interpretation と共有）、
+        綴りは返した KeyFreeChord の candidate(key) / candidates(key, k) で Key ごとに後から付ける。
+        上位 k 件までは get_best_interpretation / get_top_interpretations(notes, k, key, threshold) と同じ解釈・スコア・名前になる
+        （上位 k 件に入りえないルートレス探索は省略する）。
+        """
+        sorted_notes = sorted(notes, key=lambda n: n.absolute_semitone)
+        bass_note = sorted_notes[0]
+        voicing_type = "Open" if sorted_notes[-1].absolute_semitone - bass_note.absolute_semitone > 12 else "Closed"
+        input_pcs = {n.pitch_class for n in sorted_notes}
+        unique_cands = {n.pitch_class: n for n in sorted_notes}
+
+        entries = self._shape_entry(sorted_notes, unique_cands, input_pcs, bass_note, voicing_type, threshold)
+        # ルートレス探索は、上位 k 件に届きうるときだけ行う（粗さを反映する場合は減点で順位が変わりうるので常に行う）
+        rootless_bound = self.rootless_table.max_score if self.rootless_table.roots(self.lookup_table.input_pc_mask(sorted_notes)) else 0
+        scores = sorted((entry[2] for entry in entries if entry[2] >= threshold), reverse=True)
+        floor = scores[k - 1] if len(scores) >= k else threshold
+        if self.roughness is not None or rootless_bound >= floor:
+            entries = entries + self._rootless_entry(sorted_notes, input_pcs, bass_note, voicing_type, threshold)
+
+        if self.roughness is not None:
+            penalties: Dict[int, int] = {}
+            bass_pc = bass_note.pitch_class
+            entries = tuple((category, template, score - self._root_penalty(penalties, sorted_notes, (bass_pc + offset) % 12),
+                             offset, quality, is_ust)
+                            for category, template, score, offset, quality, is_ust in entries)
+        return KeyFreeChord(sorted_notes, bass_note.pitch_class, threshold, entries)
+
     def _search_fallback_rulebased(self, sorted_notes: List[Note], unique_cands: dict, bass_note: Note, bass_name: str, voicing_type: str, results: dict, key_context: KeyContext):
         """辞書にないテンションの組み合わせを動的生成する"""
+        input_pc_mask = self.lookup_table.input_pc_mask(sorted_notes)
         for root_pc, cand in unique_cands.items():
-            dummy_root = Note(cand.step, cand.alter, bass_note.octave)
-            if dummy_root.absolute_semitone > bass_note.absolute_semitone:
-                dummy_root.octave -= 1
-                
-            intervals = {get_interval(dummy_root, note) for note in sorted_notes}
-            # 修正後のコード
-            root_name = key_context.get_note_name(root_pc)
-            is_root_pos = (root_pc == bass_note.pitch_class)
+            root_semitone = self._dummy_root_semitone(cand, bass_note)
+            quality, quality_omit, spell_mask = self._match_dictionary(input_pc_mask, root_pc, cand.step_index, root_semitone, sorted_notes)
 
-            if self.chord_dictionary.get(frozenset(intervals)):
+            # 辞書（完全一致・Omit5補完）で解釈できるものは通常探索に任せる
+            if quality or quality_omit:
                 continue
-            
-            intervals_with_p5 = set(intervals)
-            intervals_with_p5.add('P5')
-            if 'P5' not in intervals and self.chord_dictionary.get(frozenset(intervals_with_p5)):
+
+            if spell_mask is None:
+                spell_mask, _ = self.lookup_table.interval_mask(cand.step_index, root_semitone, sorted_notes)
+
+            # ★ 変更点：複数の解釈（表記ブレ）をリストで受け取る（インターバルの組み合わせごとに共有の表から引く）
+            generated_qualities = self.generated_names.names(spell_mask)
+            if not generated_qualities:
                 continue
+            root_name = key_context.get_note_name(root_pc)
+            is_root_pos = (root_pc == bass_note.pitch_class)
 
-            # ★ 変更点：複数の解釈（表記ブレ）をリストで受け取る
-            generated_qualities = RuleBasedGenerator.generate_chord_names(intervals)
-            
             for generated_quality in generated_qualities:
                 # テンションが含まれている、または特殊な表記の場合
-                if "(" in generated_quality or "aug" in generated_quality:
+                tension_bonus = _generated_bonus(generated_quality)
+                if tension_bonus is not None:
                     category = self._get_category(is_root_pos, False, generated_quality, root_pc, bass_note)
                     
-                    score = 55 if is_root_pos else 35 
-                    tension_count = generated_quality.count(',') + 1 if "(" in generated_quality and "omit5" not in generated_quality else 0
-                    score += tension_count * 5
+                    score = (55 if is_root_pos else 35) + tension_bonus
 
                     name = f"{root_name} {generated_quality}" if is_root_pos else f"{root_name} {generated_quality} / {bass_name}"
                     
-                    if not any(r['name'].startswith(name) for r in results[category]):
-                        results[category].append({
-                            "name": f"{name} ({voicing_type}) [生成]", 
-                            "score": score,
-                            "root_pc": root_pc,            # 追加
-                            "quality": generated_quality,   # 追加
-                            "notes": sorted_notes          # 追加
-                        })
+                    if not any(r.name.startswith(name) for r in results[category]):
+                        results[category].append(ChordCandidate(
+                            category, score, root_pc, generated_quality, sorted_notes,
+                            name=f"{name} ({voicing_type}) [生成]"
+                        ))
 
     def _search_ust_and_polychord(self, sorted_notes: List[Note], unique_cands: Dict[int, Note], input_pcs: Set[int], bass_note: Note, bass_name: str, voicing_type: str, results: Dict, key_context: KeyContext):
-        """アッパーストラクチャートライアド（UST）およびポリコードの分割探索"""
+        """
+        アッパーストラクチャートライアド（UST）およびポリコードの分割探索。
+        成立する上部トライアドと下部の音は UpperStructureTable からベース相対の pc_mask で引き、
+        下部のクオリティは各ピッチクラスの最低音のインターバル（フラグ）の OR で決める。
+        """
         if len(input_pcs) < 4:
             return
 
-        triads = {
-            "Major": [0, 4, 7],
-            "Minor": [0, 3, 7],
-            "Aug": [0, 4, 8],
-            "Dim": [0, 3, 6]
-        }
-
         bottom_root_pc = bass_note.pitch_class
         bottom_cand = unique_cands.get(bottom_root_pc)
         if not bottom_cand:
             return
 
-        bottom_dummy_root = Note(bottom_cand.step, bottom_cand.alter, bass_note.octave)
-        if bottom_dummy_root.absolute_semitone > bass_note.absolute_semitone:
-            bottom_dummy_root.octave -= 1
+        table = self.ust_table
+        structures = table.structures(self.lookup_table.rotate(self.lookup_table.input_pc_mask(sorted_notes), bottom_root_pc))
+        if not structures:
+            return
+
+        # 下部のルート（ベースと同じピッチクラスの綴り）から見た、各ピッチクラスの最低音のインターバルのフラグ
+        root_semitone = self._dummy_root_semitone(bottom_cand, bass_note)
+        root_step_index = bottom_cand.step_index
+        flags_by_offset = {}
+        for note in sorted_notes:
+            offset = (note.pitch_class - bottom_root_pc) % 12
+            if offset not in flags_by_offset:
+                flags_by_offset[offset] = table.interval_flag((note.step_index - root_step_index) % 7,
+                                                              (note.absolute_semitone - root_semitone) % 12)
+
+        for top_pc in unique_cands:
+            entries = structures.get((top_pc - bottom_root_pc) % 12)
+            if not entries:
+                continue
 
-        for top_pc, top_cand in unique_cands.items():
-            if top_pc == bottom_root_pc:
-                continue 
+            for triad_name, score, bottom_mask in entries:
+                flags = 0
+                for offset, flag in flags_by_offset.items():
+                    if bottom_mask >> offset & 1:
+                        flags |= flag
+                bottom_quality = table.bottom_quality[flags]
 
-            for triad_name, intervals_semi in triads.items():
-                top_triad_pcs = {(top_pc + i) % 12 for i in intervals_semi}
-                
-                if top_triad_pcs.issubset(input_pcs):
-                    bottom_pcs = input_pcs - top_triad_pcs
-                    bottom_pcs.add(bottom_root_pc) 
-
-                    bottom_intervals = set()
-                    for pc in bottom_pcs:
-                        note_for_interval = next((n for n in sorted_notes if n.pitch_class == pc), None)
-                        if note_for_interval:
-                            interval = get_interval(bottom_dummy_root, note_for_interval)
-                            if interval[1:] in ['9', '11', '13']:
-                                interval = f"{interval[0]}{int(interval[1:]) - 7}"
-                            bottom_intervals.add(interval)
-
-                    has_M3 = 'M3' in bottom_intervals
-                    has_m3 = 'm3' in bottom_intervals
-                    has_m7 = 'm7' in bottom_intervals
-                    has_M7 = 'M7' in bottom_intervals
-
-                    bottom_quality = None
-                    if has_M3 and has_m7: bottom_quality = "7"
-                    elif has_m3 and has_m7: bottom_quality = "m7"
-                    elif has_M3 and has_M7: bottom_quality = "Maj7"
-                    elif has_m3 and 'd5' in bottom_intervals and has_m7: bottom_quality = "m7b5"
-                    elif has_M3: bottom_quality = "" # Major
-                    elif has_m3: bottom_quality = "m"
-
-                    if bottom_quality is not None:
-                        # --- ★ 変更点: KeyContext を使ってフォーマットする ---
-                        top_name = key_context.get_note_name(top_pc)
-                        top_chord_name = top_name if triad_name == "Major" else f"{top_name} {triad_name}"
-
-                        bottom_name = key_context.get_note_name(bottom_root_pc)
-
-                        ust_name = f"{top_chord_name} / {bottom_name}{bottom_quality}"
-                        
-                        root_diff = (top_pc - bottom_root_pc) % 12
-                        score = 70 
-                        
-                        if root_diff in [2, 3, 6, 9] and triad_name in ["Major", "Minor"]:
-                            score += 15 
-                            
-                        if triad_name in ["Aug", "Dim"]:
-                            score -= 10 
-                        
-                        if not any(r['name'].startswith(ust_name) for r in results["特殊形 (Special)"]):
-                            # 修正後:
-                            results["特殊形 (Special)"].append({
-                                "name": f"{ust_name} (UST) ({voicing_type})",
-                                "score": score,
-                                "root_pc": bottom_root_pc, # ボトムのルート（C7のCなど）
-                                "quality": bottom_quality,  # ボトムのクオリティ（7 など）
-                                "notes": sorted_notes,
-                                "is_ust": True             # オプションでUSTフラグを持たせても便利です
-                            })
+                if bottom_quality is not None:
+                    top_name = key_context.get_note_name(top_pc)
+                    top_chord_name = top_name if triad_name == "Major" else f"{top_name} {triad_name}"
+
+                    bottom_name = key_context.get_note_name(bottom_root_pc)
+
+                    ust_name = f"{top_chord_name} / {bottom_name}{bottom_quality}"
+
+                    if not any(r.name.startswith(ust_name) for r in results["特殊形 (Special)"]):
+                        results["特殊形 (Special)"].append(ChordCandidate(
+                            "特殊形 (Special)", score,
+                            bottom_root_pc,  # ボトムのルート（C7のCなど）
+                            bottom_quality,  # ボトムのクオリティ（7 など）
+                            sorted_notes,
+                            name=f"{ust_name} (UST) ({voicing_type})",
+                            is_ust=True
+                        ))
 
     def _calculate_inversion_penalty(self, bass_interval: int) -> int:
         """
@@ -199,17 +437,17 @@ class ChordAnalyzer:
             return "オンコード (On-Chord)"
 
     def _search_normal(self, sorted_notes: List[Note], unique_cands: Dict[int, Note], bass_note: Note, bass_name: str, voicing_type: str, results: Dict, key_context: KeyContext):
+        input_pc_mask = self.lookup_table.input_pc_mask(sorted_notes)
         for root_pc, cand in unique_cands.items():
-            dummy_root = Note(cand.step, cand.alter, bass_note.octave)
-            if dummy_root.absolute_semitone > bass_note.absolute_semitone:
-                dummy_root.octave -= 1
-                
-            intervals = {get_interval(dummy_root, note) for note in sorted_notes}
+            root_semitone = self._dummy_root_semitone(cand, bass_note)
+            quality, quality_omit, _ = self._match_dictionary(input_pc_mask, root_pc, cand.step_index, root_semitone, sorted_notes)
+            if not (quality or quality_omit):
+                continue
+
             root_name = key_context.get_note_name(root_pc)
             is_root_pos = (root_pc == bass_note.pitch_class)
             
             # A. 完全一致
-            quality = self.chord_dictionary.get(frozenset(intervals))
             if quality:
                 category = self._get_category(is_root_pos, False, quality, root_pc, bass_note)
                 
@@ -224,108 +462,82 @@ class ChordAnalyzer:
                     score = 80 - self._calculate_inversion_penalty(bass_interval)
                     name = f"{root_name} {quality} / {bass_name}"
                 
-                results[category].append({
-                    "name": f"{name} ({voicing_type})",
-                    "score": score,
-                    "root_pc": root_pc,
-                    "quality": quality,
-                    "notes": sorted_notes
-                })
+                results[category].append(ChordCandidate(
+                    category, score, root_pc, quality, sorted_notes,
+                    name=f"{name} ({voicing_type})"
+                ))
             
             # B. Omit5 補完
-            else:
-                if 'P5' not in intervals:
-                    intervals_with_p5 = set(intervals)
-                    intervals_with_p5.add('P5')
-                    quality_omit = self.chord_dictionary.get(frozenset(intervals_with_p5))
-                    
-                    if quality_omit:
-                        category = self._get_category(is_root_pos, False, quality_omit, root_pc, bass_note)
+            elif quality_omit:
+                category = self._get_category(is_root_pos, False, quality_omit, root_pc, bass_note)
                         
-                        if is_root_pos:
-                            score = 65
-                            name = f"{root_name} {quality_omit}(omit5)"
-                        else:
-                            bass_interval = (bass_note.pitch_class - root_pc) % 12
-                            score = 65 - self._calculate_inversion_penalty(bass_interval)
-                            name = f"{root_name} {quality_omit}(omit5) / {bass_name}"
+                if is_root_pos:
+                    score = 65
+                    name = f"{root_name} {quality_omit}(omit5)"
+                else:
+                    bass_interval = (bass_note.pitch_class - root_pc) % 12
+                    score = 65 - self._calculate_inversion_penalty(bass_interval)
+                    name = f"{root_name} {quality_omit}(omit5) / {bass_name}"
                             
-                        results[category].append({
-                            "name": f"{name} ({voicing_type})",
-                            "score": score,
-                            "root_pc": root_pc,
-                            "quality": quality_omit,
-                            "notes": sorted_notes
-                        })
+                results[category].append(ChordCandidate(
+                    category, score, root_pc, quality_omit, sorted_notes,
+                    name=f"{name} ({voicing_type})"
+                ))
 
     def _search_rootless(self, sorted_notes: List[Note], input_pcs: Set[int], bass_note: Note, bass_name: str, voicing_type: str, results: Dict, key_context: KeyContext):
-        missing_pcs = [pc for pc in range(12) if pc not in input_pcs]
+        """
+        構成音にないピッチクラスを仮想ルート（C + 変化記号で綴り、ベースの直下に置く）として辞書と照合する。
+        仮想ルートの候補は RootlessTable で pc_mask から絞り、綴りは通常探索と同じ spell_mask で判定する。
+        """
+        table = self.lookup_table
+        rootless = self.rootless_table
+        input_pc_mask = table.input_pc_mask(sorted_notes)
+        bass_semitone = bass_note.absolute_semitone
+        lookups = 0
+
+        for phantom_pc in rootless.roots(input_pc_mask):
+            root_semitone = phantom_pc + bass_note.octave * 12  # Note('C', phantom_pc, ベースのオクターブ)
+            if root_semitone > bass_semitone:
+                root_semitone -= 12
+
+            spell_mask, has_unknown = table.interval_mask(0, root_semitone, sorted_notes)
+            if has_unknown:
+                continue
+            spell_mask |= table.P1_BIT
+            rel_mask = table.rotate(input_pc_mask, phantom_pc) | 1
 
-        for phantom_pc in missing_pcs:
-            phantom_root = Note('C', phantom_pc, bass_note.octave)
-            if phantom_root.absolute_semitone > bass_note.absolute_semitone:
-                phantom_root.octave -= 1
-                
-            intervals = {'P1'}
-            for note in sorted_notes:
-                intervals.add(get_interval(phantom_root, note))
-                
-            quality = self.chord_dictionary.get(frozenset(intervals))
+            quality = table.lookup(rel_mask, spell_mask)
+            lookups += 1
             is_omit5 = False
-            
-            if not quality and 'P5' not in intervals:
-                intervals_with_p5 = set(intervals)
-                intervals_with_p5.add('P5')
-                quality = self.chord_dictionary.get(frozenset(intervals_with_p5))
+
+            if not quality and not spell_mask & table.P5_BIT:
+                quality = table.lookup(rel_mask | P5_PC_BIT, spell_mask | table.P5_BIT)
+                lookups += 1
                 if quality: is_omit5 = True
 
-            if quality and any(ext in quality for ext in ['7', '9', '11', '13', 'dim']):
+            tension_bonus = rootless.bonus.get(quality) if quality else None
+            if tension_bonus is not None:
                 root_name = key_context.get_note_name(phantom_pc)
-                
-                tension_bonus = 0
-                if '9' in quality: tension_bonus += 10
-                if '11' in quality: tension_bonus += 15
-                if '13' in quality: tension_bonus += 20
-                
+
                 score = 30 + tension_bonus - (10 if is_omit5 else 0)
                 omit_str = "(omit5)" if is_omit5 else ""
                 name = f"{root_name} {quality}{omit_str}(Rootless) / {bass_name}"
-                results["ルートレス (Rootless)"].append({
-                    "name": f"{name} ({voicing_type})", 
-                    "score": score,
-                    "root_pc": phantom_pc,      # ★ 生データを追加
-                    "quality": quality,      # ★ 生データを追加
-                    "notes": sorted_notes    # ★ 生データを追加
-                })
-
-    def get_best_interpretation(self, notes: List[Note], key: str = "C", threshold: int = 40):
+                results["ルートレス (Rootless)"].append(ChordCandidate(
+                    "ルートレス (Rootless)", score, phantom_pc, quality, sorted_notes,
+                    name=f"{name} ({voicing_type})"
+                ))
+        self.dictionary_lookups += lookups
+
+    def get_best_interpretation(self, notes: List[Note], key: str = "C", threshold: int = 40, fast: bool = False):
         """
         全探索フェーズの結果から、最もスコアの高い解釈を1つだけデータとして返す
+        fast=True なら、最良の候補を超えられないフェーズを省略する（結果は同じ）
         """
         # KeyContextの初期化（内部の解析で使用）
         key_context = KeyContext(key)
-        
-        sorted_notes = sorted(notes, key=lambda n: n.absolute_semitone)
-        bass_note = sorted_notes[0]
-        bass_name = key_context.get_note_name(bass_note.pitch_class)
-        spread = sorted_notes[-1].absolute_semitone - sorted_notes[0].absolute_semitone
-        voicing_type = "Open" if spread > 12 else "Closed"
-        input_pcs = {n.pitch_class for n in sorted_notes}
-        unique_cands = {n.pitch_class: n for n in sorted_notes}
-
-        results_container = {
-            "基本形 (Root Position)": [],
-            "転回形 (Inversion)": [],
-            "オンコード (On-Chord)": [],
-            "ルートレス (Rootless)": [],
-            "特殊形 (Special)": []
-        }
 
         # 各探索フェーズを実行して結果を溜める
-        self._search_normal(sorted_notes, unique_cands, bass_note, bass_name, voicing_type, results_container, key_context)
-        self._search_rootless(sorted_notes, input_pcs, bass_note, bass_name, voicing_type, results_container, key_context)
-        self._search_ust_and_polychord(sorted_notes, unique_cands, input_pcs, bass_note, bass_name, voicing_type, results_container, key_context)
-        self._search_fallback_rulebased(sorted_notes, unique_cands, bass_note, bass_name, voicing_type, results_container, key_context)
+        _, _, results_container = self._search_all(notes, key_context, threshold, fast=fast)
 
         # 全カテゴリーから候補をフラットなリストに集める
         all_candidates = []
@@ -333,32 +545,56 @@ class ChordAnalyzer:
             all_candidates.extend(cat_list)
         
         # 閾値以上の候補をスコア順にソート
-        valid_candidates = [c for c in all_candidates if c['score'] >= threshold]
+        valid_candidates = [c for c in all_candidates if c.score >= threshold]
         
         if not valid_candidates:
             return None
             
         # スコアが高い順、かつ同じスコアなら「基本形」が優先されるようにソート
-        valid_candidates.sort(key=lambda x: x['score'], reverse=True)
+        valid_candidates.sort(key=lambda x: x.score, reverse=True)
         
         return valid_candidates[0]
     
+    def get_top_interpretations(self, notes: List[Note], k: int = 3, key: str = "C", threshold: int = 40,
+                                fast: bool = False) -> List[ChordCandidate]:
+        """
+        閾値以上の解釈をスコアの高い順に最大 k 件返す（同点の並びは get_best_interpretation と同じ）。
+        fast=True なら、上位 k 件に入りえないフェーズを省略する（結果は同じ）
+        """
+        if k <= 0:
+            return []
+        key_context = KeyContext(key)
+        _, _, results_container = self._search_all(notes, key_context, threshold, fast=fast, k=k)
+        candidates = (c for cat_list in results_container.values() for c in cat_list if c.score >= threshold)
+        # nlargest は安定（同点は出現順）で、k 件のヒープだけを保持する
+        return heapq.nlargest(k, candidates, key=lambda c: c.score)
+
+    def analyze_many(self, semitones, mask=None, steps=None, key: str = "C", threshold: int = 40):
+        """
+        (N, max_voices) の絶対半音数配列をまとめて解析するバッチ版 get_best_interpretation。
+        NumPy が必要なため、バッチ解析器は初回呼び出し時に読み込む。
+        """
+        if getattr(self, "_batch_analyzer", None) is None:
+            from engine.batch_analyzer import BatchChordAnalyzer
+            self._batch_analyzer = BatchChordAnalyzer(self)
+        return self._batch_analyzer.analyze_many(semitones, mask=mask, steps=steps, key=key, threshold=threshold)
+
     def _format_output(self, sorted_notes: List[Note], bass_name: str, categorized_results: Dict, threshold: int) -> str:
         notes_str = ", ".join(str(n) for n in sorted_notes)
         output_lines = [f"Input: [{notes_str}] (Bass: {bass_name})", "-"*40]
         
         has_results = False
         for category, results in categorized_results.items():
-            filtered_results = sorted([r for r in results if r['score'] >= threshold], key=lambda x: x['score'], reverse=True)
+            filtered_results = sorted([r for r in results if r.score >= threshold], key=lambda x: x.score, reverse=True)
             
             if filtered_results:
                 has_results = True
                 output_lines.append(f"■ {category}")
                 seen = set()
                 for res in filtered_results:
-                    if res['name'] not in seen:
-                        seen.add(res['name'])
-                        output_lines.append(f"  - {res['name']} [Score: {res['score']}]")
+                    if res.name not in seen:
+                        seen.add(res.name)
+                        output_lines.append(f"  - {res.name} [Score: {res.score}]")
 
         if not has_results:
             output_lines.append(f"Analyzed: Unknown (No interpretation scored above {threshold})")
@@ -0,0 +1,122 @@
+# engine/analyzer_metrics.py
+"""
+ChordAnalyzer の探索フェーズごとの計測（オプトイン）。
+
+    metrics = AnalyzerMetrics()
+    analyzer = ChordAnalyzer(metrics=metrics)   # または analyzer.metrics = metrics
+    ...
+    json.dumps(metrics.to_dict())
+    print(metrics.to_prometheus())
+
+フェーズ（normal / rootless / ust_polychord / fallback_rulebased）ごとに
+実行回数・生成した候補数・閾値以上の候補数・辞書照合回数をカウンタとして、
+1回あたりの時間と候補数をヒストグラムとして集計する。解析1回全体の時間は phase="total" に入る。
+解釈キャッシュがヒットして実行されなかったフェーズは数えない。
+metrics が None（既定）のときは ChordAnalyzer 側で分岐するだけなので、計測のコストはかからない。
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence
+
+PHASES = ["normal", "rootless", "ust_polychord", "fallback_rulebased"]
+
+# ヒストグラムのバケット（上限値。最後に +Inf が付く）
+DURATION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+CANDIDATE_BUCKETS = (0, 1, 2, 4, 8, 16, 32)
+
+# カウンタ名 -> 説明（Prometheus の HELP 行にも使う）
+COUNTERS = {
+    "calls": "Number of times the phase ran.",
+    "candidates": "Candidates generated by the phase.",
+    "candidates_above_threshold": "Generated candidates whose score reached the threshold.",
+    "dictionary_lookups": "Chord dictionary lookups made by the phase.",
+}
+
+
+class Histogram:
+    """累積しない（バケットごとの）度数と合計を持つ固定バケットのヒストグラム"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # 最後は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Prometheus 形式の累積度数（le ごと）"""
+        total = 0
+        result = []
+        for c in self.counts:
+            total += c
+            result.append(total)
+        return result
+
+    def to_dict(self) -> dict:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {"buckets": dict(zip(labels, self.cumulative())), "sum": self.sum, "count": self.count}
+
+
+class AnalyzerMetrics:
+    """ChordAnalyzer の探索フェーズごとのカウンタとヒストグラム"""
+
+    def __init__(self, duration_buckets: Sequence[float] = DURATION_BUCKETS,
+                 candidate_buckets: Sequence[float] = CANDIDATE_BUCKETS):
+        self.duration_buckets = tuple(duration_buckets)
+        self.candidate_buckets = tuple(candidate_buckets)
+        self.reset()
+
+    def reset(self):
+        self.counters: Dict[str, Dict[str, int]] = {phase: dict.fromkeys(COUNTERS, 0) for phase in PHASES + ["total"]}
+        self.durations: Dict[str, Histogram] = {phase: Histogram(self.duration_buckets) for phase in PHASES + ["total"]}
+        self.candidate_counts: Dict[str, Histogram] = {phase: Histogram(self.candidate_buckets) for phase in PHASES + ["total"]}
+
+    def record(self, phase: str, seconds: float, candidates: int, above_threshold: int, lookups: int):
+        """1回分の結果を記録する（phase="total" は解析1回全体）"""
+        counters = self.counters[phase]
+        counters["calls"] += 1
+        counters["candidates"] += candidates
+        counters["candidates_above_threshold"] += above_threshold
+        counters["dictionary_lookups"] += lookups
+        self.durations[phase].observe(seconds)
+        self.candidate_counts[phase].observe(candidates)
+
+    # --- 出力 ---
+    def to_dict(self) -> dict:
+        """JSON にそのまま変換できる dict"""
+        return {
+            phase: {
+                **self.counters[phase],
+                "duration_seconds": self.durations[phase].to_dict(),
+                "candidates_per_call": self.candidate_counts[phase].to_dict(),
+            }
+            for phase in self.counters
+        }
+
+    def to_prometheus(self, prefix: str = "chord_analyzer") -> str:
+        """Prometheus のテキスト形式（exposition format）"""
+        lines = []
+        for name, help_text in COUNTERS.items():
+            metric = f"{prefix}_phase_{name}_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for phase, counters in self.counters.items():
+                lines.append(f'{metric}{{phase="{phase}"}} {counters[name]}')
+
+        for metric, help_text, histograms in [
+            (f"{prefix}_phase_duration_seconds", "Wall time of one phase run.", self.durations),
+            (f"{prefix}_phase_candidates", "Candidates generated by one phase run.", self.candidate_counts),
+        ]:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for phase, histogram in histograms.items():
+                labels = [repr(float(b)) for b in histogram.buckets] + ["+Inf"]
+                for le, count in zip(labels, histogram.cumulative()):
+                    lines.append(f'{metric}_bucket{{phase="{phase}",le="{le}"}} {count}')
+                lines.append(f'{metric}_sum{{phase="{phase}"}} {histogram.sum!r}')
+                lines.append(f'{metric}_count{{phase="{phase}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
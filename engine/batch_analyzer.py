@@ -0,0 +1,322 @@
+# engine/batch_analyzer.py
+from typing import Dict, List, Optional
+import numpy as np
+
+from models.note import Note
+from engine.chord_lookup import CHORD_LOOKUP
+from engine.fallback_generator import GENERATED_NAMES
+from utils.formatter import KeyContext
+
+CATEGORY_NAMES = [
+    "基本形 (Root Position)",
+    "転回形 (Inversion)",
+    "オンコード (On-Chord)",
+    "ルートレス (Rootless)",
+    "特殊形 (Special)",
+]
+CAT_ROOT, CAT_INVERSION, CAT_ON_CHORD, CAT_ROOTLESS, CAT_SPECIAL = range(5)
+
+# get_best_interpretation の安定ソートと同じ順序（スコア → カテゴリ → 探索フェーズ → フェーズ内の順番）で比較するための重み
+PHASE_NORMAL, PHASE_ROOTLESS, PHASE_UST = range(3)
+_ORDER_SPAN = 1000
+_PHASE_SPAN = _ORDER_SPAN * 100
+_CATEGORY_SPAN = _PHASE_SPAN * 10
+_SCORE_SPAN = _CATEGORY_SPAN * 10
+
+STEP_BASE = np.array([0, 2, 4, 5, 7, 9, 11], dtype=np.int64)  # C D E F G A B
+STEP_NAMES = "CDEFGAB"
+
+# ChordAnalyzer._calculate_inversion_penalty をベースのインターバル(0~11)で引ける表にしたもの
+INVERSION_PENALTY = np.array([20, 20, 20, 5, 5, 20, 15, 10, 15, 20, 15, 15], dtype=np.int64)
+INVERSION_INTERVALS = np.zeros(12, dtype=bool)
+INVERSION_INTERVALS[[3, 4, 6, 7, 8, 10, 11]] = True
+
+# UST の上部トライアド（ChordAnalyzer._search_ust_and_polychord と同じ順序）
+UST_TRIADS = [("Major", (0, 4, 7)), ("Minor", (0, 3, 7)), ("Aug", (0, 4, 8)), ("Dim", (0, 3, 6))]
+UST_QUALITIES = ["7", "m7", "Maj7", "m7b5", "", "m"]
+
+
+class BatchChordAnalyzer:
+    """
+    (N, max_voices) の絶対半音数配列をまとめて解析する、ChordAnalyzer.get_best_interpretation のバッチ版。
+    通常探索・Omit5補完・ルートレス・UST の各フェーズを NumPy の配列演算でバッチ全体に対して行う。
+    ルールベース生成（フォールバック）が最良候補になりうる行だけは、スカラー版に委譲して結果を一致させる。
+    """
+
+    def __init__(self, chord_analyzer=None):
+        if chord_analyzer is None:
+            from engine.analyzer import ChordAnalyzer
+            chord_analyzer = ChordAnalyzer()
+        self.chord_analyzer = chord_analyzer
+        table = CHORD_LOOKUP
+        self.table = table
+
+        # (step_diff * 12 + semi_diff) -> 単音程 / 複音程のビット
+        self.simple_bits = np.array([s for s, c in table.code_table], dtype=np.int64)
+        self.compound_bits = np.array([c for s, c in table.code_table], dtype=np.int64)
+        self.P1_BIT = table.interval_bits['P1']
+        self.P5_BIT = table.P5_BIT
+
+        # spell_mask -> クオリティID の探索用ソート済み配列
+        entries = sorted((mask, qid) for cands in table.pc_index.values() for mask, qid in cands)
+        self.dict_masks = np.array([m for m, q in entries], dtype=np.int64)
+        self.dict_qids = np.array([q for m, q in entries], dtype=np.int64)
+
+        # 出力用クオリティ名（辞書のクオリティ + UST のボトムクオリティ）
+        self.quality_names: List[str] = list(table.quality_names)
+        for q in UST_QUALITIES:
+            if q not in self.quality_names:
+                self.quality_names.append(q)
+        quality_index = {q: i for i, q in enumerate(self.quality_names)}
+        self.ust_qids = np.array([quality_index[q] for q in UST_QUALITIES], dtype=np.int64)
+
+        # クオリティIDごとの性質（_get_category / _search_rootless の文字列判定を前計算）
+        n_dict = len(table.quality_names)
+        self.is_special = np.array([any(sq in q for sq in ["Quartal", "Quintal", "+6", "Cluster"]) for q in table.quality_names], dtype=bool)
+        self.rootless_ok = np.array([any(ext in q for ext in ['7', '9', '11', '13', 'dim']) for q in table.quality_names], dtype=bool)
+        bonus = np.zeros(n_dict, dtype=np.int64)
+        for i, q in enumerate(table.quality_names):
+            bonus[i] = (10 if '9' in q else 0) + (15 if '11' in q else 0) + (20 if '13' in q else 0)
+        self.tension_bonus = bonus
+
+        bit = table.interval_bits
+        self.UST_M3, self.UST_m3, self.UST_m7, self.UST_M7, self.UST_d5 = bit['M3'], bit['m3'], bit['m7'], bit['M7'], bit['d5']
+        triad_masks = np.zeros((12, len(UST_TRIADS)), dtype=np.int64)
+        for t in range(12):
+            for k, (_, shape) in enumerate(UST_TRIADS):
+                for i in shape:
+                    triad_masks[t, k] |= 1 << ((t + i) % 12)
+        self.triad_masks = triad_masks
+
+        # spell_mask -> フォールバック候補のスコア加点（None: 候補なし）
+        self._fallback_cache: Dict[int, Optional[int]] = {}
+
+    # --- 入力の正規化 ---
+    def _spell(self, semitones: np.ndarray, steps: Optional[np.ndarray], key: str):
+        """綴り（ステップ番号）を決め、各音の変化記号とオクターブを求める"""
+        pcs = semitones % 12
+        if steps is None:
+            # 綴りが与えられない場合は KeyContext のスペリングを使う
+            step_of_pc = np.array(KeyContext(key).steps, dtype=np.int64)
+            steps = step_of_pc[pcs]
+        steps = np.asarray(steps, dtype=np.int64)
+        # (semitone - base) を -6..5 の変化記号とオクターブに分解する
+        offset = semitones - STEP_BASE[steps]
+        alters = (offset + 6) % 12 - 6
+        octaves = (offset - alters) // 12
+        return steps, alters, octaves
+
+    def _lookup(self, masks: np.ndarray) -> np.ndarray:
+        pos = np.searchsorted(self.dict_masks, masks)
+        pos = np.minimum(pos, len(self.dict_masks) - 1)
+        return np.where(self.dict_masks[pos] == masks, self.dict_qids[pos], -1)
+
+    def _interval_masks(self, root_steps, root_semis, steps, semis, valid):
+        """(N, R) 個の仮ルートに対する spell_mask と Unknown 音程の有無を (N, R) で返す"""
+        step_diff = (steps[:, None, :] - root_steps[:, :, None]) % 7
+        actual = semis[:, None, :] - root_semis[:, :, None]
+        idx = step_diff * 12 + actual % 12
+        simple = self.simple_bits[idx]
+        bits = np.where(actual >= 12, self.compound_bits[idx], simple)
+        v = valid[:, None, :]
+        masks = np.bitwise_or.reduce(np.where(v, bits, 0), axis=2)
+        unknown = np.any(v & (simple == 0), axis=2)
+        return masks, unknown
+
+    def _fallback_addon(self, spell_mask: int) -> Optional[int]:
+        if spell_mask not in self._fallback_cache:
+            best = None
+            for q in GENERATED_NAMES.names(spell_mask):
+                if "(" in q or "aug" in q:
+                    tension_count = q.count(',') + 1 if "(" in q and "omit5" not in q else 0
+                    best = max(best or 0, tension_count * 5)
+            self._fallback_cache[spell_mask] = best
+        return self._fallback_cache[spell_mask]
+
+    # --- 本体 ---
+    def analyze_many(self, semitones, mask=None, steps=None, key: str = "C", threshold: int = 40) -> Dict[str, np.ndarray]:
+        """
+        semitones: (N, max_voices) の絶対半音数（C0 = 0）
+        mask     : 有効な音を True とする同形の配列（省略時は全て有効）
+        steps    : 綴りのステップ番号 0~6 (C~B)。省略時は key の KeyContext で綴る
+        戻り値   : root_pc / quality / score / category の配列（解釈なしは root_pc=-1, score=-1, None）
+        """
+        semis = np.asarray(semitones, dtype=np.int64)
+        if semis.ndim != 2:
+            raise ValueError("semitones must be a 2-D array of shape (N, max_voices)")
+        valid = np.ones(semis.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+        n_rows, n_voices = semis.shape
+
+        # 音高順に並べ替え（パディングは末尾へ）
+        sort_key = np.where(valid, semis, np.iinfo(np.int64).max)
+        order = np.argsort(sort_key, axis=1, kind="stable")
+        semis = np.take_along_axis(semis, order, axis=1)
+        valid = np.take_along_axis(valid, order, axis=1)
+        if steps is not None:
+            steps = np.take_along_axis(np.asarray(steps, dtype=np.int64), order, axis=1)
+        steps, alters, octaves = self._spell(np.where(valid, semis, 0), steps, key)
+        pcs = semis % 12
+        rows = np.arange(n_rows)
+
+        has_notes = valid.any(axis=1)
+        bass_semi = semis[:, 0]
+        bass_pc = pcs[:, 0]
+        bass_octave = octaves[:, 0]
+
+        # ピッチクラスごとの出現（最初の音・最後の音）
+        pc_range = np.arange(12)
+        eq = (pcs[:, None, :] == pc_range[None, :, None]) & valid[:, None, :]
+        present = eq.any(axis=2)
+        first_idx = np.argmax(eq, axis=2)
+        last_idx = n_voices - 1 - np.argmax(eq[:, :, ::-1], axis=2)
+        input_pc_mask = (present.astype(np.int64) << pc_range).sum(axis=1)
+        n_unique = present.sum(axis=1)
+
+        # 粗さの減点（ChordAnalyzer._apply_roughness と同じ）をルートのピッチクラスごとに (N, 12) で求めておく
+        root_penalty = None
+        roughness = self.chord_analyzer.roughness
+        if roughness is not None:
+            root_place = bass_semi[:, None] - (bass_semi[:, None] - pc_range[None, :]) % 12
+            use = valid[:, None, :] & (semis[:, None, :] != root_place[:, :, None])
+            pair = np.where(use, roughness.pairs(root_place[:, :, None], semis[:, None, :]), 0.0)
+            root_penalty = np.rint(self.chord_analyzer.roughness_weight * pair.sum(axis=2)).astype(np.int64)
+
+        best_key = np.full(n_rows, -1, dtype=np.int64)
+        best_root = np.full(n_rows, -1, dtype=np.int64)
+        best_qid = np.full(n_rows, -1, dtype=np.int64)
+        best_score = np.full(n_rows, -1, dtype=np.int64)
+        best_cat = np.full(n_rows, -1, dtype=np.int64)
+
+        def offer(ok, score, cat, phase, order_, root, qid):
+            if root_penalty is not None:
+                score = score - root_penalty[rows[:, None], root]
+            sort_value = score * _SCORE_SPAN - (cat * _CATEGORY_SPAN + phase * _PHASE_SPAN + order_)
+            ok = ok & has_notes[:, None] & (score >= threshold)
+            sort_value = np.where(ok, sort_value, np.iinfo(np.int64).min)
+            j = np.argmax(sort_value, axis=1)
+            val = sort_value[rows, j]
+            better = ok[rows, j] & ((best_root < 0) | (val > best_key))
+            best_key[better] = val[better]
+            best_root[better] = root[rows, j][better]
+            best_qid[better] = qid[rows, j][better]
+            best_score[better] = score[rows, j][better]
+            best_cat[better] = cat[rows, j][better]
+
+        # --- 1. 通常探索 + Omit5補完（ルート = 入力のピッチクラス、綴りはそのpcの最後の音） ---
+        root_pcs = np.broadcast_to(pc_range, (n_rows, 12))
+        root_steps = steps[rows[:, None], last_idx]
+        root_alters = alters[rows[:, None], last_idx]
+        root_semis = STEP_BASE[root_steps] + root_alters + bass_octave[:, None] * 12
+        root_semis = np.where(root_semis > bass_semi[:, None], root_semis - 12, root_semis)
+        spell, unknown = self._interval_masks(root_steps, root_semis, steps, semis, valid)
+
+        known = present & ~unknown
+        qid_exact = np.where(known, self._lookup(spell), -1)
+        try_omit5 = known & (qid_exact < 0) & ((spell & self.P5_BIT) == 0)
+        qid_omit = np.where(try_omit5, self._lookup(spell | self.P5_BIT), -1)
+
+        is_root_pos = root_pcs == bass_pc[:, None]
+        bass_interval = (bass_pc[:, None] - root_pcs) % 12
+        penalty = np.where(is_root_pos, 0, INVERSION_PENALTY[bass_interval])
+        plain_cat = np.where(is_root_pos, CAT_ROOT, np.where(INVERSION_INTERVALS[bass_interval], CAT_INVERSION, CAT_ON_CHORD))
+
+        exact_special = self.is_special[np.maximum(qid_exact, 0)]
+        exact_score = np.where(exact_special, 75, 80 - penalty)
+        exact_cat = np.where(exact_special, CAT_SPECIAL, plain_cat)
+        omit_cat = np.where(self.is_special[np.maximum(qid_omit, 0)], CAT_SPECIAL, plain_cat)
+        normal_ok = (qid_exact >= 0) | (qid_omit >= 0)
+        normal_qid = np.where(qid_exact >= 0, qid_exact, qid_omit)
+        normal_score = np.where(qid_exact >= 0, exact_score, 65 - penalty)
+        normal_cat = np.where(qid_exact >= 0, exact_cat, omit_cat)
+        offer(normal_ok, normal_score, normal_cat, PHASE_NORMAL, first_idx, root_pcs, normal_qid)
+
+        # --- 2. ルートレス探索（入力に無いピッチクラスを C + alter の仮想ルートとする） ---
+        phantom_semis = pc_range[None, :] + bass_octave[:, None] * 12
+        phantom_semis = np.where(phantom_semis > bass_semi[:, None], phantom_semis - 12, phantom_semis)
+        phantom_steps = np.zeros((n_rows, 12), dtype=np.int64)
+        p_spell, p_unknown = self._interval_masks(phantom_steps, phantom_semis, steps, semis, valid)
+        p_spell = p_spell | self.P1_BIT
+        p_known = ~present & ~p_unknown
+        p_exact = np.where(p_known, self._lookup(p_spell), -1)
+        p_try_omit5 = p_known & (p_exact < 0) & ((p_spell & self.P5_BIT) == 0)
+        p_omit = np.where(p_try_omit5, self._lookup(p_spell | self.P5_BIT), -1)
+        p_qid = np.where(p_exact >= 0, p_exact, p_omit)
+        safe_qid = np.maximum(p_qid, 0)
+        rootless_ok = (p_qid >= 0) & self.rootless_ok[safe_qid]
+        rootless_score = 30 + self.tension_bonus[safe_qid] - np.where(p_exact >= 0, 0, 10)
+        offer(rootless_ok, rootless_score, np.full((n_rows, 12), CAT_ROOTLESS), PHASE_ROOTLESS,
+              root_pcs, root_pcs, p_qid)
+
+        # --- 3. UST（上部トライアド + ボトムのクオリティ） ---
+        # ボトムの仮ルートから各ピッチクラスの「最初の音」への単音程ビット
+        bottom_root_semi = root_semis[rows, bass_pc]
+        bottom_root_step = root_steps[rows, bass_pc]
+        first_steps = steps[rows[:, None], first_idx]
+        first_semis = semis[rows[:, None], first_idx]
+        idx = ((first_steps - bottom_root_step[:, None]) % 7) * 12 + (first_semis - bottom_root_semi[:, None]) % 12
+        pc_bits = np.where(present, self.simple_bits[idx], 0)
+
+        bass_bit = np.int64(1) << bass_pc
+        triad = self.triad_masks[None, :, :]                                     # (1, 12, 4)
+        in_mask = input_pc_mask[:, None, None]
+        ust_ok = ((triad & in_mask) == triad) & present[:, :, None] & ~is_root_pos[:, :, None]
+        ust_ok &= (n_unique >= 4)[:, None, None]
+        bottom_pcs = (in_mask & ~triad) | bass_bit[:, None, None]               # (N, 12, 4)
+        in_bottom = ((bottom_pcs[..., None] >> pc_range) & 1).astype(bool)      # (N, 12, 4, 12)
+        bottom_bits = np.bitwise_or.reduce(np.where(in_bottom, pc_bits[:, None, None, :], 0), axis=3)
+
+        has = lambda b: (bottom_bits & b) != 0
+        M3, m3, m7, M7, d5 = has(self.UST_M3), has(self.UST_m3), has(self.UST_m7), has(self.UST_M7), has(self.UST_d5)
+        ust_kind = np.select(
+            [M3 & m7, m3 & m7, M3 & M7, m3 & d5 & m7, M3, m3],
+            [0, 1, 2, 3, 4, 5], default=-1)
+        ust_ok &= ust_kind >= 0
+        root_diff = (pc_range[None, :] - bass_pc[:, None]) % 12
+        strong = np.isin(root_diff, [2, 3, 6, 9])[:, :, None] & np.array([True, True, False, False])[None, None, :]
+        ust_score = 70 + np.where(strong, 15, 0) - np.array([0, 0, 10, 10])[None, None, :]
+        ust_order = first_idx[:, :, None] * len(UST_TRIADS) + np.arange(len(UST_TRIADS))[None, None, :]
+        ust_qid = self.ust_qids[np.maximum(ust_kind, 0)]
+        offer(ust_ok.reshape(n_rows, -1), ust_score.reshape(n_rows, -1),
+              np.full((n_rows, 12 * len(UST_TRIADS)), CAT_SPECIAL), PHASE_UST,
+              ust_order.reshape(n_rows, -1),
+              np.broadcast_to(bass_pc[:, None], (n_rows, 12 * len(UST_TRIADS))), ust_qid.reshape(n_rows, -1))
+
+        # --- 4. ルールベース生成: 最良候補に届きうる行はスカラー版に委譲する ---
+        needs_fallback = present & (qid_exact < 0) & (qid_omit < 0) & has_notes[:, None]
+        fb_rows, fb_pcs = np.nonzero(needs_fallback)
+        fb_masks = spell[fb_rows, fb_pcs]
+        unique_masks, inverse = np.unique(fb_masks, return_inverse=True)
+        addon_table = [self._fallback_addon(int(m)) for m in unique_masks]
+        addon_table = np.array([-1 if a is None else a for a in addon_table], dtype=np.int64)
+        addons = addon_table[inverse.reshape(-1)]
+        fb_score = np.where(fb_pcs == bass_pc[fb_rows], 55, 35) + addons
+        if root_penalty is not None:
+            fb_score = fb_score - root_penalty[fb_rows, fb_pcs]
+        reachable = (addons >= 0) & (fb_score >= threshold) & ((best_root[fb_rows] < 0) | (fb_score >= best_score[fb_rows]))
+        delegated = np.zeros(n_rows, dtype=bool)
+        delegated[fb_rows[reachable]] = True
+
+        quality = np.empty(n_rows, dtype=object)
+        category = np.empty(n_rows, dtype=object)
+        for r in range(n_rows):
+            if best_qid[r] >= 0:
+                quality[r] = self.quality_names[best_qid[r]]
+                category[r] = CATEGORY_NAMES[best_cat[r]]
+
+        for r in np.nonzero(delegated)[0]:
+            notes = [Note(STEP_NAMES[steps[r, j]], int(alters[r, j]), int(octaves[r, j]))
+                     for j in range(n_voices) if valid[r, j]]
+            best = self.chord_analyzer.get_best_interpretation(notes, key=key, threshold=threshold, fast=True)
+            if best is None:
+                best_root[r], best_score[r], quality[r], category[r] = -1, -1, None, None
+            else:
+                best_root[r], best_score[r], quality[r] = best.root_pc, best.score, best.quality
+                category[r] = best.category
+
+        return {
+            "root_pc": best_root,
+            "quality": quality,
+            "score": best_score,
+            "category": category,
+            "delegated": delegated,
+        }
@@ -0,0 +1,185 @@
+# engine/cadence_index.py
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from engine.compiled_cache import load_or_build, source_path
+
+
+class _CompiledCadence:
+    """CADENCE_DICT の1エントリをコンパイルしたもの。クオリティ条件はクオリティIDのビットセットで持つ"""
+    __slots__ = ("cadence_id", "name", "bonus", "from_quality", "include", "exclude", "from_mask", "to_mask")
+
+    def __init__(self, cadence_id: int, cadence: dict):
+        self.cadence_id = cadence_id
+        self.name = cadence["name"]
+        self.bonus = cadence["bonus"]
+        self.from_quality = tuple(cadence["from_quality"])
+        self.include = tuple(cadence.get("to_quality_include") or ())
+        self.exclude = tuple(cadence.get("to_quality_exclude") or ())
+        self.from_mask = 0
+        self.to_mask = 0
+
+    def accepts_from(self, quality: str) -> bool:
+        return any(q == quality or (q == "" and quality in ["", "Major"]) for q in self.from_quality)
+
+    def accepts_to(self, quality: str) -> bool:
+        # include / exclude は部分文字列で判定する（"m" は "m7" や "m7b5" にも一致する）
+        if self.include and not any(q in quality for q in self.include):
+            return False
+        if self.exclude and any(q in quality for q in self.exclude):
+            return False
+        return True
+
+
+class CadenceIndex:
+    """
+    CADENCE_DICT を一度だけコンパイルした検索表。
+
+      - (from_degree, to_degree) をキーにしたハッシュで、該当するカデンツだけを取り出す
+      - from_quality / to_quality_include / to_quality_exclude の条件は、
+        クオリティ名に振ったIDのビットセット（from_mask / to_mask）に事前に解決しておく
+      - 各バケットはボーナスの高い順（同点は辞書順）に並べてあるので、結果はそのまま優先順位になる
+    IDとビットセットは起動時に解決した既知のクオリティ名だけで固定する。CHORD_DICT にない動的生成のクオリティ名は
+    際限なく現れうるので共有のビットセットは広げず、全エントリを accepts_from / accepts_to で判定した結果
+    （条件を満たすエントリ番号のビットセット）を上限付きの LRU に保持する（インスタンスはプロセス全体で共有するのでロックで守る）。
+    """
+
+    # 動的生成のクオリティの判定結果を保持する数
+    UNKNOWN_CACHE_SIZE = 1024
+
+    def __init__(self, cadence_dict: List[dict] = None):
+        from dictionaries.chord_dict import CHORD_DICT
+        if cadence_dict is None:
+            from dictionaries.cadence_dict import CADENCE_DICT
+            cadence_dict = CADENCE_DICT
+        self.quality_ids: Dict[str, int] = {}
+        self.entries: List[_CompiledCadence] = [_CompiledCadence(i, c) for i, c in enumerate(cadence_dict)]
+        self.index: Dict[Tuple[str, str], List[_CompiledCadence]] = {}
+
+        for entry, cadence in zip(self.entries, cadence_dict):
+            self.index.setdefault((cadence["from_degree"], cadence["to_degree"]), []).append(entry)
+        for bucket in self.index.values():
+            bucket.sort(key=lambda e: e.bonus, reverse=True)
+
+        # 既知のクオリティ名は起動時にまとめて解決しておく
+        known = ["", "Major"] + list(CHORD_DICT.values())
+        for cadence in cadence_dict:
+            known.extend(cadence["from_quality"])
+        for quality in known:
+            self._register(quality)
+        self._init_unknown()
+
+    def _init_unknown(self):
+        # 動的生成のクオリティ名 -> (from を満たすエントリ番号のビットセット, to を満たす...)
+        self._unknown: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- ディスクキャッシュ（engine.compiled_cache）---
+    def to_state(self) -> dict:
+        """marshal で保存できる形。バケットはエントリの番号で持つ（復元後も index と entries が同じオブジェクトを指すように）"""
+        return {
+            "quality_ids": self.quality_ids,
+            "entries": [tuple(getattr(e, slot) for slot in _CompiledCadence.__slots__) for e in self.entries],
+            "index": {key: [e.cadence_id for e in bucket] for key, bucket in self.index.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "CadenceIndex":
+        index = cls.__new__(cls)
+        index.quality_ids = state["quality_ids"]
+        index.entries = []
+        for values in state["entries"]:
+            entry = _CompiledCadence.__new__(_CompiledCadence)
+            for slot, value in zip(_CompiledCadence.__slots__, values):
+                setattr(entry, slot, value)
+            index.entries.append(entry)
+        index.index = {key: [index.entries[i] for i in ids] for key, ids in state["index"].items()}
+        index._init_unknown()
+        return index
+
+    def _register(self, quality: str):
+        """既知のクオリティ名にIDを振り、全エントリの from_mask / to_mask に判定結果を書き込む（組み立て時だけ）"""
+        if quality in self.quality_ids:
+            return
+        qid = len(self.quality_ids)
+        self.quality_ids[quality] = qid
+        bit = 1 << qid
+        for entry in self.entries:
+            if entry.accepts_from(quality):
+                entry.from_mask |= bit
+            if entry.accepts_to(quality):
+                entry.to_mask |= bit
+
+    def quality_id(self, quality: str) -> Optional[int]:
+        """既知のクオリティ名のID（動的生成のクオリティ名なら None）"""
+        return self.quality_ids.get(quality)
+
+    def _unknown_bits(self, quality: str) -> Tuple[int, int]:
+        """動的生成のクオリティ名について、(from を満たすエントリ番号のビットセット, to を満たす...) を LRU から引く"""
+        with self._lock:
+            bits = self._unknown.get(quality)
+            if bits is not None:
+                self._unknown.move_to_end(quality)
+                return bits
+        from_bits = to_bits = 0
+        for entry in self.entries:
+            if entry.accepts_from(quality):
+                from_bits |= 1 << entry.cadence_id
+            if entry.accepts_to(quality):
+                to_bits |= 1 << entry.cadence_id
+        bits = (from_bits, to_bits)
+        with self._lock:
+            self._unknown[quality] = bits
+            while len(self._unknown) > self.UNKNOWN_CACHE_SIZE:
+                self._unknown.popitem(last=False)
+        return bits
+
+    def _accepted(self, bucket: List[_CompiledCadence], quality: str, to_side: bool) -> List[int]:
+        """bucket の各エントリが quality を（to_side なら遷移先として）受け付けるか"""
+        qid = self.quality_ids.get(quality)
+        if qid is not None:
+            bit = 1 << qid
+            return [(e.to_mask if to_side else e.from_mask) & bit for e in bucket]
+        bits = self._unknown_bits(quality)[to_side]
+        return [(bits >> e.cadence_id) & 1 for e in bucket]
+
+    def match(self, from_degree: str, to_degree: str, quality_a: str, quality_b: str) -> List[_CompiledCadence]:
+        """条件に合うカデンツをボーナスの高い順に返す（該当なしなら空リスト）"""
+        bucket = self.index.get((from_degree, to_degree))
+        if not bucket:
+            return []
+        id_a = self.quality_ids.get(quality_a)
+        id_b = self.quality_ids.get(quality_b)
+        if id_a is not None and id_b is not None:
+            bit_a = 1 << id_a
+            bit_b = 1 << id_b
+            return [e for e in bucket if e.from_mask & bit_a and e.to_mask & bit_b]
+        # 動的生成のクオリティを含む場合（共有のビットセットは変更しない）
+        accepted_a = self._accepted(bucket, quality_a, False)
+        accepted_b = self._accepted(bucket, quality_b, True)
+        return [e for e, a, b in zip(bucket, accepted_a, accepted_b) if a and b]
+
+
+_CADENCE_INDEX: Optional[CadenceIndex] = None
+
+
+def get_cadence_index() -> CadenceIndex:
+    """
+    全インスタンスで共有する CadenceIndex。最初に使われたときに一度だけ（ディスクキャッシュがあれば読み込んで）用意する。
+    コード単体の判定しかしない場合は読み込まれない。
+    """
+    global _CADENCE_INDEX
+    if _CADENCE_INDEX is None:
+        _CADENCE_INDEX = load_or_build("cadence_index", CadenceIndex, [
+            source_path("dictionaries", "cadence_dict.py"),
+            source_path("dictionaries", "chord_dict.py"),
+            source_path("engine", "cadence_index.py"),
+        ])
+    return _CADENCE_INDEX
+
+
+def __getattr__(name: str):
+    # from engine.cadence_index import CADENCE_INDEX も従来どおり使えるようにする（参照した時点で用意する）
+    if name == "CADENCE_INDEX":
+        return get_cadence_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,154 @@
+# engine/chord_lookup.py
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.note import Note
+from utils.interval_calc import INTERVAL_MAP
+from engine.compiled_cache import load_or_build, source_path
+
+
+class ChordLookupTable:
+    """
+    CHORD_DICT を一度だけコンパイルし、整数のビットマスクで引けるようにした検索表。
+
+    キーは2段構え:
+      - pc_mask   : ルートからの半音差（0~11）を立てた12bitマスク（異名同音は区別しない）
+      - spell_mask: get_interval と同じ規則で求めた「綴り込みのインターバル」ごとのビット
+                    （Gr+6 の A6 と 7 の m7 のような異名同音をここで区別する）
+    pc_mask で候補を絞り、spell_mask の完全一致でクオリティIDを確定する。
+    """
+
+    def __init__(self, chord_dict: Dict[frozenset, str] = None):
+        if chord_dict is None:
+            # 既定の辞書はキャッシュがないときだけ読み込む（compiled_cache を参照）
+            from dictionaries.chord_dict import CHORD_DICT
+            chord_dict = CHORD_DICT
+        # インターバル名 <-> ビット番号
+        self.interval_names: List[str] = []
+        self.interval_bits: Dict[str, int] = {}
+        # (step_diff * 12 + semi_diff) -> (単音程のビット, 複音程のビット)。未知の組み合わせは 0
+        self.code_table: List[Tuple[int, int]] = [(0, 0)] * (7 * 12)
+        # インターバル名 -> 半音差（pc_mask 用）
+        self.interval_semitones: Dict[str, int] = {}
+
+        for (step_diff, semi_diff), name in INTERVAL_MAP.items():
+            # get_interval は半音差を % 12 してから引くため、d1(-1) や A7(12) には到達しない
+            if not 0 <= semi_diff < 12:
+                continue
+            simple_bit = self._register(name, semi_diff)
+            compound_bit = simple_bit
+            # get_interval と同じく、2・4・6度はオクターブ以上離れると 9・11・13度になる
+            if int(name[1:]) in [2, 4, 6]:
+                compound_bit = self._register(f"{name[0]}{int(name[1:]) + 7}", semi_diff)
+            self.code_table[step_diff * 12 + semi_diff] = (simple_bit, compound_bit)
+
+        self.P5_BIT = self.interval_bits['P5']
+        self.P1_BIT = self.interval_bits['P1']
+
+        # クオリティ名 <-> ID
+        self.quality_names: List[str] = []
+        self.quality_ids: Dict[str, int] = {}
+        # pc_mask -> [(spell_mask, quality_id), ...]
+        self.pc_index: Dict[int, List[Tuple[int, int]]] = {}
+
+        for intervals, quality in chord_dict.items():
+            spell_mask = self.mask_from_names(intervals)
+            if spell_mask is None:
+                continue
+            if quality not in self.quality_ids:
+                self.quality_ids[quality] = len(self.quality_names)
+                self.quality_names.append(quality)
+            quality_id = self.quality_ids[quality]
+            self.pc_index.setdefault(self.pc_mask_of(spell_mask), []).append((spell_mask, quality_id))
+
+    def _register(self, name: str, semitone: int) -> int:
+        if name not in self.interval_bits:
+            self.interval_bits[name] = 1 << len(self.interval_names)
+            self.interval_names.append(name)
+            self.interval_semitones[name] = semitone
+        return self.interval_bits[name]
+
+    # --- ディスクキャッシュ（engine.compiled_cache）---
+    def to_state(self) -> dict:
+        """marshal で保存できる形（属性はすべて int / str / list / tuple / dict）"""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ChordLookupTable":
+        table = cls.__new__(cls)
+        table.__dict__.update(state)
+        return table
+
+    # --- マスクの生成 ---
+    def mask_from_names(self, intervals: Iterable[str]) -> Optional[int]:
+        """インターバル名の集合を spell_mask に変換する（未知の名前があれば None）"""
+        mask = 0
+        for name in intervals:
+            bit = self.interval_bits.get(name)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def names_from_mask(self, spell_mask: int) -> set:
+        """spell_mask をインターバル名の集合に戻す（RuleBasedGenerator など文字列が必要な箇所向け）"""
+        return {name for name, bit in self.interval_bits.items() if spell_mask & bit}
+
+    def pc_mask_of(self, spell_mask: int) -> int:
+        pc_mask = 0
+        for name, bit in self.interval_bits.items():
+            if spell_mask & bit:
+                pc_mask |= 1 << self.interval_semitones[name]
+        return pc_mask
+
+    def interval_mask(self, root_step_index: int, root_semitone: int, notes: List[Note]) -> Tuple[int, bool]:
+        """
+        仮ルート（綴りのステップ番号と絶対半音数）から見た各音のインターバルを spell_mask にまとめる。
+        get_interval で表現できない音程（Unknown）が含まれる場合は 2つ目の戻り値が True になる。
+        """
+        mask = 0
+        has_unknown = False
+        code_table = self.code_table
+        for note in notes:
+            actual = note.absolute_semitone - root_semitone
+            simple_bit, compound_bit = code_table[((note.step_index - root_step_index) % 7) * 12 + actual % 12]
+            if not simple_bit:
+                has_unknown = True
+                continue
+            mask |= compound_bit if actual >= 12 else simple_bit
+        return mask, has_unknown
+
+    # --- 検索 ---
+    @staticmethod
+    def input_pc_mask(notes: List[Note]) -> int:
+        """入力音のピッチクラス集合を12bitマスクにする"""
+        mask = 0
+        for note in notes:
+            mask |= 1 << note.pitch_class
+        return mask
+
+    @staticmethod
+    def rotate(pc_mask: int, root_pc: int) -> int:
+        """絶対ピッチクラスのマスクを root_pc 基準の相対マスクへ回転する"""
+        root_pc %= 12
+        return ((pc_mask >> root_pc) | (pc_mask << (12 - root_pc))) & 0xFFF
+
+    def has_shape(self, rel_pc_mask: int) -> bool:
+        """綴りを見る前の一次判定: この半音パターンの和音が辞書に存在しうるか"""
+        return rel_pc_mask in self.pc_index
+
+    def lookup(self, rel_pc_mask: int, spell_mask: int) -> Optional[str]:
+        """相対 pc_mask で候補を絞り、spell_mask の完全一致でクオリティ名を返す"""
+        candidates = self.pc_index.get(rel_pc_mask)
+        if not candidates:
+            return None
+        for cand_mask, quality_id in candidates:
+            if cand_mask == spell_mask:
+                return self.quality_names[quality_id]
+        return None
+
+
+# モジュール読み込み時に一度だけ（ディスクキャッシュがあれば読み込んで）用意して全インスタンスで共有する
+CHORD_LOOKUP = load_or_build("chord_lookup", ChordLookupTable, [
+    source_path("dictionaries", "chord_dict.py"),
+    source_path("utils", "interval_calc.py"),
+    source_path("engine", "chord_lookup.py"),
+])
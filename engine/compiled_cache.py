@@ -0,0 +1,123 @@
+# engine/compiled_cache.py
+"""
+辞書から組み立てる検索表（ChordLookupTable / CadenceIndex）のディスクキャッシュ。
+
+    CHORD_LOOKUP = load_or_build("chord_lookup", ChordLookupTable, [source_path("dictionaries", "chord_dict.py"), ...])
+
+表はプロセスごとに作り直すと起動のたびに数ミリ秒かかるので、初回に保存して2回目以降は読むだけにする。
+対象のクラスは to_state()（marshal で書ける dict / list / tuple / int / str だけの値）と
+from_state(state)（その値からインスタンスを復元する classmethod）を持つ。
+marshal はインタプリタ組み込みで import のコストがかからない（pickle / hashlib は import だけで数ミリ秒かかる）。
+
+キャッシュのファイル名には、元になったソース（辞書と表を組み立てるモジュール）の内容・FORMAT_VERSION・
+Python と marshal のバージョンから求めたハッシュを含める。辞書を編集すればハッシュが変わって自動的に作り直される。
+
+保存先は環境変数 CHORD_ANALYZER_CACHE_DIR（空文字ならキャッシュを使わない）、
+なければ $XDG_CACHE_HOME/chord-analyzer、それもなければ ~/.cache/chord-analyzer。
+読み書きに失敗したとき（書き込めないディレクトリ、壊れたファイルなど）は黙ってその場で組み立てる。
+"""
+import marshal
+import os
+import sys
+import zlib
+from typing import Iterable, Optional
+
+# to_state() の形を変えたら上げる（古いキャッシュを読まないようにする）
+FORMAT_VERSION = 1
+CACHE_ENV = "CHORD_ANALYZER_CACHE_DIR"
+# 同じ名前のキャッシュを新しい順にいくつまで残すか。保存先は複数のチェックアウト・仮想環境で共有されうるので、
+# 自分以外のハッシュのファイルもすぐには消さない（互いに消し合って毎回作り直しになるのを防ぐ）
+KEEP_ENTRIES = 8
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def source_path(*parts: str) -> str:
+    """リポジトリのルートからの相対パスで、キャッシュのキーにするソースファイルを指す"""
+    return os.path.join(_ROOT, *parts)
+
+
+def cache_dir() -> Optional[str]:
+    """キャッシュの保存先（無効にされていれば None）"""
+    directory = os.environ.get(CACHE_ENV)
+    if directory is not None:
+        return directory or None
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chord-analyzer")
+
+
+def source_digest(sources: Iterable[str]) -> str:
+    """ソースファイルの内容・FORMAT_VERSION・Python と marshal のバージョンから求めたハッシュ（CRC32 を2つ連ねたもの）"""
+    header = f"{FORMAT_VERSION}:{sys.implementation.cache_tag}:{marshal.version}".encode()
+    crc = zlib.crc32(header)
+    adler = zlib.adler32(header)
+    for path in sources:
+        with open(path, "rb") as f:
+            data = os.path.basename(path).encode() + b"\0" + f.read()
+        crc = zlib.crc32(data, crc)
+        adler = zlib.adler32(data, adler)
+    return f"{crc:08x}{adler:08x}"
+
+
+def _write(directory: str, name: str, path: str, state) -> None:
+    """
+    一時ファイルに書いてから置き換える（並行して起動したプロセスが書きかけを読まないように）。
+    同じ名前のキャッシュは更新時刻の新しい順に KEEP_ENTRIES 個まで残し、それより古いものを消す
+    """
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            marshal.dump(state, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    entries = []
+    for entry in os.listdir(directory):
+        if entry.startswith(f"{name}-") and entry.endswith(".marshal"):
+            entry_path = os.path.join(directory, entry)
+            try:
+                entries.append((os.stat(entry_path).st_mtime, entry_path))
+            except OSError:
+                pass
+    entries.sort(reverse=True)
+    for _mtime, entry_path in entries[KEEP_ENTRIES:]:
+        if entry_path != path:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+
+
+def load_or_build(name: str, cls, sources: Iterable[str]):
+    """
+    name のキャッシュがあり、sources のハッシュが一致すれば cls.from_state で復元して返す。
+    なければ cls() で組み立て、to_state() を保存してから返す。
+    """
+    directory = cache_dir()
+    if directory is None:
+        return cls()
+    try:
+        path = os.path.join(directory, f"{name}-{source_digest(sources)}.marshal")
+    except OSError:
+        return cls()
+
+    try:
+        with open(path, "rb") as f:
+            return cls.from_state(marshal.load(f))
+    except FileNotFoundError:
+        pass
+    except Exception:
+        # 壊れた・形の合わないキャッシュは作り直して上書きする
+        pass
+
+    obj = cls()
+    try:
+        _write(directory, name, path, obj.to_state())
+    except (OSError, ValueError):
+        pass
+    return obj
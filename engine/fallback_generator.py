@@ -1,4 +1,6 @@
-from typing import Set, List
+from collections import OrderedDict
+from typing import Set, List, Tuple
+from engine.chord_lookup import CHORD_LOOKUP, ChordLookupTable
 
 class RuleBasedGenerator:
     """辞書にない未知のテンション和音を、骨格とテンションに分解して動的生成するクラス"""
@@ -68,4 +70,35 @@ class RuleBasedGenerator:
             
             results.append(chord_name)
 
-        return results
\ No newline at end of file
+        return results
+
+
+class GeneratedNameTable:
+    """
+    spell_mask（ChordLookupTable の綴り込みインターバルのマスク）-> generate_chord_names の結果、の表。
+    同じインターバルの組み合わせは何度も現れるため、初回に生成した名前を LRU で保持して全インスタンスで共有する。
+    """
+
+    def __init__(self, lookup_table: ChordLookupTable = CHORD_LOOKUP, maxsize: int = 8192):
+        self.lookup_table = lookup_table
+        self.maxsize = maxsize
+        self._names: "OrderedDict[int, Tuple[str, ...]]" = OrderedDict()
+
+    def names(self, spell_mask: int) -> Tuple[str, ...]:
+        names = self._names.get(spell_mask)
+        if names is not None:
+            self._names.move_to_end(spell_mask)
+            return names
+        names = tuple(RuleBasedGenerator.generate_chord_names(self.lookup_table.names_from_mask(spell_mask)))
+        if self.maxsize > 0:
+            self._names[spell_mask] = names
+            while len(self._names) > self.maxsize:
+                self._names.popitem(last=False)
+        return names
+
+    def __len__(self):
+        return len(self._names)
+
+
+# モジュール共通の表（中身は初回の参照時に埋まる）
+GENERATED_NAMES = GeneratedNameTable()
@@ -0,0 +1,117 @@
+# engine/interpretation_cache.py
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from models.note import Note
+from models.results import ChordCandidate
+from utils.formatter import KeyContext
+
+
+class OffsetNameContext:
+    """
+    KeyContext の代わりに探索フェーズへ渡す「名前のテンプレート」用コンテキスト。
+    音名の代わりにベースからの半音差を "{7}" のような書式フィールドとして返すので、
+    生成された候補名は移調・Keyに依存しない形になる。
+    """
+    def __init__(self, bass_pc: int):
+        self.bass_pc = bass_pc
+
+    def get_note_name(self, pitch_class: int) -> str:
+        return "{%d}" % ((pitch_class - self.bass_pc) % 12)
+
+
+class InterpretationCache:
+    """
+    コード解釈（探索フェーズが出した候補リスト）を、ボイシングの正規形をキーに保持する LRU キャッシュ。
+
+    - 通常探索・UST・ルールベース生成: ベースからの相対半音数・相対ステップ・仮ルートの位置だけで決まるため、
+      移調しても（Keyを変えても）同じエントリを再利用できる。
+    - ルートレス探索: 仮想ルートを "C + 変化記号" で綴るため音名の文字に依存する。
+      こちらは音名の文字を含めたキー（音域の違いだけを吸収）で別に保持する。
+    候補は「ベースからの半音差」とテンプレート名で保存し、取り出す際に実際のルートと KeyContext で綴り直す。
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # --- 正規形 ---
+    @staticmethod
+    def shape_key(sorted_notes: List[Note], root_offsets: Tuple[int, ...]) -> tuple:
+        """移調不変のキー: (ベースからの相対半音, 相対ステップ) の列 + 各仮ルートの相対位置"""
+        bass = sorted_notes[0]
+        bass_semitone = bass.absolute_semitone
+        bass_step = bass.step_index
+        pattern = tuple((n.absolute_semitone - bass_semitone, (n.step_index - bass_step) % 7) for n in sorted_notes)
+        return ("shape", pattern, root_offsets)
+
+    @staticmethod
+    def rootless_key(sorted_notes: List[Note]) -> tuple:
+        """ルートレス探索用のキー: 音名の文字は固定し、音域（オクターブ）の違いだけを吸収する"""
+        bass = sorted_notes[0]
+        bass_semitone = bass.absolute_semitone
+        pattern = tuple((n.absolute_semitone - bass_semitone, n.step_index) for n in sorted_notes)
+        # 仮想ルートはベースのオクターブに置かれるため、ベースのオクターブ内での位置（B# なら 12）も必要
+        within_octave = bass_semitone - bass.octave * 12
+        return ("rootless", pattern, within_octave, bass.pitch_class)
+
+    # --- 変換 ---
+    @staticmethod
+    def freeze(results: Dict[str, list], bass_pc: int) -> tuple:
+        """OffsetNameContext で生成した候補を、ベース相対のタプルにして保存できる形にする"""
+        frozen = []
+        for category, cands in results.items():
+            for cand in cands:
+                frozen.append((category, cand.name, cand.score, (cand.root_pc - bass_pc) % 12, cand.quality, cand.is_ust))
+        return tuple(frozen)
+
+    @staticmethod
+    def render(entry: tuple, results: Dict[str, list], key_context: KeyContext, bass_pc: int, sorted_notes: List[Note]):
+        """
+        保存された候補を実際のベースと Key で綴り直し、results の各カテゴリへ追加する。
+        候補名はテンプレートのまま渡し、参照されたときに初めて組み立てる。
+        """
+        if not entry:
+            return
+        names = key_context.relative_names[bass_pc]
+        for category, template, score, root_offset, quality, is_ust in entry:
+            results[category].append(ChordCandidate(
+                category, score, (bass_pc + root_offset) % 12, quality, sorted_notes,
+                is_ust=is_ust, template=template, names=names
+            ))
+
+    # --- LRU ---
+    def get(self, key: tuple) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: tuple, entry: tuple):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
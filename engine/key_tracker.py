@@ -0,0 +1,139 @@
+# engine/key_tracker.py
+"""
+転調を含む進行のための、スライディングウィンドウによる局所的な Key の推定。
+
+    tracker = KeyTracker(window=8, initial_key="C")
+    for notes in voicings:
+        local_key = tracker.update(notes)   # このコードの時点の Key（"G", "Ebm" など）
+
+直近 window 個のコードのピッチクラスのヒストグラムと、24 調のキープロファイル（Krumhansl-Kessler）との相関で Key を選ぶ。
+プロファイルの行列（24 x 12）は平均0・ノルム1に正規化して事前に計算してあるので、ヒストグラムとの相関は
+「行列の行との内積 / ヒストグラムの偏差のノルム」になる。内積（24 個のスコア）は、ヒストグラムの
+1要素が増減するたびに行列の列を足し引きして更新するため、1コードあたりの計算量はウィンドウの長さによらない。
+"""
+import math
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+from models.note import Note
+
+# Krumhansl-Kessler のキープロファイル（主音からの半音差 0~11 の重み）
+MAJOR_PROFILE = (6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88)
+MINOR_PROFILE = (6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17)
+
+# 主音のピッチクラスごとの Key 名（KeyContext / DegreeConverter が受け付ける表記）
+MAJOR_KEYS = ["C", "Db", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"]
+MINOR_KEYS = ["Cm", "C#m", "Dm", "Ebm", "Em", "Fm", "F#m", "Gm", "G#m", "Am", "Bbm", "Bm"]
+# 行列の行の順（長調 12 + 短調 12）
+KEY_NAMES = MAJOR_KEYS + MINOR_KEYS
+
+
+def _normalized(profile: Tuple[float, ...]) -> List[float]:
+    """平均0・ノルム1に正規化したプロファイル"""
+    mean = sum(profile) / len(profile)
+    centered = [w - mean for w in profile]
+    norm = math.sqrt(sum(w * w for w in centered))
+    return [w / norm for w in centered]
+
+
+class KeyProfileMatrix:
+    """24 調 x 12 ピッチクラスの正規化済みプロファイル。rows[key_index] と列ごとのタプル columns[pc] を持つ"""
+
+    def __init__(self, major: Tuple[float, ...] = MAJOR_PROFILE, minor: Tuple[float, ...] = MINOR_PROFILE):
+        self.rows: List[Tuple[float, ...]] = []
+        for profile in (major, minor):
+            base = _normalized(profile)
+            for tonic in range(12):
+                self.rows.append(tuple(base[(pc - tonic) % 12] for pc in range(12)))
+        self.columns: List[Tuple[float, ...]] = [tuple(row[pc] for row in self.rows) for pc in range(12)]
+        self.key_index: Dict[str, int] = {name: i for i, name in enumerate(KEY_NAMES)}
+
+    def index_of(self, key_name: str) -> int:
+        """Key 名（"Gb" や "D#m" のような異名も可）の行番号"""
+        index = self.key_index.get(key_name)
+        if index is None:
+            is_minor = key_name.endswith("m") or key_name.endswith("Minor")
+            tonic = key_name.replace("Minor", "").replace("m", "").replace(" ", "")
+            index = Note.from_string(f"{tonic}4").pitch_class + (12 if is_minor else 0)
+        return index
+
+
+# モジュール共通の行列
+KEY_PROFILES = KeyProfileMatrix()
+
+
+class KeyTracker:
+    """
+    直近 window 個のコードから局所的な Key を推定するストリーム処理器。
+
+    - update(notes) はコードの構成音のピッチクラス（重複なし）を weight ずつヒストグラムへ足し、
+      ウィンドウからあふれた最も古いコードの分を引いて、その時点の Key 名を返す
+    - 現在の Key より相関が hysteresis 以上高い Key が現れたときだけ切り替える（コードごとの揺れを抑える）
+    - ヒストグラムに偏りがない（全音が同数・空）ときは現在の Key を保つ。最初の Key は initial_key
+    """
+
+    def __init__(self, window: int = 8, initial_key: str = "C", hysteresis: float = 0.1,
+                 profiles: KeyProfileMatrix = KEY_PROFILES):
+        if window < 1:
+            raise ValueError("window must be >= 1")
+        self.window = window
+        self.hysteresis = hysteresis
+        self.profiles = profiles
+        self.reset(initial_key)
+
+    def reset(self, initial_key: str = "C"):
+        self.key = initial_key
+        self.key_index = self.profiles.index_of(initial_key)
+        self.histogram = [0.0] * 12
+        self._sum = 0.0       # ヒストグラムの合計
+        self._sum_sq = 0.0    # ヒストグラムの2乗和（偏差のノルムを O(1) で求めるため）
+        self._scores = [0.0] * len(self.profiles.rows)
+        self._events: deque = deque()
+
+    def _add(self, pc: int, delta: float):
+        h = self.histogram[pc]
+        self.histogram[pc] = h + delta
+        self._sum += delta
+        self._sum_sq += (h + delta) * (h + delta) - h * h
+        self._scores = [s + delta * c for s, c in zip(self._scores, self.profiles.columns[pc])]
+
+    def _norm(self) -> float:
+        """ヒストグラムの偏差のノルム"""
+        return math.sqrt(max(0.0, self._sum_sq - self._sum * self._sum / 12))
+
+    def correlations(self) -> List[float]:
+        """現在のウィンドウと 24 調の相関係数（KEY_NAMES の順。偏りがなければすべて 0）"""
+        norm = self._norm()
+        if norm < 1e-9:
+            return [0.0] * len(self._scores)
+        return [s / norm for s in self._scores]
+
+    def update(self, notes: Iterable, weight: float = 1.0) -> str:
+        """
+        コード1つ分（Note またはピッチクラスの列）を取り込み、局所的な Key 名を返す。
+        weight はコードの長さ（拍数など）で重み付けしたい場合に使う。
+        """
+        pcs = {n if isinstance(n, int) else n.pitch_class for n in notes}
+        deltas = dict.fromkeys(pcs, weight)
+        self._events.append((pcs, weight))
+        if len(self._events) > self.window:
+            old_pcs, old_weight = self._events.popleft()
+            for pc in old_pcs:
+                deltas[pc] = deltas.get(pc, 0.0) - old_weight
+        for pc, delta in deltas.items():
+            if delta:
+                self._add(pc, delta)
+
+        norm = self._norm()
+        if norm >= 1e-9:
+            scores = self._scores
+            best = max(range(len(scores)), key=scores.__getitem__)
+            if best != self.key_index and (scores[best] - scores[self.key_index]) / norm > self.hysteresis:
+                self.key_index = best
+                self.key = KEY_NAMES[best]
+        return self.key
+
+    def track(self, voicings: Iterable) -> List[str]:
+        """ボイシングの列をまとめて取り込み、それぞれの時点の Key 名を返す"""
+        return [self.update(notes) for notes in voicings]
+
@@ -0,0 +1,153 @@
+# engine/mask_tables.py
+"""
+ルートレス探索と UST / ポリコード探索のための、12bit ピッチクラスマスクの検索表。
+
+- RootlessTable      : ルートレスの対象になるクオリティ（7th 以上）の相対 pc_mask の集合。
+                       入力の pc_mask ごとに「辞書の形になりうる仮想ルート」だけを求めてメモ化する。
+- UpperStructureTable: ベースから見た上部トライアド（4種 x 11ルート）のマスク。
+                       入力の相対 pc_mask ごとに、成立するトライアドと残り（下部）のマスク・スコアをメモ化し、
+                       下部のインターバル（M3 / m3 / m7 / M7 / d5）のフラグからクオリティを引く表を持つ。
+どちらも入力マスクは最大 4096 通りなので、初回に出会ったときに計算して以後は配列を引くだけにする。
+"""
+from typing import Dict, List, Optional, Tuple
+from engine.chord_lookup import CHORD_LOOKUP, ChordLookupTable
+
+P5_PC_BIT = 1 << 7  # 相対pcマスクにおける完全5度（7半音）のビット
+
+# ルートレス探索が候補にするクオリティ（7th 以上の和音）
+ROOTLESS_EXTENSIONS = ['7', '9', '11', '13', 'dim']
+
+
+def rootless_tension_bonus(quality: str) -> int:
+    """ルートレス候補のテンション加点"""
+    bonus = 0
+    if '9' in quality: bonus += 10
+    if '11' in quality: bonus += 15
+    if '13' in quality: bonus += 20
+    return bonus
+
+
+class RootlessTable:
+    """ルートレス探索用: 仮想ルートの候補を pc_mask だけで絞り込む表"""
+
+    def __init__(self, lookup_table: ChordLookupTable = CHORD_LOOKUP):
+        self.lookup_table = lookup_table
+        # ルートレスの対象になるクオリティ名 -> テンション加点
+        self.bonus: Dict[str, int] = {
+            quality: rootless_tension_bonus(quality) for quality in lookup_table.quality_names
+            if any(ext in quality for ext in ROOTLESS_EXTENSIONS)
+        }
+        # 対象クオリティを1つでも含む相対 pc_mask（ルートのビットを含む）
+        self.shapes = {
+            rel_mask for rel_mask, entries in lookup_table.pc_index.items()
+            if any(lookup_table.quality_names[quality_id] in self.bonus for _spell, quality_id in entries)
+        }
+        self.max_score = 30 + max(self.bonus.values(), default=0)
+        self._roots: List[Optional[Tuple[int, ...]]] = [None] * 4096
+
+    def roots(self, input_pc_mask: int) -> Tuple[int, ...]:
+        """
+        入力にないピッチクラスのうち、仮想ルートにすると（5度を補えば）対象クオリティの形になるもの（昇順）。
+        綴りによる最終判定は ChordLookupTable.lookup で行う。
+        """
+        roots = self._roots[input_pc_mask]
+        if roots is None:
+            rotate = self.lookup_table.rotate
+            shapes = self.shapes
+            found = []
+            for phantom_pc in range(12):
+                if input_pc_mask >> phantom_pc & 1:
+                    continue
+                rel_mask = rotate(input_pc_mask, phantom_pc) | 1
+                if rel_mask in shapes or (rel_mask | P5_PC_BIT) in shapes:
+                    found.append(phantom_pc)
+            roots = self._roots[input_pc_mask] = tuple(found)
+        return roots
+
+
+# 上部トライアドの種類（探索順）とルートからの半音
+TRIADS = [
+    ("Major", (0, 4, 7)),
+    ("Minor", (0, 3, 7)),
+    ("Aug", (0, 4, 8)),
+    ("Dim", (0, 3, 6)),
+]
+
+# 下部のインターバルのフラグ
+FLAG_M3 = 1
+FLAG_m3 = 2
+FLAG_m7 = 4
+FLAG_M7 = 8
+FLAG_d5 = 16
+
+# (ステップ差, 半音差 % 12) -> フラグ（get_interval の 'M3' などに対応。3・5・7度は複音程の名前にならない）
+_INTERVAL_FLAGS = {(2, 4): FLAG_M3, (2, 3): FLAG_m3, (6, 10): FLAG_m7, (6, 11): FLAG_M7, (4, 6): FLAG_d5}
+
+
+def _bottom_quality(flags: int) -> Optional[str]:
+    """下部のインターバルのフラグからクオリティを決める（判定の順序は従来の UST 探索と同じ）"""
+    has_M3 = bool(flags & FLAG_M3)
+    has_m3 = bool(flags & FLAG_m3)
+    has_m7 = bool(flags & FLAG_m7)
+    has_M7 = bool(flags & FLAG_M7)
+    if has_M3 and has_m7: return "7"
+    elif has_m3 and has_m7: return "m7"
+    elif has_M3 and has_M7: return "Maj7"
+    elif has_m3 and flags & FLAG_d5 and has_m7: return "m7b5"
+    elif has_M3: return ""  # Major
+    elif has_m3: return "m"
+    return None
+
+
+class UpperStructureTable:
+    """UST / ポリコード探索用: ベース相対の pc_mask から、成立する上部トライアドと下部のマスクを引く表"""
+
+    def __init__(self):
+        # [上部ルートのベースからの半音差][トライアドの番号] -> 相対マスク
+        self.triad_masks = [
+            [sum(1 << ((offset + i) % 12) for i in intervals) for _name, intervals in TRIADS]
+            for offset in range(12)
+        ]
+        self.bottom_quality: List[Optional[str]] = [_bottom_quality(flags) for flags in range(32)]
+        self._structures: List[Optional[Dict[int, tuple]]] = [None] * 4096
+
+    @staticmethod
+    def interval_flag(step_diff: int, semi_diff: int) -> int:
+        """下部のルートから見た1音のインターバルのフラグ（ステップ差は mod 7、半音差は mod 12）"""
+        return _INTERVAL_FLAGS.get((step_diff, semi_diff), 0)
+
+    @staticmethod
+    def score(offset: int, triad_name: str) -> int:
+        score = 70
+        if offset in [2, 3, 6, 9] and triad_name in ["Major", "Minor"]:
+            score += 15
+        if triad_name in ["Aug", "Dim"]:
+            score -= 10
+        return score
+
+    def structures(self, rel_pc_mask: int) -> Dict[int, tuple]:
+        """
+        ベース相対の入力マスクに含まれる上部トライアドを、上部ルートの半音差ごとに
+        ((トライアド名, スコア, 下部の相対マスク), ...) としてまとめた dict（探索順はトライアドの順）。
+        下部のマスクは入力からトライアドの音を除き、ベース（ビット0）を加えたもの。
+        """
+        found = self._structures[rel_pc_mask]
+        if found is None:
+            found = {}
+            for offset in range(1, 12):
+                if not rel_pc_mask >> offset & 1:
+                    continue
+                entries = []
+                for (triad_name, _intervals), triad_mask in zip(TRIADS, self.triad_masks[offset]):
+                    if rel_pc_mask & triad_mask == triad_mask:
+                        bottom_mask = (rel_pc_mask & ~triad_mask) | 1
+                        entries.append((triad_name, self.score(offset, triad_name), bottom_mask))
+                if entries:
+                    found[offset] = tuple(entries)
+            self._structures[rel_pc_mask] = found
+        return found
+
+
+# モジュール読み込み時に一度だけ生成して全インスタンスで共有する（入力ごとの表は初回に計算する）
+ROOTLESS_TABLE = RootlessTable()
+UST_TABLE = UpperStructureTable()
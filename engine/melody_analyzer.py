@@ -3,14 +3,28 @@ from typing import List
 from models.note import Note
 from utils.interval_calc import get_interval
 from dictionaries.interval_dict import INTERVAL_INFO_DICT, get_dissonance_score
+from models.results import MelodyLineResult, MelodyResult, ToneRelation
 
 class MelodyAnalyzer:
     """
     メロディ音とコード構成音の物理的（周波数比）および理論的（機能和声）な整合性を解析するクラス
     """
-    def analyze_melody(self, melody_note: Note, chord_root_pc: int, chord_quality: str, chord_notes: List[Note]) -> str:
-        lines = [f"Melody: [ {melody_note} ]  vs  Chord: {chord_quality} (Root PC: {chord_root_pc})", "-"*40]
-        
+    STATUS_TEXT = {
+        MelodyResult.CHORD_TONE: "Chord Tone (コードトーン: 最も安定)",
+        MelodyResult.AVOID: "Avoid Note (アヴォイドノート: 回避推奨)",
+        MelodyResult.TENSION: "Available Tension (有効なテンション: 豊かな響き)",
+    }
+
+    def __init__(self, roughness=None, avoid_roughness: float = 0.5):
+        """
+        roughness: 物理的な不協和の尺度に使う RoughnessModel（engine/roughness.py）。None なら音程名の4段階の表
+                   （get_dissonance_score）を使う。指定すると構成音ごとの不協和度は実際の音高どうしの粗さになり、
+                   粗さが avoid_roughness 以上の構成音をアヴォイド要因とする（b9 の許容は音程名で判定する）
+        """
+        self.roughness = roughness
+        self.avoid_roughness = avoid_roughness
+
+    def analyze_melody(self, melody_note: Note, chord_root_pc: int, chord_quality: str, chord_notes: List[Note]) -> MelodyResult:
         melody_pc = melody_note.pitch_class
         root_diff = (melody_pc - chord_root_pc) % 12
         is_dominant = "7" in chord_quality and "Maj" not in chord_quality and "m7" not in chord_quality
@@ -28,57 +42,106 @@ class MelodyAnalyzer:
 
         # --- 2. 物理的・音響学的な不協和判定（全構成音とのインターバル総当たり） ---
         total_dissonance = 0
-        acoustic_warnings = []
-        acoustic_details = []
+        has_acoustic_avoid = False
+        relations = []
+        roughness = self.roughness
         
         for cn in chord_notes:
             # 構成音を基準として、メロディ音への音程を計算（メロディが下にある場合はオクターブを上げて計算）
-            dummy_mel = Note(melody_note.step, melody_note.alter, melody_note.octave)
-            while dummy_mel.absolute_semitone < cn.absolute_semitone:
-                dummy_mel.octave += 1
+            octave_shift = max(0, -((melody_note.absolute_semitone - cn.absolute_semitone) // 12))
+            dummy_mel = melody_note.with_octave(melody_note.octave + octave_shift) if octave_shift else melody_note
                 
             interval_name = get_interval(cn, dummy_mel)
             info = INTERVAL_INFO_DICT.get(interval_name)
             
-            if info:
+            if roughness is not None:
+                # 音程名ではなく実際の音高どうしの粗さで判定する（表にない音程も対象）。
+                # analyze_line と判定を揃えるため丸めずに比較し、丸めるのは表示（format_melody）だけにする
+                mel_semi, cn_semi = melody_note.absolute_semitone, cn.absolute_semitone
+                score = roughness.pair(min(mel_semi, cn_semi), mel_semi - cn_semi)
+                total_dissonance += score
+                verdict = ToneRelation.CONSONANT
+                if score >= self.avoid_roughness:
+                    if is_dominant and cn.pitch_class == chord_root_pc and interval_name in ['m2', 'm9']:
+                        verdict = ToneRelation.TOLERATED_B9
+                    else:
+                        verdict = ToneRelation.AVOID
+                        has_acoustic_avoid = True
+                relations.append(ToneRelation(cn, interval_name, info, score, verdict))
+            elif info:
                 score = get_dissonance_score(interval_name)
                 total_dissonance += score
-                ratio_str = f"{info['ratio'][0]}:{info['ratio'][1]}"
-                
-                detail = f"  - vs {str(cn):<4} : {interval_name:<3} ({info['name']}) [Ratio {ratio_str}]"
+                verdict = ToneRelation.CONSONANT
                 
                 # 強い不協和（m2, m9）の検出
                 if score >= 5 or interval_name in ['m2', 'm9']:
                     # ドミナントセブンスのb9は例外として許容
                     if is_dominant and cn.pitch_class == chord_root_pc and interval_name in ['m2', 'm9']:
-                        detail += " -> ⚠️ 強い不協和 (b9テンションとして許容)"
+                        verdict = ToneRelation.TOLERATED_B9
                     else:
-                        detail += " -> 🚫 アヴォイド要因 (激しい不協和)"
-                        acoustic_warnings.append(f"{cn.step}音との間に {interval_name} ({ratio_str}) の不協和が発生")
-                        
-                acoustic_details.append(detail)
+                        verdict = ToneRelation.AVOID
+                        has_acoustic_avoid = True
+                relations.append(ToneRelation(cn, interval_name, info, score, verdict))
             else:
-                acoustic_details.append(f"  - vs {str(cn):<4} : {interval_name:<3} (Unknown Ratio)")
+                relations.append(ToneRelation(cn, interval_name, None, 0, ToneRelation.CONSONANT))
                 
         # --- 3. 総合判定 ---
         is_chord_tone = any(cn.pitch_class == melody_pc for cn in chord_notes)
         
         if is_chord_tone:
-            status = "Chord Tone (コードトーン: 最も安定)"
-        elif theory_avoid or len(acoustic_warnings) > 0:
-            status = "Avoid Note (アヴォイドノート: 回避推奨)"
+            status = MelodyResult.CHORD_TONE
+        elif theory_avoid or has_acoustic_avoid:
+            status = MelodyResult.AVOID
         else:
-            status = "Available Tension (有効なテンション: 豊かな響き)"
+            status = MelodyResult.TENSION
+
+        return MelodyResult(melody_note, chord_root_pc, chord_quality, status, theory_avoid, avoid_reason,
+                            total_dissonance, relations, formatter=self.format_melody)
+
+    def analyze_line(self, melody, chords) -> MelodyLineResult:
+        """
+        メロディライン全体（(発音時刻, 長さ, 音) の列）を、コードのタイムライン（(発音時刻, 長さ, コード) の列）に対して
+        まとめて判定するバッチ版 analyze_melody。音ごとの判定の配列と集計（summary()）を持つ MelodyLineResult を返す。
+        NumPy が必要なため、バッチ解析器は初回呼び出し時に読み込む。roughness を指定していれば同じ尺度で判定する。
+        """
+        if getattr(self, "_line_analyzer", None) is None:
+            from engine.melody_line import MelodyLineAnalyzer
+            self._line_analyzer = MelodyLineAnalyzer(self.roughness, self.avoid_roughness)
+        return self._line_analyzer.analyze_line(melody, chords)
+
+    def format_melody(self, result: MelodyResult) -> str:
+        """analyze_melody の結果をテキストレポートに整形する"""
+        lines = [f"Melody: [ {result.melody_note} ]  vs  Chord: {result.chord_quality} (Root PC: {result.chord_root_pc})", "-"*40]
+
+        acoustic_warnings = []
+        acoustic_details = []
+        for rel in result.relations:
+            cn, interval_name, info = rel.chord_note, rel.interval_name, rel.info
+            if info:
+                ratio_str = f"{info['ratio'][0]}:{info['ratio'][1]}"
+                detail = f"  - vs {str(cn):<4} : {interval_name:<3} ({info['name']}) [Ratio {ratio_str}]"
+            else:
+                ratio_str = "?"
+                detail = f"  - vs {str(cn):<4} : {interval_name:<3} (Unknown Ratio)"
+            if self.roughness is not None:
+                detail += f" [Roughness {round(rel.dissonance, 3)}]"
+            if rel.verdict == ToneRelation.TOLERATED_B9:
+                detail += " -> ⚠️ 強い不協和 (b9テンションとして許容)"
+            elif rel.verdict == ToneRelation.AVOID:
+                detail += " -> 🚫 アヴォイド要因 (激しい不協和)"
+                acoustic_warnings.append(f"{cn.step}音との間に {interval_name} ({ratio_str}) の不協和が発生")
+            acoustic_details.append(detail)
             
-        lines.append(f"Status: {status}")
+        lines.append(f"Status: {self.STATUS_TEXT[result.status]}")
         
-        if theory_avoid:
-            lines.append(f"Theory Alert: {avoid_reason}")
+        if result.theory_avoid:
+            lines.append(f"Theory Alert: {result.avoid_reason}")
         if acoustic_warnings:
             lines.append(f"Acoustic Alert: {', '.join(acoustic_warnings)}")
             
-        lines.append(f"Total Dissonance Score: {total_dissonance}")
+        total = result.total_dissonance if self.roughness is None else round(result.total_dissonance, 3)
+        lines.append(f"Total Dissonance Score: {total}")
         lines.append("Acoustic Relationships (vs Chord Tones):")
         lines.extend(acoustic_details)
         
-        return "\n".join(lines)
\ No newline at end of file
+        return "\n".join(lines)
@@ -0,0 +1,161 @@
+# engine/melody_line.py
+"""
+メロディライン全体（発音時刻・長さ・音の列）を、コードのタイムラインに対してまとめて判定する MelodyAnalyzer のバッチ版。
+
+- 各メロディ音には、発音時刻の時点で鳴っているコード（発音時刻が最後に来たもの）を割り当てる。
+  割り当ては np.searchsorted による時刻のスイープで、コードのタイムラインは発音時刻順でなくてもよい。
+- 構成音との音程は、(ステップ差 mod 7, 半音差 mod 12, オクターブ以上離れているか) の 7 x 12 x 2 通りについて
+  INTERVAL_INFO_DICT から事前に作った表（不協和度・強い不協和か・m2/m9 か）を引く。
+  12 x 12 のピッチクラスの表ではなく綴りを含めて引くのは、A4 / d5 や m2 / A1 を analyze_melody と同じく区別するため。
+- (メロディ音数, 最大構成音数) の配列演算で全音を一度に判定し、判定の規則は analyze_melody と同じ。
+  RoughnessModel を渡した場合は、不協和度とアヴォイド要因を音高どうしの粗さの表（(音域バンド, 音程)）から引く。
+NumPy が必要なので、MelodyAnalyzer.analyze_line から初回呼び出し時に読み込む。
+"""
+from typing import Iterable, List, Tuple
+import numpy as np
+
+from dictionaries.interval_dict import INTERVAL_INFO_DICT, get_dissonance_score
+from models.note import Note
+from models.results import MelodyLineResult
+from utils.interval_calc import INTERVAL_MAP
+
+# 強い不協和としてアヴォイド要因になる音程のうち、ドミナントのルートに対しては b9 として許容するもの
+_B9_NAMES = ("m2", "m9")
+
+
+def _relation_code(step_diff, semi_diff, compound):
+    """音程の表の添字: ステップ差(0~6)・半音差(0~11)・オクターブ以上離れているか"""
+    return (step_diff * 12 + semi_diff) * 2 + compound
+
+
+def _build_relation_table() -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """get_interval と同じ規則で音程名を決め、不協和度・強い不協和・b9 のフラグを表にする"""
+    names = []
+    dissonance = np.zeros(7 * 12 * 2, dtype=np.int64)
+    strong = np.zeros(7 * 12 * 2, dtype=bool)
+    b9 = np.zeros(7 * 12 * 2, dtype=bool)
+    for step_diff in range(7):
+        for semi_diff in range(12):
+            for compound in (0, 1):
+                base = INTERVAL_MAP.get((step_diff, semi_diff))
+                if base is None:
+                    name = f"Unknown({step_diff},{semi_diff})"
+                elif compound and int(base[1:]) in [2, 4, 6]:
+                    name = f"{base[0]}{int(base[1:]) + 7}"
+                else:
+                    name = base
+                code = _relation_code(step_diff, semi_diff, compound)
+                names.append(name)
+                if name in INTERVAL_INFO_DICT:
+                    score = get_dissonance_score(name)
+                    dissonance[code] = score
+                    strong[code] = score >= 5 or name in _B9_NAMES
+                    b9[code] = name in _B9_NAMES
+    return names, dissonance, strong, b9
+
+
+RELATION_NAMES, RELATION_DISSONANCE, RELATION_STRONG, RELATION_B9 = _build_relation_table()
+
+
+def _note(value) -> Note:
+    return value if isinstance(value, Note) else Note.from_string(value)
+
+
+class MelodyLineAnalyzer:
+    """メロディライン全体をコードのタイムラインに対して判定する（MelodyAnalyzer.analyze_line の実体）"""
+
+    def __init__(self, roughness=None, avoid_roughness: float = 0.5):
+        # MelodyAnalyzer と同じ: roughness が None なら音程名の表、指定すれば粗さで判定する
+        self.roughness = roughness
+        self.avoid_roughness = avoid_roughness
+
+    def analyze_line(self, melody: Iterable[tuple], chords: Iterable[tuple]) -> MelodyLineResult:
+        """
+        melody: (発音時刻, 長さ, 音) の列。音は Note または "F5" のような文字列
+        chords: (発音時刻, 長さ, コード) の列。コードは root_pc / quality / notes を持つもの（ChordCandidate など）。
+                長さが None なら次のコードの発音時刻まで（最後のコードは曲の終わりまで）鳴っているとみなす
+        """
+        melody = list(melody)
+        chords = list(chords)
+        order = sorted(range(len(chords)), key=lambda i: chords[i][0])
+        timeline = [chords[i] for i in order]
+        n = len(melody)
+
+        onsets = np.array([m[0] for m in melody], dtype=np.float64)
+        durations = np.array([m[1] for m in melody], dtype=np.float64)
+        notes = [_note(m[2]) for m in melody]
+        mel_step = np.array([note.step_index for note in notes], dtype=np.int64)
+        mel_semi = np.array([note.absolute_semitone for note in notes], dtype=np.int64)
+        mel_pc = mel_semi % 12
+
+        # --- 時刻のスイープ: 各音の発音時刻に鳴っているコード ---
+        chord_onsets = np.array([c[0] for c in timeline], dtype=np.float64)
+        chord_ends = np.empty(len(timeline), dtype=np.float64)
+        for i, (onset, duration, _chord) in enumerate(timeline):
+            if duration is not None:
+                chord_ends[i] = onset + duration
+            else:
+                chord_ends[i] = timeline[i + 1][0] if i + 1 < len(timeline) else np.inf
+        chord_index = np.searchsorted(chord_onsets, onsets, side="right") - 1
+        covered = chord_index >= 0
+        covered[covered] = onsets[covered] < chord_ends[chord_index[covered]]
+        # 返す番号は渡された chords の順での番号（鳴っているコードがなければ -1）
+        chord_index = np.where(covered, np.array(order + [-1], dtype=np.int64)[chord_index], -1)
+
+        status = np.full(n, MelodyLineResult.NO_CHORD, dtype=np.int8)
+        theory_avoid = np.zeros(n, dtype=bool)
+        acoustic_avoid = np.zeros(n, dtype=bool)
+        total_dissonance = np.zeros(n, dtype=np.int64 if self.roughness is None else np.float64)
+        if not timeline or not covered.any():
+            return MelodyLineResult(onsets, durations, chord_index, status, theory_avoid, acoustic_avoid, total_dissonance)
+
+        # --- コードごとの配列 (コード数, 最大構成音数) とクオリティのフラグ ---
+        width = max(len(c[2].notes) for c in timeline)
+        chord_step = np.zeros((len(timeline), width), dtype=np.int64)
+        chord_semi = np.zeros((len(timeline), width), dtype=np.int64)
+        chord_valid = np.zeros((len(timeline), width), dtype=bool)
+        chord_root = np.empty(len(timeline), dtype=np.int64)
+        is_dominant = np.empty(len(timeline), dtype=bool)
+        major_like = np.empty(len(timeline), dtype=bool)
+        minor_like = np.empty(len(timeline), dtype=bool)
+        for i, (_onset, _duration, chord) in enumerate(timeline):
+            tones = list(chord.notes)
+            chord_step[i, :len(tones)] = [t.step_index for t in tones]
+            chord_semi[i, :len(tones)] = [t.absolute_semitone for t in tones]
+            chord_valid[i, :len(tones)] = True
+            quality = chord.quality
+            chord_root[i] = chord.root_pc
+            is_dominant[i] = "7" in quality and "Maj" not in quality and "m7" not in quality
+            major_like[i] = "Maj" in quality or quality == "Major"
+            minor_like[i] = "m" in quality and "m7b5" not in quality
+
+        # --- 判定（カバーされている音だけ） ---
+        rows = np.searchsorted(chord_onsets, onsets[covered], side="right") - 1
+        step, semi, pc = mel_step[covered], mel_semi[covered], mel_pc[covered]
+        tone_step, tone_semi, valid = chord_step[rows], chord_semi[rows], chord_valid[rows]
+        root = chord_root[rows]
+
+        # 構成音からメロディ音への音程（メロディが下なら構成音の上に来るまでオクターブを上げる）
+        diff = semi[:, None] - tone_semi
+        code = _relation_code((step[:, None] - tone_step) % 7, diff % 12, (diff >= 12).astype(np.int64))
+        tone_pc = tone_semi % 12
+        tolerated = RELATION_B9[code] & is_dominant[rows][:, None] & (tone_pc == root[:, None])
+        if self.roughness is None:
+            dissonance = np.where(valid, RELATION_DISSONANCE[code], 0)
+            strong = RELATION_STRONG[code]
+        else:
+            pair = self.roughness.pairs(semi[:, None], tone_semi)
+            dissonance = np.where(valid, pair, 0.0)
+            strong = pair >= self.avoid_roughness
+        acoustic = (strong & ~tolerated & valid).any(axis=1)
+        chord_tone = ((tone_pc == pc[:, None]) & valid).any(axis=1)
+
+        root_diff = (pc - root) % 12
+        theory = ((root_diff == 5) & major_like[rows]) | ((root_diff == 8) & minor_like[rows])
+
+        status[covered] = np.where(chord_tone, MelodyLineResult.CHORD_TONE,
+                                   np.where(theory | acoustic, MelodyLineResult.AVOID, MelodyLineResult.TENSION))
+        theory_avoid[covered] = theory
+        acoustic_avoid[covered] = acoustic
+        total_dissonance[covered] = dissonance.sum(axis=1)
+        return MelodyLineResult(onsets, durations, chord_index, status, theory_avoid, acoustic_avoid, total_dissonance)
@@ -1,4 +1,7 @@
+from typing import Dict, Iterable, Iterator, List, Optional
 from engine.analyzer import ChordAnalyzer
+from engine.key_tracker import KEY_NAMES, KeyTracker
+from engine.progression_decoder import ProgressionDecoder
 from engine.transition_analyzer import TransitionAnalyzer
 from models.note import parse_notes # これは一つ上の階層なので、実行方法によっては修正が必要（後述）
 
@@ -10,39 +13,170 @@ class ProgressionAnalyzer:
     def __init__(self):
         self.chord_analyzer = ChordAnalyzer()
         self.transition_analyzer = TransitionAnalyzer()
+        # 進行全体で解釈を選ぶデコーダ（k や beam_width はこのインスタンスの属性で変えられる）
+        self.decoder = ProgressionDecoder(self.chord_analyzer, self.transition_analyzer)
 
-    def analyze_progression(self, progression_list: list, key: str = "C"):
-        reports = []
+    def analyze_progression(self, progression_list: list, key: str = "C", track_key: bool = False, decode: bool = False):
+        """
+        track_key=True なら、key を最初の Key として転調を追跡する（KeyTracker の既定の設定）。
+        decode=True なら、コードごとの貪欲な選択の代わりに decode_progression で進行全体の最適な解釈を選ぶ。
+        """
+        key_tracker = KeyTracker(initial_key=key) if track_key else None
+        if decode:
+            records = self.decode_progression(progression_list, key=key, key_tracker=key_tracker)
+        else:
+            records = self.iter_progression(progression_list, key=key, key_tracker=key_tracker)
+        return "\n".join(self.format_progression(records))
+
+    def iter_progression(self, voicings: Iterable, key: str = "C", threshold: int = 40,
+                         key_tracker: Optional[KeyTracker] = None) -> Iterator[dict]:
+        """
+        ボイシング（"C3, E3, G3" のような文字列、または Note のリスト）を1つずつ読み、
+        コードごと・遷移ごとに結果レコード（dict）を順次 yield するジェネレータ。
+        保持するのは直前のコードの判定結果だけなので、長い曲でもメモリ使用量は一定。
+
+        key_tracker を渡すと、各コードを取り込んだ時点の局所的な Key でコード名の綴り・ディグリー・カデンツを評価する
+        （渡さなければ全体を key で評価する）。遷移は後ろのコードの Key で評価する。
+
+        - {"type": "chord", "index", "input", "notes", "chord", "key", "modulation"}
+              chord は ChordCandidate（判定できなければ None）。modulation は直前のコードから Key が変わったか
+        - {"type": "transition", "index", "from", "to", "transition"} transition は TransitionResult
+        """
         previous_chord_data = None
+        previous_key = key
+
+        for i, voicing in enumerate(voicings):
+            notes = parse_notes(voicing) if isinstance(voicing, str) else list(voicing)
+
+            local_key = key_tracker.update(notes) if key_tracker is not None and notes else previous_key
+            modulation = local_key != previous_key
+            previous_key = local_key
 
-        for i, notes_str in enumerate(progression_list):
-            notes = parse_notes(notes_str)
-            
             # 1. コードを自動判定（最もスコアの高いものを採用）
-            current_chord_data = self.chord_analyzer.get_best_interpretation(notes, key=key)
-            
+            current_chord_data = self.chord_analyzer.get_best_interpretation(notes, key=local_key, threshold=threshold, fast=True) if notes else None
+            yield {"type": "chord", "index": i, "input": voicing, "notes": notes, "chord": current_chord_data,
+                   "key": local_key, "modulation": modulation}
+
             if not current_chord_data:
-                reports.append(f"Chord {i+1}: Unknown chord [{notes_str}]")
                 previous_chord_data = None
                 continue
 
-            # 2. 判定結果を表示
-            reports.append(f"--- Chord {i+1}: {current_chord_data['name']} (Score: {current_chord_data['score']}) ---")
-
-            # 3. 前のコードがあれば、遷移解析を自動実行
+            # 2. 前のコードがあれば、遷移解析を自動実行
             if previous_chord_data:
-                transition_report = self.transition_analyzer.analyze_transition(
-                    chord_a_root_pc=previous_chord_data['root_pc'],
-                    chord_a_quality=previous_chord_data['quality'],
-                    notes_a=previous_chord_data['notes'],
-                    chord_b_root_pc=current_chord_data['root_pc'],
-                    chord_b_quality=current_chord_data['quality'],
-                    notes_b=current_chord_data['notes'],
-                    key_name=key
+                transition = self.transition_analyzer.evaluate_transition(
+                    chord_a_root_pc=previous_chord_data.root_pc,
+                    chord_a_quality=previous_chord_data.quality,
+                    notes_a=previous_chord_data.notes,
+                    chord_b_root_pc=current_chord_data.root_pc,
+                    chord_b_quality=current_chord_data.quality,
+                    notes_b=current_chord_data.notes,
+                    key_name=local_key
                 )
-                reports.append(transition_report)
-                reports.append("\n")
+                yield {"type": "transition", "index": i, "from": previous_chord_data, "to": current_chord_data, "transition": transition}
+
+            previous_chord_data = current_chord_data
+
+    def decode_progression(self, voicings: Iterable, key: str = "C", threshold: int = 40,
+                           key_tracker: Optional[KeyTracker] = None) -> List[dict]:
+        """
+        各コードの上位 k 件の解釈から、コードのスコアと遷移のスコア（ボイスリーディング + カデンツ）の合計が
+        最大になる組み合わせを ProgressionDecoder（Viterbi）で選び、iter_progression と同じ形のレコードのリストを返す。
+        経路は進行全体を見て決まるので、ジェネレータではなくリストになる。
+        chord レコードには、選んだ解釈の候補内の順位 "rank"（0 なら貪欲な選択と同じ）が加わる。
+        """
+        inputs, lattice, keys = [], [], []
+        previous_key = key
+        for voicing in voicings:
+            notes = parse_notes(voicing) if isinstance(voicing, str) else list(voicing)
+            local_key = key_tracker.update(notes) if key_tracker is not None and notes else previous_key
+            previous_key = local_key
+            inputs.append((voicing, notes))
+            keys.append(local_key)
+            lattice.append(self.decoder.candidates(notes, key=local_key, threshold=threshold))
 
+        path, _score = self.decoder.decode(lattice, keys)
+
+        records = []
+        previous_chord_data = None
+        for i, ((voicing, notes), local_key, rank) in enumerate(zip(inputs, keys, path)):
+            current_chord_data = lattice[i][rank] if rank is not None else None
+            records.append({"type": "chord", "index": i, "input": voicing, "notes": notes, "chord": current_chord_data,
+                            "key": local_key, "modulation": local_key != (keys[i - 1] if i else key), "rank": rank})
+            if current_chord_data and previous_chord_data:
+                transition = self.transition_analyzer.evaluate_transition(
+                    previous_chord_data.root_pc, previous_chord_data.quality, previous_chord_data.notes,
+                    current_chord_data.root_pc, current_chord_data.quality, current_chord_data.notes, key_name=local_key)
+                records.append({"type": "transition", "index": i, "from": previous_chord_data,
+                                "to": current_chord_data, "transition": transition})
             previous_chord_data = current_chord_data
+        return records
+
+    def sweep_keys(self, voicings: Iterable, keys: Optional[Iterable[str]] = None, threshold: int = 40) -> Dict[str, List[dict]]:
+        """
+        同じ進行を複数の Key で読んだ結果を、Key ごとに iter_progression と同じ形のレコードのリストで返す
+        （keys の既定は長調・短調の 24 調。各 Key の結果は list(iter_progression(voicings, key=...)) と一致する）。
+
+        コード判定（ChordAnalyzer.analyze_key_free）とボイスリーディングは Key に依存しないので、
+        進行全体で1回ずつ（同じボイシングは1回だけ）行い、Key ごとには綴りの表（KeyContext）と
+        主音からの相対位置でメモ化したカデンツの表（TransitionAnalyzer.cadence_in_key）を引くだけにする。
+        声部の対応（mappings）とカデンツの dict は Key 間で共有される。
+        """
+        keys = list(KEY_NAMES if keys is None else keys)
+        transition_analyzer = self.transition_analyzer
+
+        # 1. Key に依存しない解析（ボイシングごと）と、遷移ごとのボイスリーディング
+        inputs, analyses, summaries = [], [], []
+        by_voicing = {}
+        previous = None
+        for voicing in voicings:
+            notes = parse_notes(voicing) if isinstance(voicing, str) else list(voicing)
+            analysis = None
+            if notes:
+                analysis = by_voicing.get(tuple(notes))
+                if analysis is None:
+                    analysis = by_voicing[tuple(notes)] = self.chord_analyzer.analyze_key_free(notes, threshold=threshold)
+            analysis = analysis or None  # 解釈がなければ None（iter_progression で chord が None になる位置）
+            summary = None
+            if analysis is not None and previous is not None:
+                summary = transition_analyzer.voice_leading_summary(previous.sorted_notes, analysis.sorted_notes)
+            inputs.append((voicing, notes))
+            analyses.append(analysis)
+            summaries.append(summary)
+            previous = analysis
+
+        # 2. Key ごとの綴り・ディグリー・カデンツ
+        results = {}
+        for key in keys:
+            key_root_pc = transition_analyzer.deg_conv._get_key_root_pc(key)
+            records = []
+            previous_chord_data = None
+            for i, ((voicing, notes), analysis, summary) in enumerate(zip(inputs, analyses, summaries)):
+                current_chord_data = analysis.candidate(key) if analysis is not None else None
+                records.append({"type": "chord", "index": i, "input": voicing, "notes": notes, "chord": current_chord_data,
+                                "key": key, "modulation": False})
+                if current_chord_data and previous_chord_data:
+                    transition = transition_analyzer.project_transition(
+                        summary, previous_chord_data.root_pc, previous_chord_data.quality,
+                        current_chord_data.root_pc, current_chord_data.quality, key, key_root_pc)
+                    records.append({"type": "transition", "index": i, "from": previous_chord_data,
+                                    "to": current_chord_data, "transition": transition})
+                previous_chord_data = current_chord_data
+            results[key] = records
+        return results
 
-        return "\n".join(reports)
\ No newline at end of file
+    def format_progression(self, records: Iterable[dict]) -> Iterator[str]:
+        """iter_progression のレコード列を、analyze_progression と同じテキストブロックに順次変換する"""
+        for record in records:
+            if record["type"] == "chord":
+                if record.get("modulation"):
+                    yield f"=== Key: {record['key']} ==="
+                chord = record["chord"]
+                if not chord:
+                    voicing = record["input"]
+                    notes_str = voicing if isinstance(voicing, str) else ", ".join(str(n) for n in record["notes"])
+                    yield f"Chord {record['index']+1}: Unknown chord [{notes_str}]"
+                else:
+                    yield f"--- Chord {record['index']+1}: {chord.name} (Score: {chord.score}) ---"
+            elif record["type"] == "transition":
+                yield record["transition"].text
+                yield "\n"
@@ -0,0 +1,101 @@
+# engine/progression_decoder.py
+"""
+コード進行全体で最適なコード解釈の組み合わせを選ぶ Viterbi デコーダ。
+
+ProgressionAnalyzer.iter_progression はコードごとに最高スコアの解釈を貪欲に採用するので、
+単体では少し低いが前後と強いカデンツを作る解釈は選ばれない。
+ここでは各コードの上位 k 件を状態とするラティスを作り、
+
+    経路のスコア = Σ chord_weight * コードのスコア + Σ transition_weight * (ボイスリーディング + カデンツボーナス)
+
+が最大になる経路を動的計画法で求める。各位置で累積スコアの上位 beam_width 件の状態だけを残すので、
+計算量は O(コード数 * beam_width * k) で進行の長さに線形。
+
+辺のスコアのうち、ボイスリーディングは同じコードの候補がすべて同じ入力音を持つため位置の組ごとに1回だけ計算し、
+カデンツボーナスは TransitionAnalyzer.cadence_in_key（主音からの相対位置でメモ化した上限付きの LRU）を引く。
+判定できないコード（候補なし）の前後で進行は区切られ、区間ごとに独立に解く。
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from engine.analyzer import ChordAnalyzer
+from engine.transition_analyzer import TransitionAnalyzer
+from models.note import Note
+from models.results import ChordCandidate
+
+
+class ProgressionDecoder:
+    def __init__(self, chord_analyzer: ChordAnalyzer = None, transition_analyzer: TransitionAnalyzer = None,
+                 k: int = 4, beam_width: int = 4, chord_weight: float = 1.0, transition_weight: float = 1.0):
+        self.chord_analyzer = chord_analyzer or ChordAnalyzer()
+        self.transition_analyzer = transition_analyzer or TransitionAnalyzer()
+        # 各コードで状態にする候補数と、各位置で残す状態数
+        self.k = k
+        self.beam_width = beam_width
+        self.chord_weight = chord_weight
+        self.transition_weight = transition_weight
+
+    def candidates(self, notes: List[Note], key: str = "C", threshold: int = 40) -> List[ChordCandidate]:
+        """ラティスの1列: 閾値以上の解釈の上位 k 件（スコア順）"""
+        if not notes:
+            return []
+        return self.chord_analyzer.get_top_interpretations(notes, k=self.k, key=key, threshold=threshold, fast=True)
+
+    def cadence_bonus(self, a: ChordCandidate, b: ChordCandidate, key_root_pc: int) -> int:
+        """主音のピッチクラスが key_root_pc の Key での a -> b のカデンツボーナス"""
+        return self.transition_analyzer.cadence_in_key(a.root_pc, a.quality, b.root_pc, b.quality, key_root_pc)["bonus"]
+
+    def smoothness(self, a: ChordCandidate, b: ChordCandidate, key: str) -> int:
+        """2つの候補の入力音の間のボイスリーディングのスコア（Key には依存しないので、ディグリー・カデンツの判定はしない）"""
+        return self.transition_analyzer.voice_leading_summary(a.notes, b.notes)[3]
+
+    def _prune(self, scores: Dict[int, float]) -> List[Tuple[int, float]]:
+        """累積スコアの高い順（同点は候補の順位が上のもの）に beam_width 件の (候補番号, スコア) を残す"""
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:self.beam_width] if self.beam_width else ranked
+
+    def decode(self, lattice: Sequence[List[ChordCandidate]], keys: Sequence[str]) -> Tuple[List[Optional[int]], float]:
+        """
+        ラティス（位置ごとの候補リスト）と位置ごとの Key から最適な経路を求め、
+        (位置ごとに選んだ候補の番号（候補がなければ None）, 経路のスコアの合計) を返す。
+        遷移のスコアは後ろのコードの位置の Key で評価する。
+        """
+        n = len(lattice)
+        path: List[Optional[int]] = [None] * n
+        total = 0.0
+        cw, tw = self.chord_weight, self.transition_weight
+        key_root_pc = self.transition_analyzer.deg_conv._get_key_root_pc
+        i = 0
+        while i < n:
+            if not lattice[i]:
+                i += 1
+                continue
+            start = i
+            states = self._prune({j: cw * c.score for j, c in enumerate(lattice[i])})
+            backpointers: List[Dict[int, int]] = []
+            while i + 1 < n and lattice[i + 1]:
+                column, next_column, key = lattice[i], lattice[i + 1], keys[i + 1]
+                smooth = self.smoothness(column[0], next_column[0], key)
+                root_pc = key_root_pc(key)
+                scores: Dict[int, float] = {}
+                back: Dict[int, int] = {}
+                for j, b in enumerate(next_column):
+                    best_prev, best_score = None, None
+                    for p, score in states:
+                        value = score + tw * (smooth + self.cadence_bonus(column[p], b, root_pc))
+                        if best_score is None or value > best_score:
+                            best_prev, best_score = p, value
+                    scores[j] = best_score + cw * b.score
+                    back[j] = best_prev
+                backpointers.append(back)
+                states = self._prune(scores)
+                i += 1
+
+            # 区間の終わりから逆にたどる
+            j, score = states[0]
+            total += score
+            path[i] = j
+            for pos in range(i, start, -1):
+                j = backpointers[pos - start - 1][j]
+                path[pos - 1] = j
+            i += 1
+        return path, total
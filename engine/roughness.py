@@ -0,0 +1,122 @@
+# engine/roughness.py
+"""
+倍音列どうしの干渉（Plomp-Levelt の不協和曲線を Sethares が定式化したもの）による、音響的な粗さ（roughness）のモデル。
+
+dictionaries/interval_dict.get_dissonance_score は音程名を 0/1/3/5 の4段階に割り当てるだけなので、
+同じ音程でも低音域ほど濁る・複音程ほど滑らかになる、といった物理的な差は表せない。ここでは各音を
+第 n_harmonics 倍音まで（振幅は decay ** (k-1)）の倍音列とみなし、2音の全倍音の組について
+
+    d = min(a1, a2) * (exp(-B1 * s * Δf) - exp(-B2 * s * Δf)),   s = D_STAR / (S1 * min(f1, f2) + S2)
+
+を合計したものを2音の粗さとする。値は下の音の音域と音程（半音数）だけで決まるので、
+(音域バンド, 音程) の表を NumPy のブロードキャストで一度に計算してメモ化しておき、
+ボイシング全体の粗さは全ての2音の組の表の値の合計として、(N, 音数, 音数) の配列演算でまとめて求める。
+
+音域バンドは下の音の絶対半音数を band_width 半音ごとに区切ったもので、バンド内の音は中央の音の周波数で代表させる
+（band_width=1 なら近似なし）。音程は MAX_INTERVAL 半音で打ち切る。
+"""
+from typing import Iterable, List
+import numpy as np
+
+# Sethares (1993) のパラメータ
+D_STAR = 0.24
+S1 = 0.0207
+S2 = 18.96
+B1 = 3.51
+B2 = 5.75
+
+# 絶対半音数（C0 = 0）で A4 = 440Hz
+A4_SEMITONE = 57
+A4_FREQUENCY = 440.0
+
+# 表の範囲（絶対半音数 0~127 の音どうし）
+SEMITONE_RANGE = 128
+MAX_INTERVAL = SEMITONE_RANGE - 1
+
+
+def frequency(semitone) -> np.ndarray:
+    """絶対半音数（C0 = 0）の平均律の周波数"""
+    return A4_FREQUENCY * 2.0 ** ((np.asarray(semitone, dtype=np.float64) - A4_SEMITONE) / 12)
+
+
+class RoughnessModel:
+    """
+    (音域バンド, 音程) ごとの2音の粗さの表と、ボイシング全体の粗さの計算。
+
+    - pair(lower, interval): 下の音の絶対半音数と音程（半音）から2音の粗さ（表引きのみ）
+    - pairs(a, b): 絶対半音数の配列どうしの要素ごとの粗さ
+    - voicing(notes): 1つのボイシングの全ての2音の組の粗さの合計
+    - voicings(semitones, mask): (N, 最大音数) の絶対半音数配列の各行の粗さ
+    - profile(semitones): 各音とそれ以外の音との粗さの合計（どの音が濁りの原因か）
+    - above(lower, others): 1つの音とそれより上の音それぞれとの粗さの合計
+    """
+
+    def __init__(self, n_harmonics: int = 6, decay: float = 0.88, band_width: int = 12):
+        if n_harmonics < 1 or band_width < 1:
+            raise ValueError("n_harmonics and band_width must be >= 1")
+        self.n_harmonics = n_harmonics
+        self.decay = decay
+        self.band_width = band_width
+        self.n_bands = -(-SEMITONE_RANGE // band_width)
+        self.table = self._build_table()
+        # スカラーの表引き用（np.float64 の添字アクセスより速い）
+        self._rows: List[List[float]] = self.table.tolist()
+
+    def _build_table(self) -> np.ndarray:
+        """(バンド数, MAX_INTERVAL + 1) の粗さの表。軸は (バンド, 音程, 下の音の倍音, 上の音の倍音) で一度に計算する"""
+        k = np.arange(1, self.n_harmonics + 1, dtype=np.float64)
+        amps = self.decay ** (k - 1)
+        centers = np.arange(self.n_bands) * self.band_width + (self.band_width - 1) / 2
+        lower = frequency(centers)[:, None, None, None] * k[None, None, :, None]
+        upper = (frequency(centers)[:, None] * 2.0 ** (np.arange(MAX_INTERVAL + 1) / 12))[:, :, None, None] * k[None, None, None, :]
+        f_min = np.minimum(lower, upper)
+        delta = np.abs(upper - lower)
+        s = D_STAR / (S1 * f_min + S2)
+        amp = np.minimum(amps[:, None], amps[None, :])
+        d = amp * (np.exp(-B1 * s * delta) - np.exp(-B2 * s * delta))
+        return d.sum(axis=(2, 3))
+
+    def pair(self, lower: int, interval: int) -> float:
+        """下の音の絶対半音数 lower と、そこから上への音程 interval（半音）の2音の粗さ"""
+        band = min(max(lower, 0) // self.band_width, self.n_bands - 1)
+        return self._rows[band][min(abs(interval), MAX_INTERVAL)]
+
+    def pairs(self, a, b) -> np.ndarray:
+        """絶対半音数の配列 a, b（ブロードキャスト可）の要素ごとの2音の粗さ"""
+        a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+        band = np.clip(np.minimum(a, b) // self.band_width, 0, self.n_bands - 1)
+        return self.table[band, np.minimum(np.abs(a - b), MAX_INTERVAL)]
+
+    def _pairwise(self, semis: np.ndarray) -> np.ndarray:
+        """(..., V) の絶対半音数から (..., V, V) の全ての2音の組の粗さ（同じ音どうしの対角は 0）"""
+        pairs = self.pairs(semis[..., :, None], semis[..., None, :])
+        return np.where(np.eye(semis.shape[-1], dtype=bool), 0.0, pairs)
+
+    def voicings(self, semitones, mask=None) -> np.ndarray:
+        """(N, 最大音数) の絶対半音数配列（mask で有効な音を指定）の各行の粗さを (N,) で返す"""
+        semis = np.asarray(semitones, dtype=np.int64)
+        pairs = self._pairwise(semis)
+        if mask is not None:
+            valid = np.asarray(mask, dtype=bool)
+            pairs = np.where(valid[..., :, None] & valid[..., None, :], pairs, 0.0)
+        # 全ての組を2回ずつ数えているので半分にする
+        return pairs.sum(axis=(-2, -1)) / 2
+
+    def profile(self, semitones: Iterable[int]) -> np.ndarray:
+        """各音とそれ以外の全ての音との粗さの合計（入力の順）"""
+        return self._pairwise(np.asarray(list(semitones), dtype=np.int64)).sum(axis=-1)
+
+    def voicing(self, notes: Iterable) -> float:
+        """1つのボイシング（Note または絶対半音数の列）の粗さ"""
+        semis = [n if isinstance(n, (int, np.integer)) else n.absolute_semitone for n in notes]
+        if len(semis) < 2:
+            return 0.0
+        return float(self.voicings(np.array([semis], dtype=np.int64))[0])
+
+    def above(self, lower: int, others: Iterable[int]) -> float:
+        """
+        音 lower と、それ以上の高さの他の音それぞれとの粗さの合計（lower と同じ高さの音は数えない）。
+        下の音が共通なので表の行を1回だけ引く（スカラー版の解析器から使う）
+        """
+        row = self._rows[min(max(lower, 0) // self.band_width, self.n_bands - 1)]
+        return sum(row[min(o - lower, MAX_INTERVAL)] for o in others if o != lower)
@@ -1,11 +1,18 @@
 # engine/transition_analyzer.py
-from typing import List
+from collections import OrderedDict
+from typing import List, Tuple
 from models.note import Note
 from engine.degree_converter import DegreeConverter
-from dictionaries.cadence_dict import CADENCE_DICT # ★ 辞書をインポート
+from engine.cadence_index import CadenceIndex, get_cadence_index # ★ CADENCE_DICT をコンパイルした検索表
+from models.results import TransitionResult, VoiceMapping
+from engine.voice_leading import VoiceLeadingEngine
+from utils.formatter import KeyContext
 
 class TransitionAnalyzer:
-    def __init__(self):
+    # cadence_in_key のメモ化で保持する数（動的生成のクオリティ名は際限なく現れうるので LRU で上限を設ける）
+    CADENCE_CACHE_SIZE = 4096
+
+    def __init__(self, voice_leading: VoiceLeadingEngine = None, cadence_index: CadenceIndex = None):
         self.MOVEMENT_NAMES = {
             0: "Common Tone (保留)",
             1: "m2 (半音)", 2: "M2 (全音)", 3: "m3 (短3度)", 4: "M3 (長3度)",
@@ -13,6 +20,12 @@ class TransitionAnalyzer:
             8: "m6 (短6度)", 9: "M6 (長6度)", 10: "m7 (短7度)", 11: "M7 (長7度)"
         }
         self.deg_conv = DegreeConverter()
+        # 声部の対応付け（コスト関数を差し替えたい場合は VoiceLeadingEngine(cost=...) を渡す）
+        self.voice_leading = voice_leading or VoiceLeadingEngine()
+        # カデンツ辞書の検索表（独自の辞書を使う場合は CadenceIndex(cadence_dict) を渡す）
+        self.cadence_index = cadence_index or get_cadence_index()
+        # (主音からのルートA, クオリティA, 主音からのルートB, クオリティB) -> _evaluate_cadence の結果（cadence_in_key 用）
+        self._relative_cadences: "OrderedDict[Tuple[int, str, int, str], dict]" = OrderedDict()
 
     def _get_movement_str(self, diff: int) -> str:
         if diff == 0: return self.MOVEMENT_NAMES[0]
@@ -31,35 +44,15 @@ class TransitionAnalyzer:
         roman_a = self.deg_conv.SEMITONE_TO_DEGREE[(root_a - key_root_pc) % 12]
         roman_b = self.deg_conv.SEMITONE_TO_DEGREE[(root_b - key_root_pc) % 12]
         
-        best_match = None
-        all_matches = [] # ★ マッチした全ての候補を保存するリスト
-
-        # 1. 辞書からのマッチング探索
-        for cadence in CADENCE_DICT:
-            if cadence["from_degree"] != roman_a or cadence["to_degree"] != roman_b:
-                continue
-                
-            from_q_match = any(q == quality_a or (q == "" and quality_a in ["", "Major"]) for q in cadence["from_quality"])
-            if not from_q_match:
-                continue
-                
-            if "to_quality_include" in cadence and cadence["to_quality_include"]:
-                if not any(q in quality_b for q in cadence["to_quality_include"]):
-                    continue
-            if "to_quality_exclude" in cadence and cadence["to_quality_exclude"]:
-                if any(q in quality_b for q in cadence["to_quality_exclude"]):
-                    continue
-                    
-            # 条件に一致したものをリストに追加
-            match_data = {"type": "Dict Match", "name": cadence["name"], "bonus": cadence["bonus"]}
-            all_matches.append(match_data)
-            
-            if best_match is None or cadence["bonus"] > best_match["bonus"]:
-                best_match = match_data
+        # 1. 辞書からのマッチング探索（(from, to) のハッシュ引き + クオリティIDのビット判定。ボーナス順に並んで返る）
+        all_matches = [
+            {"type": "Dict Match", "id": entry.cadence_id, "name": entry.name, "bonus": entry.bonus}
+            for entry in self.cadence_index.match(roman_a, roman_b, quality_a, quality_b)
+        ]
 
-        if best_match:
-            # ★ スコアが高い順にソートして、トップのデータに全候補リストをくっつけて返す
-            all_matches.sort(key=lambda x: x['bonus'], reverse=True)
+        if all_matches:
+            # ★ トップのデータに全候補リストをくっつけて返す
+            best_match = all_matches[0]
             best_match["all_matches"] = all_matches
             return best_match
 
@@ -85,55 +78,88 @@ class TransitionAnalyzer:
 
     def analyze_transition(self, chord_a_root_pc: int, chord_a_quality: str, notes_a: List[Note], 
                                  chord_b_root_pc: int, chord_b_quality: str, notes_b: List[Note], 
-                                 key_name: str = "C") -> str:
-        
-        # ... (前半のボイスリーディングのマッチング処理と score 計算部分はそのまま) ...
-        # (※ここでは省略せずに、お手元のコードのまま残してください)
-        unmatched_a = list(notes_a)
-        unmatched_b = list(notes_b)
-        mappings = []
-
-        for nb in list(unmatched_b):
-            best_match = None
-            for na in unmatched_a:
-                if na.absolute_semitone == nb.absolute_semitone:
-                    best_match = na
-                    break
-            if best_match:
-                mappings.append((best_match, nb, 0))
-                unmatched_a.remove(best_match)
-                unmatched_b.remove(nb)
-
-        for nb in list(unmatched_b):
-            if not unmatched_a:
-                mappings.append((None, nb, None))
-                continue
-            unmatched_a.sort(key=lambda na: abs(na.absolute_semitone - nb.absolute_semitone))
-            best_match = unmatched_a.pop(0)
-            diff = nb.absolute_semitone - best_match.absolute_semitone
-            mappings.append((best_match, nb, diff))
-
-        for na in unmatched_a:
-            mappings.append((na, None, None))
+                                 key_name: str = "C") -> TransitionResult:
+        # テキストは結果オブジェクトの str() / .text で必要になったときに format_transition で組み立てる
+        return self.evaluate_transition(chord_a_root_pc, chord_a_quality, notes_a,
+                                        chord_b_root_pc, chord_b_quality, notes_b, key_name)
+
+    def evaluate_transition(self, chord_a_root_pc: int, chord_a_quality: str, notes_a: List[Note],
+                            chord_b_root_pc: int, chord_b_quality: str, notes_b: List[Note],
+                            key_name: str = "C") -> TransitionResult:
+        """
+        ボイスリーディングとカデンツを評価し、文字列を組み立てずに結果オブジェクトを返す
+        """
+        mappings, total_movement, common_tones, smoothness_score = self.voice_leading_summary(notes_a, notes_b)
+
+        # カデンツ評価の呼び出し
+        cadence_info = self._evaluate_cadence(chord_a_root_pc, chord_a_quality, chord_b_root_pc, chord_b_quality, key_name)
+        total_score = smoothness_score + cadence_info["bonus"]
+
+        return TransitionResult(
+            key_name, chord_a_root_pc, chord_a_quality, chord_b_root_pc, chord_b_quality,
+            mappings, total_movement, common_tones, cadence_info, smoothness_score, total_score,
+            formatter=self.format_transition
+        )
+
+    def voice_leading_summary(self, notes_a: List[Note], notes_b: List[Note]) -> Tuple[List[VoiceMapping], int, int, int]:
+        """遷移のうち Key に依存しない部分: (声部の対応, 総移動量, 共通音の数, ボイスリーディングのスコア)"""
+        # 最小コスト割り当て（移動距離・声部交差・平行5度）で声部を対応付ける
+        mappings = self.voice_leading.assign(notes_a, notes_b)
 
         total_movement = 0
         common_tones = 0
-        for ma, mb, diff in mappings:
+        for mapping in mappings:
+            diff = mapping.diff
             if diff == 0:
                 common_tones += 1
             elif diff is not None:
                 total_movement += abs(diff)
 
-        # カデンツ評価の呼び出し
-        cadence_info = self._evaluate_cadence(chord_a_root_pc, chord_a_quality, chord_b_root_pc, chord_b_quality, key_name)
-        
         smoothness_score = 80 - (total_movement * 2) + (common_tones * 10)
-        total_score = smoothness_score + cadence_info["bonus"]
+        return mappings, total_movement, common_tones, smoothness_score
+
+    def cadence_in_key(self, root_a: int, quality_a: str, root_b: int, quality_b: str, key_root_pc: int) -> dict:
+        """
+        _evaluate_cadence の結果を、主音からの相対位置（ディグリー）とクオリティでメモ化して返す。
+        カデンツは主音との半音差だけで決まるので、長調・短調や Key名 が違っても同じ表を共有する（返す dict は変更しないこと）。
+        """
+        cache_key = ((root_a - key_root_pc) % 12, quality_a, (root_b - key_root_pc) % 12, quality_b)
+        cadences = self._relative_cadences
+        cadence = cadences.get(cache_key)
+        if cadence is not None:
+            cadences.move_to_end(cache_key)
+            return cadence
+        cadence = cadences[cache_key] = self._evaluate_cadence(cache_key[0], quality_a, cache_key[2], quality_b, "C")
+        while len(cadences) > self.CADENCE_CACHE_SIZE:
+            cadences.popitem(last=False)
+        return cadence
+
+    def project_transition(self, summary: tuple, chord_a_root_pc: int, chord_a_quality: str,
+                           chord_b_root_pc: int, chord_b_quality: str, key_name: str, key_root_pc: int) -> TransitionResult:
+        """
+        voice_leading_summary の結果（Key に依存しない部分）に Key ごとのカデンツを合わせて、
+        evaluate_transition と同じ結果オブジェクトを作る（声部の対応は Key 間で共有する）
+        """
+        mappings, total_movement, common_tones, smoothness_score = summary
+        cadence_info = self.cadence_in_key(chord_a_root_pc, chord_a_quality, chord_b_root_pc, chord_b_quality, key_root_pc)
+        return TransitionResult(
+            key_name, chord_a_root_pc, chord_a_quality, chord_b_root_pc, chord_b_quality,
+            mappings, total_movement, common_tones, cadence_info, smoothness_score,
+            smoothness_score + cadence_info["bonus"], formatter=self.format_transition
+        )
+
+    def format_transition(self, transition: TransitionResult) -> str:
+        """evaluate_transition の結果をテキストレポートに整形する"""
+        key_name = transition.key_name
+        chord_a_root_pc, chord_a_quality = transition.chord_a_root_pc, transition.chord_a_quality
+        chord_b_root_pc, chord_b_quality = transition.chord_b_root_pc, transition.chord_b_quality
+        cadence_info = transition.cadence
+        smoothness_score = transition.smoothness_score
+        total_score = transition.total_score
 
         degree_a = self.deg_conv.convert_to_degree(chord_a_root_pc, chord_a_quality, key_name)
         degree_b = self.deg_conv.convert_to_degree(chord_b_root_pc, chord_b_quality, key_name)
 
-        from utils.formatter import KeyContext
         kc = KeyContext(key_name)
         chord_a_name = f"{kc.get_note_name(chord_a_root_pc)}{chord_a_quality}"
         chord_b_name = f"{kc.get_note_name(chord_b_root_pc)}{chord_b_quality}"
@@ -158,7 +184,7 @@ class TransitionAnalyzer:
             "Voice Leading Details:"
         ])
         
-        mappings.sort(key=lambda m: m[1].absolute_semitone if m[1] else m[0].absolute_semitone, reverse=True)
+        mappings = sorted(transition.mappings, key=lambda m: m.target.absolute_semitone if m.target else m.source.absolute_semitone, reverse=True)
         
         for ma, mb, diff in mappings:
             if ma and mb:
@@ -0,0 +1,210 @@
+# engine/voice_leading.py
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from models.note import Note
+from models.results import VoiceMapping
+
+
+_MASK_TABLES: Dict[int, tuple] = {}
+
+
+def _mask_tables(m: int) -> tuple:
+    """ターゲット数 m ごとの補助表: マスクごとの未使用ビット一覧と、使用数ごとのマスク一覧"""
+    tables = _MASK_TABLES.get(m)
+    if tables is None:
+        full = 1 << m
+        free = [[(j, 1 << j) for j in range(m) if not mask & (1 << j)] for mask in range(full)]
+        by_count = [[] for _ in range(m + 1)]
+        for mask in range(full):
+            by_count[bin(mask).count("1")].append(mask)
+        tables = _MASK_TABLES[m] = (free, by_count)
+    return tables
+
+
+class VoiceLeadingCost:
+    """
+    ボイスリーディングの割り当てコスト（差し替え可能）。整数で計算する。
+      - move()  : 1声部の移動コスト（半音距離 × move_weight。保留音は common_tone_bonus だけ差し引く）
+      - pair()  : 2声部の組み合わせに対するペナルティ（声部交差・平行5度）
+      - unmatched: 対応先のない声部（出現・消滅）のコスト。大きくしておくと、できるだけ多くの声部を対応付ける
+    既定値は TransitionAnalyzer の Voice Leading スコア（移動1半音 -2点、保留音 +10点）と同じ重み付けにしてあり、
+    交差・平行5度のペナルティは同点に近い割り当て同士の選び分けに効く程度の大きさにしている。
+    """
+    def __init__(self, move_weight: int = 2, common_tone_bonus: int = 10, crossing_penalty: int = 1,
+                 parallel_fifth_penalty: int = 2, unmatched: int = 10000):
+        self.move_weight = move_weight
+        self.common_tone_bonus = common_tone_bonus
+        self.crossing_penalty = crossing_penalty
+        self.parallel_fifth_penalty = parallel_fifth_penalty
+        self.unmatched = unmatched
+
+    def move(self, source: int, target: int) -> int:
+        if source == target:
+            return -self.common_tone_bonus
+        return abs(target - source) * self.move_weight
+
+    def pair(self, low_source: int, low_target: int, high_source: int, high_target: int) -> int:
+        """low_source <= high_source の2声部に対するペナルティ"""
+        penalty = 0
+        # 声部交差: 下の声部が上の声部を追い越す
+        if low_source < high_source and low_target > high_target:
+            penalty += self.crossing_penalty
+        # 平行5度: 5度（12度）の関係のまま、両声部が同じ方向へ動く
+        low_move = low_target - low_source
+        high_move = high_target - high_source
+        if (low_move > 0 and high_move > 0) or (low_move < 0 and high_move < 0):
+            if (high_source - low_source) % 12 == 7 and (high_target - low_target) % 12 == 7:
+                penalty += self.parallel_fifth_penalty
+        return penalty
+
+
+class VoiceLeadingEngine:
+    """
+    2つの和音の構成音を、総コスト最小になるように対応付けるエンジン。
+    ソース声部を低い順に分枝限定法で割り当て、pair() のペナルティも含めた厳密な最適解を求める。
+    声部数が max_exact_voices を超える場合（MIDI のトゥッティなど）は、声部の上下関係を保つ（交差しない）
+    対応付けに限った O(n×m) の DP に切り替える。こちらは pair() を評価しない近似解になる。
+    結果は「両和音をまとめて移調しても変わらない」形（最低音からの相対半音数の組）をキーにキャッシュする。
+    """
+    def __init__(self, cost: Optional[VoiceLeadingCost] = None, cache_size: int = 4096, max_exact_voices: int = 8):
+        self.cost = cost or VoiceLeadingCost()
+        self.cache_size = cache_size
+        self.max_exact_voices = max_exact_voices
+        self._cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+    def assign(self, notes_a: List[Note], notes_b: List[Note]) -> List[VoiceMapping]:
+        """notes_a -> notes_b の声部対応を返す（対応先のない声部は片側が None）"""
+        sorted_a = sorted(notes_a, key=lambda n: n.absolute_semitone)
+        sorted_b = sorted(notes_b, key=lambda n: n.absolute_semitone)
+        semis_a = [n.absolute_semitone for n in sorted_a]
+        semis_b = [n.absolute_semitone for n in sorted_b]
+
+        pairs = self._solve(semis_a, semis_b)
+
+        mappings = []
+        matched_b = set()
+        for i, j in pairs:
+            if j is None:
+                mappings.append(VoiceMapping(sorted_a[i], None, None))
+            else:
+                matched_b.add(j)
+                mappings.append(VoiceMapping(sorted_a[i], sorted_b[j], semis_b[j] - semis_a[i]))
+        for j, nb in enumerate(sorted_b):
+            if j not in matched_b:
+                mappings.append(VoiceMapping(None, nb, None))
+        return mappings
+
+    def _solve(self, semis_a: List[int], semis_b: List[int]) -> Tuple[Tuple[int, Optional[int]], ...]:
+        lowest = min(semis_a + semis_b) if (semis_a or semis_b) else 0
+        key = (tuple(s - lowest for s in semis_a), tuple(s - lowest for s in semis_b))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        if max(len(semis_a), len(semis_b)) > self.max_exact_voices:
+            result = self._search_ordered(semis_a, semis_b)
+        else:
+            result = self._search(semis_a, semis_b)
+        if self.cache_size > 0:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def _search(self, src: List[int], tgt: List[int]) -> Tuple[Tuple[int, Optional[int]], ...]:
+        cost = self.cost
+        n, m = len(src), len(tgt)
+        unmatched = cost.unmatched
+        move = [[cost.move(s, t) for t in tgt] for s in src]
+
+        # 各ソース声部で試す候補（移動コストの小さい順、最後に「消滅」）
+        options = []
+        for i in range(n):
+            order = sorted(range(m), key=lambda j: (move[i][j], j))
+            options.append(order + [None])
+
+        # 下界: pair() のペナルティを除いた「線形割り当て」としての残り部分の最適コスト。
+        # (i, 使用済みターゲットのマスク) ごとの値を後ろから DP で求める（8声部でも 2^8 × 8 状態以下）
+        free, by_count = _mask_tables(m)
+        bound = [dict() for _ in range(n + 1)]
+        last = bound[n]
+        for count in range(min(n, m) + 1):
+            for mask in by_count[count]:
+                last[mask] = (m - count) * unmatched
+        for i in range(n - 1, -1, -1):
+            row, nxt, mv = bound[i], bound[i + 1], move[i]
+            # i 番目までに使えるターゲットは高々 i 個
+            for count in range(min(i, m) + 1):
+                for mask in by_count[count]:
+                    best = unmatched + nxt[mask]
+                    for j, bit in free[mask]:
+                        c = mv[j] + nxt[mask | bit]
+                        if c < best:
+                            best = c
+                    row[mask] = best
+
+        best_cost = None
+        best_assign = None
+        assigned: List[Optional[int]] = [None] * n
+
+        def dfs(i: int, used_mask: int, partial: int):
+            nonlocal best_cost, best_assign
+            if best_cost is not None and partial + bound[i][used_mask] >= best_cost:
+                return
+            if i == n:
+                total = partial + bound[n][used_mask]
+                if best_cost is None or total < best_cost:
+                    best_cost = total
+                    best_assign = list(assigned)
+                return
+            s = src[i]
+            for j in options[i]:
+                if j is None:
+                    assigned[i] = None
+                    dfs(i + 1, used_mask, partial + unmatched)
+                    continue
+                if used_mask & (1 << j):
+                    continue
+                step_cost = move[i][j]
+                t = tgt[j]
+                for k in range(i):
+                    l = assigned[k]
+                    if l is not None:
+                        step_cost += cost.pair(src[k], tgt[l], s, t)
+                assigned[i] = j
+                dfs(i + 1, used_mask | (1 << j), partial + step_cost)
+            assigned[i] = None
+
+        dfs(0, 0, 0)
+        return tuple((i, best_assign[i]) for i in range(n))
+
+    def _search_ordered(self, src: List[int], tgt: List[int]) -> Tuple[Tuple[int, Optional[int]], ...]:
+        """声部の上下関係を保つ対応付けだけを対象にした、編集距離と同じ形の DP"""
+        cost = self.cost
+        n, m = len(src), len(tgt)
+        unmatched = cost.unmatched
+        # table[i][j]: src[:i] と tgt[:j] を対応付ける最小コスト
+        table = [[0] * (m + 1) for _ in range(n + 1)]
+        for i in range(1, n + 1):
+            table[i][0] = i * unmatched
+        for j in range(1, m + 1):
+            table[0][j] = j * unmatched
+        for i in range(1, n + 1):
+            row, prev, s = table[i], table[i - 1], src[i - 1]
+            for j in range(1, m + 1):
+                row[j] = min(prev[j - 1] + cost.move(s, tgt[j - 1]), prev[j] + unmatched, row[j - 1] + unmatched)
+
+        # 後ろからたどる（同点なら対応付けを優先）
+        assigned: List[Optional[int]] = [None] * n
+        i, j = n, m
+        while i > 0 and j > 0:
+            if table[i][j] == table[i - 1][j - 1] + cost.move(src[i - 1], tgt[j - 1]):
+                assigned[i - 1] = j - 1
+                i -= 1
+                j -= 1
+            elif table[i][j] == table[i - 1][j] + unmatched:
+                i -= 1
+            else:
+                j -= 1
+        return tuple((i, assigned[i]) for i in range(n))
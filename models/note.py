@@ -1,31 +1,66 @@
 import re
-from dataclasses import dataclass
-from typing import List, Optional
+from array import array
+from operator import itemgetter
+from typing import Iterable, Iterator, List, Optional
 
-@dataclass
-class Note:
-    step: str
-    alter: int
-    octave: int
+STEP_TO_SEMITONE = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+STEP_TO_INDEX = {'C': 0, 'D': 1, 'E': 2, 'F': 3, 'G': 4, 'A': 5, 'B': 6}
+INDEX_TO_STEP = "CDEFGAB"
 
-    def __post_init__(self):
-        self.step = self.step.upper()
+# pack() の整数表現: [オクターブ+OCTAVE_BIAS : 8bit][変化記号+ALTER_BIAS : 5bit][ステップ番号 : 3bit]
+ALTER_BIAS = 16
+OCTAVE_BIAS = 128
 
-    STEP_TO_SEMITONE = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
-    STEP_TO_INDEX = {'C': 0, 'D': 1, 'E': 2, 'F': 3, 'G': 4, 'A': 5, 'B': 6}
+# 小文字の音名もそのまま引けるようにした (正規化した音名, 半音, ステップ番号) の表
+_STEP_INFO = {}
+for _index, _step in enumerate(INDEX_TO_STEP):
+    _STEP_INFO[_step] = _STEP_INFO[_step.lower()] = (_step, STEP_TO_SEMITONE[_step], _index)
 
-    @property
-    def pitch_class(self) -> int:
-        return (self.STEP_TO_SEMITONE[self.step] + self.alter) % 12
+# Note.from_string の書式（音名・変化記号・オクターブ）と、変化記号の対応
+_NOTE_PATTERN = re.compile(r"^([a-gA-G])([#bx]*)(-?\d+)?$")
+_ALTERS = {'': 0, '#': 1, 'b': -1, 'bb': -2, 'x': 2}
 
-    @property
-    def absolute_semitone(self) -> int:
-        base = self.STEP_TO_SEMITONE[self.step]
-        return base + self.alter + (self.octave * 12)
+_tuple_new = tuple.__new__
+_INTERNED = {}
+_INTERN_LIMIT = 8192
 
-    @property
-    def step_index(self) -> int:
-        return self.STEP_TO_INDEX[self.step]
+
+class Note(tuple):
+    """
+    音名（Step）・変化記号（Alter）・オクターブを保持する不変の音クラス。
+    ピッチクラス・絶対半音数・ステップ番号は生成時に一度だけ計算してタプル内に保持するため、
+    解析ループ内での参照は辞書引きを伴わない。オクターブを変えたい場合は with_octave() で新しい音を作る。
+    同じ音は内部で共有されるため、大量のボイシングを保持しても音そのものの分だけメモリは増えない。
+    """
+    __slots__ = ()
+
+    STEP_TO_SEMITONE = STEP_TO_SEMITONE
+    STEP_TO_INDEX = STEP_TO_INDEX
+
+    def __new__(cls, step: str, alter: int, octave: int) -> 'Note':
+        # 不変なので同じ (step, alter, octave) の音は使い回す（生成コストとメモリの節約）
+        note = _INTERNED.get((step, alter, octave)) if cls is Note else None
+        if note is None:
+            step_name, base, index = _STEP_INFO[step]
+            semitone = base + alter + octave * 12
+            note = _tuple_new(cls, (step_name, alter, octave, semitone % 12, semitone, index))
+            if cls is Note and len(_INTERNED) < _INTERN_LIMIT:
+                _INTERNED[(step, alter, octave)] = note
+        return note
+
+    step = property(itemgetter(0))
+    alter = property(itemgetter(1))
+    octave = property(itemgetter(2))
+    pitch_class = property(itemgetter(3))
+    absolute_semitone = property(itemgetter(4))
+    step_index = property(itemgetter(5))
+
+    def __getnewargs__(self):
+        # pickle（プロセスプールへの受け渡しなど）用
+        return (self[0], self[1], self[2])
+
+    def __repr__(self):
+        return f"Note(step={self[0]!r}, alter={self[1]!r}, octave={self[2]!r})"
 
     def __str__(self):
         alter_str = ""
@@ -35,16 +70,84 @@ class Note:
         elif self.alter == -2: alter_str = "bb"
         return f"{self.step}{alter_str}{self.octave}"
 
+    def with_octave(self, octave: int) -> 'Note':
+        """オクターブだけを変えた新しい音を返す"""
+        return Note(self[0], self[1], octave)
+
+    def pack(self) -> int:
+        """(step, alter, octave) を1つの整数に詰める"""
+        return ((self[2] + OCTAVE_BIAS) << 8) | ((self[1] + ALTER_BIAS) << 3) | self[5]
+
+    @classmethod
+    def unpack(cls, code: int) -> 'Note':
+        return cls(INDEX_TO_STEP[code & 0b111], ((code >> 3) & 0b11111) - ALTER_BIAS, (code >> 8) - OCTAVE_BIAS)
+
     @classmethod
     def from_string(cls, note_str: str, default_octave: Optional[int] = None) -> 'Note':
-        match = re.match(r"^([a-gA-G])([#bx]*)(-?\d+)?$", note_str.strip())
+        match = _NOTE_PATTERN.match(note_str.strip())
         if not match: raise ValueError(f"Invalid format: '{note_str}'")
         step_str, alter_str, octave_str = match.groups()
-        alter = {'': 0, '#': 1, 'b': -1, 'bb': -2, 'x': 2}.get(alter_str.lower(), 0)
+        alter = _ALTERS.get(alter_str, 0)
         octave = int(octave_str) if octave_str is not None else default_octave
         if octave is None: octave = 4 
         return cls(step=step_str, alter=alter, octave=octave)
 
+
+class NoteArray:
+    """
+    1つのボイシングを、ステップ番号・変化記号・オクターブの3本の array に詰めて保持するコンテナ。
+    Note のリストの代わりに各解析器へそのまま渡せる（反復・添字アクセスで Note を返す）。
+    """
+    __slots__ = ("steps", "alters", "octaves")
+
+    def __init__(self, steps=(), alters=(), octaves=()):
+        self.steps = array('b', steps)
+        self.alters = array('b', alters)
+        self.octaves = array('h', octaves)
+
+    @classmethod
+    def from_notes(cls, notes: Iterable[Note]) -> 'NoteArray':
+        notes = list(notes)
+        return cls([n[5] for n in notes], [n[1] for n in notes], [n[2] for n in notes])
+
+    @classmethod
+    def from_packed(cls, codes: Iterable[int]) -> 'NoteArray':
+        return cls.from_notes(Note.unpack(code) for code in codes)
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __getitem__(self, i: int) -> Note:
+        return Note(INDEX_TO_STEP[self.steps[i]], self.alters[i], self.octaves[i])
+
+    def __iter__(self) -> Iterator[Note]:
+        for step, alter, octave in zip(self.steps, self.alters, self.octaves):
+            yield Note(INDEX_TO_STEP[step], alter, octave)
+
+    def __repr__(self):
+        return f"NoteArray([{', '.join(str(n) for n in self)}])"
+
+    def append(self, note: Note):
+        self.steps.append(note[5])
+        self.alters.append(note[1])
+        self.octaves.append(note[2])
+
+    def packed(self) -> array:
+        """各音を Note.pack() 形式の整数にした array"""
+        return array('i', (((o + OCTAVE_BIAS) << 8) | ((a + ALTER_BIAS) << 3) | s
+                           for s, a, o in zip(self.steps, self.alters, self.octaves)))
+
+    @property
+    def absolute_semitones(self) -> array:
+        return array('h', (_STEP_SEMITONES[s] + a + o * 12 for s, a, o in zip(self.steps, self.alters, self.octaves)))
+
+    @property
+    def pitch_classes(self) -> array:
+        return array('b', (semitone % 12 for semitone in self.absolute_semitones))
+
+
+_STEP_SEMITONES = [STEP_TO_SEMITONE[step] for step in INDEX_TO_STEP]
+
 def parse_notes(notes_csv: str, start_octave: int = 4) -> List[Note]:
     note_strs = [s.strip() for s in notes_csv.split(",")]
     notes = []
@@ -52,10 +155,11 @@ def parse_notes(notes_csv: str, start_octave: int = 4) -> List[Note]:
     last_pc = -1
     for n_str in note_strs:
         temp_note = Note.from_string(n_str, default_octave=None)
-        if re.search(r"-?\d+$", n_str) is None:
+        # 書式は検証済みなので、末尾が数字かどうかでオクターブの有無が分かる
+        if not n_str[-1:].isdigit():
             if temp_note.pitch_class < last_pc:
                 current_octave += 1
-            temp_note.octave = current_octave
+            temp_note = temp_note.with_octave(current_octave)
             last_pc = temp_note.pitch_class
         else:
             current_octave = temp_note.octave
@@ -0,0 +1,341 @@
+# models/results.py
+"""
+各解析器が返す結果オブジェクト。
+数値（スコア・カデンツIDなど）は生成時に確定させ、テキストは str() や .text で要求されたときにだけ組み立てる。
+"""
+from typing import Callable, Dict, List, Optional
+from models.note import Note
+from utils.formatter import KeyContext
+
+# ChordAnalyzer の候補のカテゴリ（結果の dict の並び順。同点の候補はこの順に優先される）
+CATEGORIES = ["基本形 (Root Position)", "転回形 (Inversion)", "オンコード (On-Chord)", "ルートレス (Rootless)", "特殊形 (Special)"]
+
+
+class _ItemAccess:
+    """旧来の dict 形式の結果（result['score'] など）との互換用アクセサ"""
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+
+class ChordCandidate(_ItemAccess):
+    """ChordAnalyzer の探索フェーズが出すコード解釈の候補1つ"""
+    __slots__ = ("category", "score", "root_pc", "quality", "notes", "is_ust", "_name", "_template", "_names")
+
+    def __init__(self, category: str, score: int, root_pc: int, quality: str, notes: List[Note],
+                 name: Optional[str] = None, is_ust: bool = False,
+                 template: Optional[str] = None, names: Optional[List[str]] = None):
+        self.category = category
+        self.score = score
+        self.root_pc = root_pc
+        self.quality = quality
+        self.notes = notes
+        self.is_ust = is_ust
+        self._name = name
+        # キャッシュ経由の候補は、名前をテンプレートと音名表から必要になったときに組み立てる
+        self._template = template
+        self._names = names
+
+    @property
+    def name(self) -> str:
+        if self._name is None:
+            self._name = self._template.format(*self._names)
+        return self._name
+
+    def __repr__(self):
+        return f"ChordCandidate({self.name!r}, score={self.score})"
+
+    def to_dict(self) -> dict:
+        """JSON にそのまま変換できる dict（音は "C4" 形式の文字列）"""
+        return {"name": self.name, "score": self.score, "category": self.category, "root_pc": self.root_pc,
+                "quality": self.quality, "is_ust": self.is_ust, "notes": [str(n) for n in self.notes]}
+
+
+class ChordAnalysis:
+    """ChordAnalyzer.analyze の結果: カテゴリ別の候補と、要求時に生成するテキストレポート"""
+    __slots__ = ("sorted_notes", "bass_name", "categorized", "threshold", "_formatter", "_text")
+
+    def __init__(self, sorted_notes: List[Note], bass_name: str, categorized: Dict[str, List[ChordCandidate]],
+                 threshold: int, formatter: Callable):
+        self.sorted_notes = sorted_notes
+        self.bass_name = bass_name
+        self.categorized = categorized
+        self.threshold = threshold
+        self._formatter = formatter
+        self._text = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._formatter(self.sorted_notes, self.bass_name, self.categorized, self.threshold)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+    def __iter__(self):
+        # 旧来の `text, categorized = analyzer.analyze(...)` という受け取り方との互換
+        yield self.text
+        yield self.categorized
+
+    def candidates(self) -> List[ChordCandidate]:
+        """閾値以上の候補をスコア順（同点はカテゴリ順）に返す"""
+        flat = [c for cands in self.categorized.values() for c in cands if c.score >= self.threshold]
+        flat.sort(key=lambda c: c.score, reverse=True)
+        return flat
+
+
+class KeyFreeChord:
+    """
+    ChordAnalyzer.analyze_key_free の結果: Key に依存しない解釈の候補と、Key ごとの綴り。
+    候補は (カテゴリ, ベース相対のテンプレート名, スコア, ベースからのルートの半音差, クオリティ, UST か) のタプルで、
+    閾値以上のものを get_best_interpretation と同じ順（スコアの高い順、同点はカテゴリ順・探索順）に ranked に持つ。
+    candidate(key) は綴りの表を引いて ChordCandidate を作るだけなので、Key をいくつ変えても探索はやり直さない。
+    """
+    __slots__ = ("sorted_notes", "bass_pc", "threshold", "ranked")
+
+    def __init__(self, sorted_notes: List[Note], bass_pc: int, threshold: int, entries: tuple):
+        self.sorted_notes = sorted_notes
+        self.bass_pc = bass_pc
+        self.threshold = threshold
+        order = {category: i for i, category in enumerate(CATEGORIES)}
+        ranked = sorted((e for e in entries if e[2] >= threshold), key=lambda e: order[e[0]])
+        ranked.sort(key=lambda e: e[2], reverse=True)
+        self.ranked = ranked
+
+    def __bool__(self):
+        return bool(self.ranked)
+
+    def candidate(self, key: str = "C", rank: int = 0) -> Optional[ChordCandidate]:
+        """Key で綴った rank 番目（0 が最良）の解釈。なければ None"""
+        if rank >= len(self.ranked):
+            return None
+        category, template, score, root_offset, quality, is_ust = self.ranked[rank]
+        return ChordCandidate(category, score, (self.bass_pc + root_offset) % 12, quality, self.sorted_notes,
+                              is_ust=is_ust, template=template, names=KeyContext(key).relative_names[self.bass_pc])
+
+    def candidates(self, key: str = "C", k: Optional[int] = None) -> List[ChordCandidate]:
+        """Key で綴った解釈をスコア順に最大 k 件（None なら閾値以上のすべて）"""
+        count = len(self.ranked) if k is None else min(k, len(self.ranked))
+        return [self.candidate(key, rank) for rank in range(count)]
+
+
+class VoiceMapping(_ItemAccess):
+    """遷移における1声部の対応（source -> target）。出現・消滅する声部は片側が None"""
+    __slots__ = ("source", "target", "diff")
+
+    def __init__(self, source: Optional[Note], target: Optional[Note], diff: Optional[int]):
+        self.source = source
+        self.target = target
+        self.diff = diff
+
+    def __iter__(self):
+        # (source, target, diff) のタプルとしても展開できるようにする
+        return iter((self.source, self.target, self.diff))
+
+    def __repr__(self):
+        return f"VoiceMapping({self.source}, {self.target}, {self.diff})"
+
+    def to_list(self) -> list:
+        """[source, target, diff]（音は文字列、出現・消滅する側は None）"""
+        return [None if self.source is None else str(self.source),
+                None if self.target is None else str(self.target), self.diff]
+
+
+class TransitionResult(_ItemAccess):
+    """TransitionAnalyzer の評価結果"""
+    __slots__ = ("key_name", "chord_a_root_pc", "chord_a_quality", "chord_b_root_pc", "chord_b_quality",
+                 "mappings", "total_movement", "common_tones", "cadence", "smoothness_score", "total_score",
+                 "_formatter", "_text")
+
+    def __init__(self, key_name: str, chord_a_root_pc: int, chord_a_quality: str,
+                 chord_b_root_pc: int, chord_b_quality: str, mappings: List[VoiceMapping],
+                 total_movement: int, common_tones: int, cadence: dict,
+                 smoothness_score: int, total_score: int, formatter: Callable):
+        self.key_name = key_name
+        self.chord_a_root_pc = chord_a_root_pc
+        self.chord_a_quality = chord_a_quality
+        self.chord_b_root_pc = chord_b_root_pc
+        self.chord_b_quality = chord_b_quality
+        self.mappings = mappings
+        self.total_movement = total_movement
+        self.common_tones = common_tones
+        self.cadence = cadence
+        self.smoothness_score = smoothness_score
+        self.total_score = total_score
+        self._formatter = formatter
+        self._text = None
+
+    @property
+    def cadence_id(self) -> Optional[int]:
+        """採用されたカデンツの CADENCE_DICT 上の番号（汎用ルールの場合は None）"""
+        return self.cadence.get("id")
+
+    @property
+    def cadence_name(self) -> str:
+        return self.cadence["name"]
+
+    @property
+    def cadence_bonus(self) -> int:
+        return self.cadence["bonus"]
+
+    def to_dict(self) -> dict:
+        """JSON にそのまま変換できる dict"""
+        return {
+            "key": self.key_name,
+            "from": {"root_pc": self.chord_a_root_pc, "quality": self.chord_a_quality},
+            "to": {"root_pc": self.chord_b_root_pc, "quality": self.chord_b_quality},
+            "mappings": [m.to_list() for m in self.mappings],
+            "total_movement": self.total_movement,
+            "common_tones": self.common_tones,
+            "cadence": {"id": self.cadence_id, "name": self.cadence_name, "bonus": self.cadence_bonus},
+            "smoothness_score": self.smoothness_score,
+            "total_score": self.total_score,
+        }
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._formatter(self)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+
+class ToneRelation:
+    """メロディ音とコード構成音1つとの音程関係"""
+    __slots__ = ("chord_note", "interval_name", "info", "dissonance", "verdict")
+
+    # verdict の値
+    CONSONANT = 0
+    TOLERATED_B9 = 1
+    AVOID = 2
+
+    def __init__(self, chord_note: Note, interval_name: str, info: Optional[dict], dissonance: int, verdict: int):
+        self.chord_note = chord_note
+        self.interval_name = interval_name
+        self.info = info
+        self.dissonance = dissonance
+        self.verdict = verdict
+
+
+class MelodyResult(_ItemAccess):
+    """MelodyAnalyzer の判定結果"""
+    __slots__ = ("melody_note", "chord_root_pc", "chord_quality", "status", "theory_avoid", "avoid_reason",
+                 "total_dissonance", "relations", "_formatter", "_text")
+
+    # status の値
+    CHORD_TONE = "chord_tone"
+    AVOID = "avoid"
+    TENSION = "tension"
+
+    def __init__(self, melody_note: Note, chord_root_pc: int, chord_quality: str, status: str,
+                 theory_avoid: bool, avoid_reason: str, total_dissonance: int,
+                 relations: List[ToneRelation], formatter: Callable):
+        self.melody_note = melody_note
+        self.chord_root_pc = chord_root_pc
+        self.chord_quality = chord_quality
+        self.status = status
+        self.theory_avoid = theory_avoid
+        self.avoid_reason = avoid_reason
+        self.total_dissonance = total_dissonance
+        self.relations = relations
+        self._formatter = formatter
+        self._text = None
+
+    @property
+    def is_avoid(self) -> bool:
+        return self.status == self.AVOID
+
+    @property
+    def acoustic_avoid(self) -> List[ToneRelation]:
+        """アヴォイド要因となった構成音との関係"""
+        return [r for r in self.relations if r.verdict == ToneRelation.AVOID]
+
+    def to_dict(self) -> dict:
+        """JSON にそのまま変換できる dict（relations は構成音・インターバル名・不協和度・判定）"""
+        return {
+            "melody_note": str(self.melody_note),
+            "chord_root_pc": self.chord_root_pc,
+            "chord_quality": self.chord_quality,
+            "status": self.status,
+            "theory_avoid": self.theory_avoid,
+            "avoid_reason": self.avoid_reason,
+            "total_dissonance": self.total_dissonance,
+            "relations": [{"chord_note": str(r.chord_note), "interval": r.interval_name,
+                           "dissonance": r.dissonance, "verdict": r.verdict} for r in self.relations],
+        }
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self._formatter(self)
+        return self._text
+
+    def __str__(self):
+        return self.text
+
+
+class MelodyLineResult:
+    """
+    MelodyAnalyzer.analyze_line の結果: メロディ音ごとの判定の配列（NumPy）と集計。
+    status は NO_CHORD / CHORD_TONE / AVOID / TENSION のコード、chord_index は渡したコードのタイムラインでの番号（なければ -1）。
+    """
+    __slots__ = ("onsets", "durations", "chord_index", "status", "theory_avoid", "acoustic_avoid", "total_dissonance")
+
+    # status の値（STATUS_NAMES で MelodyResult の status 文字列に対応する）
+    NO_CHORD = -1
+    CHORD_TONE = 0
+    AVOID = 1
+    TENSION = 2
+    STATUS_NAMES = {NO_CHORD: None, CHORD_TONE: MelodyResult.CHORD_TONE, AVOID: MelodyResult.AVOID,
+                    TENSION: MelodyResult.TENSION}
+
+    def __init__(self, onsets, durations, chord_index, status, theory_avoid, acoustic_avoid, total_dissonance):
+        self.onsets = onsets
+        self.durations = durations
+        self.chord_index = chord_index
+        self.status = status
+        self.theory_avoid = theory_avoid
+        self.acoustic_avoid = acoustic_avoid
+        self.total_dissonance = total_dissonance
+
+    def __len__(self):
+        return len(self.status)
+
+    def status_names(self) -> List[Optional[str]]:
+        """音ごとの status を MelodyResult と同じ文字列で（コードのない音は None）"""
+        return [self.STATUS_NAMES[int(s)] for s in self.status]
+
+    def summary(self) -> dict:
+        """
+        集計: 音数・status ごとの音数・コードのある音に占めるアヴォイドの割合（音数と長さの重み付き）・不協和度の平均と最大。
+        割合と平均はコードのある音だけが対象（なければ 0）。
+        """
+        covered = self.status != self.NO_CHORD
+        n_covered = int(covered.sum())
+        avoid = self.status == self.AVOID
+        covered_duration = float(self.durations[covered].sum())
+        dissonance = self.total_dissonance[covered]
+        return {
+            "notes": len(self.status),
+            "covered": n_covered,
+            "chord_tone": int((self.status == self.CHORD_TONE).sum()),
+            "avoid": int(avoid.sum()),
+            "tension": int((self.status == self.TENSION).sum()),
+            "no_chord": len(self.status) - n_covered,
+            "theory_avoid": int(self.theory_avoid.sum()),
+            "acoustic_avoid": int(self.acoustic_avoid.sum()),
+            "avoid_ratio": float(avoid.sum()) / n_covered if n_covered else 0.0,
+            "avoid_duration_ratio": float(self.durations[avoid].sum()) / covered_duration if covered_duration else 0.0,
+            "mean_dissonance": float(dissonance.mean()) if n_covered else 0.0,
+            "max_dissonance": dissonance.max().item() if n_covered else 0,
+        }
@@ -1,39 +1,86 @@
 # utils/formatter.py
+from typing import Dict, Optional, Tuple
+
+STEP_NAMES = "CDEFGAB"
+_STEP_SEMITONES = (0, 2, 4, 5, 7, 9, 11)
+
+# 調号（シャープなら正、フラットなら負の数 -7~7）+ 7 の位置にある Key名（長調・短調それぞれ15調）
+MAJOR_KEYS_BY_SIGNATURE = ["Cb", "Gb", "Db", "Ab", "Eb", "Bb", "F", "C", "G", "D", "A", "E", "B", "F#", "C#"]
+MINOR_KEYS_BY_SIGNATURE = ["Abm", "Ebm", "Bbm", "Fm", "Cm", "Gm", "Dm", "Am", "Em", "Bm", "F#m", "C#m", "G#m", "D#m", "A#m"]
+KEY_SIGNATURES: Dict[str, int] = {name: i - 7 for names in (MAJOR_KEYS_BY_SIGNATURE, MINOR_KEYS_BY_SIGNATURE)
+                                  for i, name in enumerate(names)}
+
+# 調号でシャープ・フラットが付く順（フラットは逆順）
+ORDER_OF_SHARPS = "FCGDAEB"
+
+# 調号の音以外（臨時記号で表す音）の綴り
+SHARP_NAMES = ('C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B')
+FLAT_NAMES = ('C', 'Db', 'D', 'Eb', 'E', 'F', 'Gb', 'G', 'Ab', 'A', 'Bb', 'B')
+
+# 標準以外の Key名 もインターンするが、際限なく増えないように上限を設ける
+_INTERN_LIMIT = 256
+
+
+def _spell(signature: Optional[int]) -> Tuple[str, ...]:
+    """
+    調号からピッチクラス 0~11 の綴りを作る。
+    調の音階の7音は調号どおりに綴り（7♭ の Fb・Cb、7♯ の E#・B# など）、残りの5音は
+    フラット系の調ならフラット、それ以外はシャープで綴る。調号のない（標準外の）Key名はシャープ系の綴りになる。
+    """
+    if signature is None:
+        return SHARP_NAMES
+    names = list(FLAT_NAMES if signature < 0 else SHARP_NAMES)
+    altered = ORDER_OF_SHARPS[:signature] if signature >= 0 else ORDER_OF_SHARPS[::-1][:-signature]
+    alter, accidental = (1, "#") if signature >= 0 else (-1, "b")
+    for index, step in enumerate(STEP_NAMES):
+        if step in altered:
+            names[(_STEP_SEMITONES[index] + alter) % 12] = step + accidental
+    return tuple(names)
+
 
 class KeyContext:
     """
-    指定されたKey（調性）に基づいて、ピッチクラスを適切な音名文字列にフォーマットするクラス
+    指定されたKey（調性）に基づいて、ピッチクラスを適切な音名文字列にフォーマットするクラス。
+
+    同じ Key名 からは常に同じ不変のインスタンスが返り（標準の30調は読み込み時に作成済み）、
+    綴りの表 names（ピッチクラス -> 音名）と steps（ピッチクラス -> ステップ番号 0~6）、
+    ベースのピッチクラスごとに names を回した relative_names（ベースからの半音差 -> 音名）も作成時に一度だけ作る。
     """
-    def __init__(self, key_name: str = "C"):
-        self.key_name = key_name
-        self.use_flats = self._determine_flat_key(key_name)
+    __slots__ = ("key_name", "signature", "use_flats", "names", "steps", "relative_names")
+
+    _instances: Dict[str, "KeyContext"] = {}
+
+    def __new__(cls, key_name: str = "C") -> "KeyContext":
+        context = cls._instances.get(key_name)
+        if context is None:
+            context = object.__new__(cls)
+            signature = KEY_SIGNATURES.get(key_name)
+            names = _spell(signature)
+            set_attr = object.__setattr__
+            set_attr(context, "key_name", key_name)
+            # 調号（標準外の Key名 は None）
+            set_attr(context, "signature", signature)
+            set_attr(context, "use_flats", signature is not None and signature < 0)
+            set_attr(context, "names", names)
+            set_attr(context, "steps", tuple(STEP_NAMES.index(name[0]) for name in names))
+            set_attr(context, "relative_names", tuple(names[pc:] + names[:pc] for pc in range(12)))
+            if len(cls._instances) < _INTERN_LIMIT:
+                cls._instances[key_name] = context
+        return context
 
-    def _determine_flat_key(self, key_name: str) -> bool:
-        # フラット記号を優先して使う調性のリスト
-        flat_keys = ["F", "Bb", "Eb", "Ab", "Db", "Gb", "Cb", 
-                     "Dm", "Gm", "Cm", "Fm", "Bbm", "Ebm", "Abm"]
-        return key_name in flat_keys
+    def __setattr__(self, name, value):
+        raise AttributeError("KeyContext is immutable")
+
+    def __reduce__(self):
+        # pickle してもインターンされたインスタンスに戻す
+        return (KeyContext, (self.key_name,))
+
+    def __repr__(self):
+        return f"KeyContext({self.key_name!r})"
 
     def get_note_name(self, pitch_class: int) -> str:
-        pitch_class = pitch_class % 12
-        
-        if self.use_flats:
-            # フラット系の基本スペリング
-            spellings = {0: 'C', 1: 'Db', 2: 'D', 3: 'Eb', 4: 'E', 5: 'F', 
-                         6: 'Gb', 7: 'G', 8: 'Ab', 9: 'A', 10: 'Bb', 11: 'B'}
-            
-            # 特殊ケース: Gbメジャーなどの調では、BではなくCbを使う
-            if self.key_name in ["Gb", "Ebm", "Cb", "Abm"]:
-                spellings[11] = 'Cb'
-                
-            return spellings[pitch_class]
-        else:
-            # シャープ系の基本スペリング
-            spellings = {0: 'C', 1: 'C#', 2: 'D', 3: 'D#', 4: 'E', 5: 'F', 
-                         6: 'F#', 7: 'G', 8: 'G#', 9: 'A', 10: 'A#', 11: 'B'}
-                         
-            # 特殊ケース: F#メジャーなどの調では、FではなくE#を使う（必要に応じて拡張可能）
-            if self.key_name in ["F#", "D#m"]:
-                spellings[5] = 'E#'
-                
-            return spellings[pitch_class]
\ No newline at end of file
+        return self.names[pitch_class % 12]
+
+
+for _name in KEY_SIGNATURES:
+    KeyContext(_name)
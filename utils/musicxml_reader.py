@@ -0,0 +1,374 @@
+# utils/musicxml_reader.py
+"""
+MusicXML（.musicxml / .xml、圧縮形式の .mxl）を xml.etree.ElementTree.iterparse で読み、
+全パートを通した「縦の響き」（Sonority）に切り分けるリーダー。
+
+    sonorities = iter_sonorities("score.musicxml")
+    records = ProgressionAnalyzer().iter_progression((s.notes for s in sonorities), key="C")
+
+- 要素は処理した端から clear() して親から外すので、DOM 全体をメモリに持たない
+- 音は楽譜の綴り（step / alter / octave）のまま Note にする。移調楽器は <transpose> に従って実音へ綴り直す
+- score-partwise ではパートが順に現れるため、各パートの音は (開始, 終了, Note) の軽いタプルとして保持し、
+  全パートを読み終えてから時刻順に合流させる。score-timewise でも同じ扱いになる。
+  したがって最初の Sonority はファイル全体を読み終えるまで出ず、保持する音の数だけメモリが増える
+"""
+import heapq
+import io
+import zipfile
+from fractions import Fraction
+from itertools import groupby
+from typing import Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import iterparse
+from models.note import Note
+from utils.smf_reader import key_name_from_signature
+
+_STEPS = "CDEFGAB"
+_STEP_SEMITONES = [0, 2, 4, 5, 7, 9, 11]
+
+
+class MusicXMLFormatError(ValueError):
+    """MusicXML として解釈できないデータ"""
+
+
+class Sonority:
+    """ある時刻から次に音が加わる（またはすべての音が止まる）までの縦の響き。時刻は4分音符単位"""
+    __slots__ = ("start", "end", "measure", "notes", "key")
+
+    def __init__(self, start: Fraction, end: Fraction, measure: str, notes: List[Note], key: Optional[str]):
+        self.start = start
+        self.end = end
+        self.measure = measure  # 開始時点の小節番号（<measure number="...">）
+        self.notes = notes
+        self.key = key  # 開始時点で有効な調号（Key名。調号がなければ None）
+
+    def __repr__(self):
+        return f"Sonority(m{self.measure} {self.start}-{self.end}, {[str(n) for n in self.notes]})"
+
+
+def transpose_note(note: Note, diatonic: int, chromatic: int) -> Note:
+    """音名を diatonic 度・実音を chromatic 半音ずらす（移調楽器の記譜音 -> 実音）"""
+    if not diatonic and not chromatic:
+        return note
+    octave_shift, step_index = divmod(note.step_index + diatonic, 7)
+    octave = note.octave + octave_shift
+    target = note.absolute_semitone + chromatic
+    alter = target - (octave * 12 + _STEP_SEMITONES[step_index])
+    return Note(_STEPS[step_index], alter, octave)
+
+
+def _open(source):
+    """
+    パス・ファイルオブジェクトを受け取り、(XML 本体のストリーム, 読み終えたら閉じるもの) を返す
+    （.mxl は container.xml が指す本体を開き、ZipFile も閉じる対象に含める。渡されたファイルオブジェクトは閉じない）
+    """
+    if hasattr(source, "read"):
+        return source, []
+    if zipfile.is_zipfile(source):
+        archive = zipfile.ZipFile(source)
+        try:
+            rootfile = None
+            try:
+                with archive.open("META-INF/container.xml") as f:
+                    for _event, elem in iterparse(f):
+                        if elem.tag.rsplit("}", 1)[-1] == "rootfile":
+                            rootfile = elem.get("full-path")
+                            break
+            except KeyError:
+                pass
+            if rootfile is None:
+                names = [n for n in archive.namelist() if not n.startswith("META-INF/") and n.endswith((".xml", ".musicxml"))]
+                if not names:
+                    raise MusicXMLFormatError("no score found in compressed MusicXML")
+                rootfile = names[0]
+            stream = io.BufferedReader(archive.open(rootfile))
+        except BaseException:
+            archive.close()
+            raise
+        return stream, [stream, archive]
+    stream = open(source, "rb")
+    return stream, [stream]
+
+
+# 内部の時刻は「4分音符 = TIME_BASE」の整数で数える（よく使われる divisions はすべてこれを割り切る）。
+# 割り切れない divisions のパートだけ Fraction になる（int と混在しても比較・加算はそのまま使える）
+TIME_BASE = 2 ** 6 * 3 ** 3 * 5 * 7 * 11
+
+# 扱うタグ（名前空間なしの名前）
+_TAGS = ("score-timewise", "part", "measure", "note", "backup", "forward", "attributes",
+         "divisions", "key", "fifths", "mode", "transpose", "chromatic", "diatonic", "octave-change",
+         "pitch", "step", "alter", "octave", "duration", "chord", "grace", "cue", "rest", "unpitched", "tie")
+
+
+class _PartState:
+    """1パートを読み進めるための状態（時刻・divisions・移調・タイ）"""
+    __slots__ = ("events", "position", "scale", "diatonic", "chromatic", "last_onset", "open_ties", "furthest",
+                 "pending_key")
+
+    def __init__(self):
+        self.events: List[Tuple[int, int, Note, str]] = []
+        self.position = 0
+        self.scale = TIME_BASE  # divisions 1 あたりの内部時刻
+        self.diatonic = 0
+        self.chromatic = 0
+        self.last_onset = 0
+        self.open_ties = {}  # Note -> events 内の位置（タイでつながった音は1つの音として延長する）
+        self.furthest = 0  # この小節で backup / forward を含めて最も右まで進んだ位置
+        # <attributes> 内で読んだ調号 (時刻, Key名)。<key> は <transpose> より前に来るので、</attributes> で確定する
+        self.pending_key: Optional[tuple] = None
+
+    def set_divisions(self, divisions: int):
+        self.scale = TIME_BASE // divisions if TIME_BASE % divisions == 0 else Fraction(TIME_BASE, divisions)
+
+    def advance(self, duration):
+        self.position += duration
+        if self.position > self.furthest:
+            self.furthest = self.position
+
+    def end_measure(self):
+        # 次の小節は小節線の位置（最も右まで進んだ位置）から始まる
+        self.position = self.furthest
+
+
+def read_parts(source) -> Tuple[List[List[tuple]], List[tuple]]:
+    """
+    MusicXML をストリームで読み、パートごとの音 (開始, 終了, Note, 小節番号)（開始時刻順）と、
+    調号の変化 [(時刻, Key名)] を返す。時刻は TIME_BASE 単位。
+    調号は移調していないパートのうち最初に現れたものを採用する。
+    """
+    stream, to_close = _open(source)
+    parts = {}
+    part_order = []
+    keys: List[tuple] = []
+    key_part = None
+    state = None
+    part_id = None
+    part_elem = None
+    measure_number = ""
+
+    try:
+        events = iterparse(stream, events=("start", "end"))
+        _event, root = next(events)
+        # 名前空間付きの文書にも対応する（タグ名の比較はすべて名前空間付きの名前で行う）
+        ns = root.tag[:root.tag.index("}") + 1] if root.tag.startswith("{") else ""
+        tags = {ns + name: name for name in _TAGS}
+        # score-timewise では measure の中に part が入る
+        timewise = tags.get(root.tag) == "score-timewise"
+
+        for event, elem in events:
+            tag = tags.get(elem.tag)
+            if tag is None:
+                continue
+            if event == "start":
+                if tag == "part":
+                    part_id = elem.get("id")
+                    part_elem = elem
+                    if part_id not in parts:
+                        parts[part_id] = _PartState()
+                        part_order.append(part_id)
+                    state = parts[part_id]
+                elif tag == "measure":
+                    measure_number = elem.get("number", "")
+                continue
+
+            if state is None:
+                if tag == "measure":
+                    _detach(root, elem)
+                continue
+
+            if tag == "note":
+                _read_note(elem, state, measure_number, tags)
+                elem.clear()
+            elif tag == "backup" or tag == "forward":
+                duration = _duration(elem.findtext(ns + "duration"), state)
+                state.advance(-duration if tag == "backup" else duration)
+                elem.clear()
+            elif tag == "divisions":
+                state.set_divisions(int(float(elem.text)))
+            elif tag == "transpose":
+                chromatic = elem.findtext(ns + "chromatic") or "0"
+                diatonic = elem.findtext(ns + "diatonic") or "0"
+                octave_change = elem.findtext(ns + "octave-change") or "0"
+                state.chromatic = int(float(chromatic)) + 12 * int(octave_change)
+                state.diatonic = int(diatonic) + 7 * int(octave_change)
+            elif tag == "key":
+                fifths = elem.findtext(ns + "fifths")
+                if fifths is not None:
+                    mode = (elem.findtext(ns + "mode") or "major").strip()
+                    state.pending_key = (state.position, key_name_from_signature(int(fifths), mode == "minor"))
+            elif tag == "attributes":
+                # 同じ <attributes> の <transpose> まで読んでから、移調していないパートの調号だけを採用する
+                if state.pending_key is not None and not state.chromatic and key_part in (None, part_id):
+                    key_part = part_id
+                    keys.append(state.pending_key)
+                state.pending_key = None
+                elem.clear()
+            elif tag == "measure":
+                state.end_measure()
+                # 処理済みの小節は親（partwise なら part、timewise ならルート）から外す
+                _detach(root if timewise else part_elem, elem)
+            elif tag == "part":
+                if timewise:
+                    state.end_measure()
+                else:
+                    _detach(root, elem)
+                state = None
+    except StopIteration:
+        raise MusicXMLFormatError("empty document") from None
+    except SyntaxError as e:
+        raise MusicXMLFormatError(str(e)) from None
+    finally:
+        for resource in to_close:
+            resource.close()
+
+    result = []
+    for pid in part_order:
+        events = parts[pid].events
+        events.sort(key=lambda e: e[0])
+        result.append(events)
+    keys.sort(key=lambda k: k[0])
+    return result, keys
+
+
+def _detach(parent, elem):
+    # 処理済みの要素を親から外して、ルートに空の要素が溜まらないようにする
+    elem.clear()
+    try:
+        parent.remove(elem)
+    except ValueError:
+        pass
+
+
+def _duration(text: Optional[str], state: _PartState):
+    if text is None:
+        return 0
+    text = text.strip()
+    if text.isdigit():
+        return int(text) * state.scale
+    return Fraction(text) * state.scale
+
+
+def _read_note(elem, state: _PartState, measure_number: str, tags: dict):
+    # 子要素を1度だけ走査して必要な情報を拾う
+    duration_text = None
+    is_chord = False
+    pitch = None
+    tie_start = tie_stop = False
+    is_cue = False
+    for child in elem:
+        tag = tags.get(child.tag)
+        if tag == "duration":
+            duration_text = child.text
+        elif tag == "pitch":
+            pitch = child
+        elif tag == "chord":
+            is_chord = True
+        elif tag == "tie":
+            if child.get("type") == "start":
+                tie_start = True
+            else:
+                tie_stop = True
+        elif tag == "grace":
+            # 装飾音は長さを持たず、時刻も進めない
+            return
+        elif tag == "cue":
+            is_cue = True
+
+    duration = _duration(duration_text, state)
+    onset = state.last_onset if is_chord else state.position
+    if not is_chord:
+        state.advance(duration)
+        state.last_onset = onset
+
+    # キュー音符は <duration> の分だけ時刻を進めるが、音としては数えない
+    if pitch is None or is_cue:  # 休符・打楽器（unpitched）・キュー音符
+        return
+    step = octave = None
+    alter = "0"
+    for child in pitch:
+        tag = tags.get(child.tag)
+        if tag == "step":
+            step = child.text.strip()
+        elif tag == "octave":
+            octave = child.text
+        elif tag == "alter":
+            alter = child.text
+    if not step or octave is None:
+        raise MusicXMLFormatError(f"incomplete <pitch> in measure {measure_number}")
+    # 微分音（0.5 など）は最も近い半音に丸める
+    alter = int(alter) if alter.strip().lstrip("-").isdigit() else round(float(alter))
+    note = transpose_note(Note(step, alter, int(octave)), state.diatonic, state.chromatic)
+    end = onset + duration
+
+    if tie_stop and note in state.open_ties:
+        # タイで前の音から続いている: 新しいオンセットにはせず、前の音を延長する
+        index = state.open_ties.pop(note)
+        first_onset, _old_end, tied, m = state.events[index]
+        state.events[index] = (first_onset, end, tied, m)
+    else:
+        index = len(state.events)
+        state.events.append((onset, end, note, measure_number))
+    if tie_start:
+        state.open_ties[note] = index
+
+
+def iter_sonorities(source, min_duration: Fraction = Fraction(0)) -> Iterator[Sonority]:
+    """
+    MusicXML を読み、全パートを通して音が加わるたびに Sonority を順次 yield する。
+    同じ綴り・同じ高さの音（ユニゾンの重複）は1つにまとめるが、異名同音（G# と Ab など）は別の音として残す。
+    min_duration（4分音符単位）より短い響き（経過的な装飾など）と、無音の区間は出力しない。
+
+    XML の読み込みはストリームだが、score-partwise ではパートが順に現れるため、全パートの音を
+    (開始, 終了, Note, 小節番号) のタプルとして読み終えてから合流させる。そのため最初の Sonority は
+    ファイルの終わりまで読んでから yield され、メモリは楽譜の音の数に比例して増える（DOM よりは小さい）。
+    """
+    parts, keys = read_parts(source)
+    stream = heapq.merge(*parts, key=lambda e: e[0])
+
+    key_index = 0
+    current_key = None
+    active = []  # 鳴っている音: (終了時刻, 通し番号, Note) のヒープ
+    counter = 0
+    pending = None  # 閉じていない響き: (開始, 小節番号, Key)
+
+    for onset, group in groupby(stream, key=lambda e: e[0]):
+        # この時刻までに鳴り終わる音を外し、直前の響きを閉じる
+        last_stop = None
+        while active and active[0][0] <= onset:
+            last_stop = heapq.heappop(active)[0]
+        if pending is not None:
+            sonority = _sonority(pending, onset if active else last_stop, active, min_duration)
+            if sonority is not None:
+                yield sonority
+
+        while key_index < len(keys) and keys[key_index][0] <= onset:
+            current_key = keys[key_index][1]
+            key_index += 1
+
+        measure = None
+        for _onset, end, note, note_measure in group:
+            if measure is None:
+                measure = note_measure
+            if end > onset:
+                heapq.heappush(active, (end, counter, note))
+                counter += 1
+        pending = (onset, measure, current_key) if active else None
+        if pending is not None:
+            pending = pending + (_sounding(active),)
+
+    if pending is not None:
+        sonority = _sonority(pending, max(stop for stop, _, _ in active), active, min_duration)
+        if sonority is not None:
+            yield sonority
+
+
+def _sounding(active: list) -> List[Note]:
+    # ユニゾンの重複を除き、低い順（同じ高さなら音名順）に並べる
+    notes = dict.fromkeys(note for _stop, _counter, note in active)
+    return sorted(notes, key=lambda n: (n.absolute_semitone, n.step_index))
+
+
+def _sonority(pending: tuple, end: Fraction, active: list, min_duration: Fraction) -> Optional[Sonority]:
+    start, measure, key, notes = pending
+    if end - start <= 0 or end - start < min_duration * TIME_BASE:
+        return None
+    return Sonority(Fraction(start, TIME_BASE), Fraction(end, TIME_BASE), measure, notes, key)
@@ -0,0 +1,213 @@
+# utils/note_text_reader.py
+"""
+テキストの進行ファイル（1行に1ボイシング、parse_notes の "C3, E3, G3" 形式）を1行ずつ読み、
+Note.pack() 形式の整数を詰めた array('i') に変換するリーダー。
+
+    voicings = read_packed("corpus/song.txt")   # ファイル全体を1本の array('i') と行ごとの開始位置で保持
+    for notes in voicings:                      # 解析器に渡すときは1行ずつ Note のリストに戻す
+        ...
+    for line_number, codes in iter_note_arrays("corpus/song.txt"):   # 1行ずつ読む場合（1行に1つの array('i')）
+        ...
+
+- 行をカンマで区切り、各音（前後の空白を含む文字列のまま）を (ステップ番号, 変化記号, ピッチクラス, オクターブ) の表で引く。
+  表にない音だけを事前にコンパイルした正規表現で解釈して表に加えるので、同じ書き方の音が繰り返し現れる
+  コーパスでは1音あたり辞書引き1回で済む。Note は作らず、1音 4 バイトの整数として array に直接詰める
+- read_packed() はファイル全体の音を1本の array('i') に、各行の開始位置と行番号を array('q') に持つので、
+  行ごとのオブジェクトを作らない（3〜6音のボイシングで1行 35 バイト前後。Note のリストでは 110 バイト前後）。
+  iter_note_arrays() の1行1つの array('i') は array のヘッダがあるため Note のリストとほとんど変わらない
+- オクターブ省略時の規則は parse_notes と同じ（直前の音よりピッチクラスが下がったらオクターブを1つ上げる。
+  オクターブを書いた音からはそのオクターブで続ける）
+- 解釈できない行は、行番号と列番号（どちらも1始まり）と問題の音を持つ NoteTextError にする。
+  変化記号は parse_notes が区別する # / b / x / bb だけを受け付ける（parse_notes は "##" などを黙って変化記号なしとして読む）
+- 空行と # で始まるコメント行は飛ばす（analyze_corpus.py はこのリーダーで進行ファイルを読む）
+"""
+import re
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.note import ALTER_BIAS, INDEX_TO_STEP, OCTAVE_BIAS, STEP_TO_SEMITONE, Note
+
+# 1音（前後の空白を含む）: 音名・オクターブ（省略可）
+_TOKEN_PATTERN = re.compile(r"\s*([A-Ga-g](?:bb|b|#|x)?)(-?\d{1,4})?\s*")
+
+_ALTERS = {"": 0, "#": 1, "b": -1, "bb": -2, "x": 2}
+
+# 音名（大文字・小文字の両方） -> (Note.pack() の下位 8 ビット（変化記号とステップ番号）, ピッチクラス)
+_SPELLINGS = {}
+for _index, _step in enumerate(INDEX_TO_STEP):
+    for _accidental, _alter in _ALTERS.items():
+        _SPELLINGS[_step + _accidental] = _SPELLINGS[_step.lower() + _accidental] = (
+            ((_alter + ALTER_BIAS) << 3) | _index, (STEP_TO_SEMITONE[_step] + _alter) % 12)
+
+# 解釈済みの音の文字列 -> (pack() の下位 8 ビット, ピッチクラス, オクターブ（省略時は None）)
+# 空白の付き方ごとに別の要素になるので、際限なく増えないように上限を設ける
+_TOKENS: Dict[str, Tuple[int, int, Optional[int]]] = {}
+_TOKEN_LIMIT = 4096
+
+
+def _scan(piece: str) -> Optional[Tuple[int, int, Optional[int]]]:
+    """表にない音を正規表現で解釈して表に加える（解釈できなければ None）"""
+    match = _TOKEN_PATTERN.fullmatch(piece)
+    if match is None:
+        return None
+    name, octave_str = match.groups()
+    info = _SPELLINGS[name] + (int(octave_str) if octave_str else None,)
+    if len(_TOKENS) < _TOKEN_LIMIT:
+        _TOKENS[piece] = info
+    return info
+
+
+class NoteTextError(ValueError):
+    """解釈できない行。line_number と column は1始まり（行番号が分からない場合の line_number は None）"""
+
+    def __init__(self, reason: str, line_number: Optional[int], column: int, token: str):
+        self.reason = reason
+        self.line_number = line_number
+        self.column = column
+        self.token = token
+        where = f"column {column}" if line_number is None else f"line {line_number}, column {column}"
+        super().__init__(f"{where}: {reason} '{token}'")
+
+
+def _locate_error(text: str, line_number: Optional[int]) -> NoteTextError:
+    """解釈できなかった行から、最初に解釈できない音の位置を探す（エラー時だけ通る）"""
+    offset = 0
+    for piece in text.split(","):
+        token = piece.strip()
+        column = offset + len(piece) - len(piece.lstrip()) + 1
+        if not token:
+            return NoteTextError("empty note", line_number, column, token)
+        if _TOKEN_PATTERN.fullmatch(piece) is None:
+            return NoteTextError("invalid note", line_number, column, token)
+        offset += len(piece) + 1
+    # 各音は正しいが行として解釈できない場合（\s と str.strip の空白の違いなど）
+    return NoteTextError("invalid line", line_number, 1, text.strip())
+
+
+def _build(text: str, start_octave: int) -> Optional[List[int]]:
+    """行の音を順に読み、オクターブ省略時の繰り上げを適用して pack() 形式の整数のリストにする（解釈できない音があれば None）"""
+    codes: List[int] = []
+    lookup = _TOKENS.get
+    octave = start_octave
+    last_pc = -1
+    for piece in text.split(","):
+        info = lookup(piece) or _scan(piece)
+        if info is None:
+            return None
+        low, pc, written = info
+        if written is not None:
+            octave = written
+        elif pc < last_pc:
+            octave += 1
+        last_pc = pc
+        codes.append(((octave + OCTAVE_BIAS) << 8) | low)
+    return codes
+
+
+# pack() 形式の整数 -> Note（Note は共有されるので、戻すときも1音あたり辞書引き1回で済むようにする）
+_NOTES: Dict[int, Note] = {}
+_NOTE_LIMIT = 8192
+
+
+def _unpack(code: int) -> Note:
+    note = Note.unpack(code)
+    if len(_NOTES) < _NOTE_LIMIT:
+        _NOTES[code] = note
+    return note
+
+
+def unpack_voicing(codes: Iterable[int]) -> List[Note]:
+    """pack() 形式の整数の列を Note のリストに戻す"""
+    lookup = _NOTES.get
+    return [lookup(code) or _unpack(code) for code in codes]
+
+
+class PackedVoicings:
+    """
+    ファイル全体のボイシングを、全音の pack() 形式の整数を並べた1本の array('i') と、
+    各行の開始位置（offsets、末尾に全体の長さを持つので行数 + 1 個）・行番号の array('q') で保持する。
+    v[i] は i 番目のボイシングを Note のリストで返し、反復も Note のリストを順に返す（codes(i) は整数のまま）。
+    """
+    __slots__ = ("data", "offsets", "line_numbers")
+
+    def __init__(self):
+        self.data = array('i')
+        self.offsets = array('q', [0])
+        self.line_numbers = array('q')
+
+    def append(self, line_number: int, codes: Iterable[int]):
+        self.data.extend(codes)
+        self.offsets.append(len(self.data))
+        self.line_numbers.append(line_number)
+
+    def __len__(self) -> int:
+        return len(self.line_numbers)
+
+    def codes(self, index: int) -> array:
+        offsets = self.offsets
+        if index < 0:
+            index += len(self)
+        return self.data[offsets[index]:offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> List[Note]:
+        return unpack_voicing(self.codes(index))
+
+    def __iter__(self) -> Iterator[List[Note]]:
+        data, offsets = self.data, self.offsets
+        for i in range(len(self.line_numbers)):
+            yield unpack_voicing(data[offsets[i]:offsets[i + 1]])
+
+
+def parse_line(text: str, start_octave: int = 4, line_number: Optional[int] = None) -> array:
+    """1行（1ボイシング）を pack() 形式の array('i') にする。解釈できなければ NoteTextError"""
+    voicing = _build(text, start_octave)
+    if voicing is None:
+        raise _locate_error(text, line_number)
+    return array('i', voicing)
+
+
+def iter_note_arrays(source, start_octave: int = 4,
+                     errors: Optional[List[NoteTextError]] = None) -> Iterator[Tuple[int, array]]:
+    """
+    パス・テキストのファイルオブジェクト・文字列の反復可能オブジェクト（1要素1行）を1行ずつ読み、
+    (行番号, pack() 形式の array('i')) を順次 yield する。空行とコメント行は飛ばす（行番号は飛ばした行も数える）。
+    errors にリストを渡すと、解釈できない行は NoteTextError をそこに追加して読み進める（省略時は最初の1行で送出する）。
+    """
+    for line_number, codes in _iter_source(source, start_octave, errors):
+        yield line_number, array('i', codes)
+
+
+def read_packed(source, start_octave: int = 4,
+                errors: Optional[List[NoteTextError]] = None) -> PackedVoicings:
+    """iter_note_arrays() と同じ入力・同じ規則でファイル全体を読み、PackedVoicings にまとめる"""
+    voicings = PackedVoicings()
+    append = voicings.append
+    for line_number, codes in _iter_source(source, start_octave, errors):
+        append(line_number, codes)
+    return voicings
+
+
+def _iter_source(source, start_octave: int,
+                 errors: Optional[List[NoteTextError]]) -> Iterator[Tuple[int, List[int]]]:
+    if isinstance(source, str) or hasattr(source, "__fspath__"):
+        with open(source, encoding="utf-8") as f:
+            yield from _iter_lines(f, start_octave, errors)
+    else:
+        yield from _iter_lines(source, start_octave, errors)
+
+
+def _iter_lines(lines: Iterable[str], start_octave: int,
+                errors: Optional[List[NoteTextError]]) -> Iterator[Tuple[int, List[int]]]:
+    for line_number, line in enumerate(lines, 1):
+        voicing = _build(line, start_octave)
+        if voicing is None:
+            # 空行・コメント行も解釈できない行になるので、その場合だけ調べる
+            stripped = line.strip()
+            if not stripped or stripped.startswith("#"):
+                continue
+            error = _locate_error(line.rstrip("\r\n"), line_number)
+            if errors is None:
+                raise error
+            errors.append(error)
+            continue
+        yield line_number, voicing
@@ -0,0 +1,296 @@
+# utils/smf_reader.py
+"""
+Standard MIDI File（SMF, format 0/1）を外部ライブラリなしで読み、和音の区間（ChordSegment）に切り分けるリーダー。
+
+    segments = iter_chord_segments("song.mid")                 # Key は調号イベントから自動判定
+    records = ProgressionAnalyzer().iter_progression(seg.notes for seg in segments, key="C")
+
+- トラックごとのイベントをジェネレータで読み、heapq.merge で時刻順に合流させる（ファイル全体のイベント列は作らない）
+- 発音中の音を Note（KeyContext で綴る。MIDI 60 = C4）に変換し、発音開始（オンセット）が変わるたびに区間を区切る
+"""
+import heapq
+import mmap
+import os
+from typing import Iterator, List, Optional, Tuple, Union
+from models.note import Note
+from utils.formatter import MAJOR_KEYS_BY_SIGNATURE, MINOR_KEYS_BY_SIGNATURE, KeyContext
+
+# イベント種別（時刻が同じなら NOTE_OFF -> TEMPO/KEY -> NOTE_ON の順に処理する）
+NOTE_OFF = 0
+TEMPO = 1
+KEY_SIGNATURE = 2
+NOTE_ON = 3
+
+DRUM_CHANNEL = 9
+
+
+class MidiFormatError(ValueError):
+    """SMF として解釈できないデータ"""
+
+
+class ChordSegment:
+    """オンセットから次のオンセット（またはすべての音が止まるところ）までの区間と、その間に鳴っている音"""
+    __slots__ = ("start_tick", "end_tick", "start_time", "notes", "key")
+
+    def __init__(self, start_tick: int, end_tick: int, start_time: float, notes: List[Note], key: str):
+        self.start_tick = start_tick
+        self.end_tick = end_tick
+        self.start_time = start_time  # 秒
+        self.notes = notes
+        self.key = key  # 区間の開始時点で有効な調号（Key名）
+
+    def __repr__(self):
+        return f"ChordSegment({self.start_tick}-{self.end_tick}, {[str(n) for n in self.notes]})"
+
+
+def key_name_from_signature(sharps: int, minor: bool) -> str:
+    """調号（シャープなら正、フラットなら負の数）から Key名 を返す"""
+    sharps = max(-7, min(7, sharps))
+    return (MINOR_KEYS_BY_SIGNATURE if minor else MAJOR_KEYS_BY_SIGNATURE)[sharps + 7]
+
+
+def spelling_table(key_name: str) -> List[Note]:
+    """MIDI ノート番号 0〜127 を KeyContext の綴りで Note にした表"""
+    kc = KeyContext(key_name)
+    table = []
+    for number in range(128):
+        base = Note.from_string(kc.get_note_name(number % 12), default_octave=0)
+        # Cb / B# のように綴りがオクターブをまたぐ場合も、実音（MIDI 60 = C4）が一致するようにオクターブを決める
+        octave = (number - 12 - (base.absolute_semitone)) // 12
+        table.append(base.with_octave(octave))
+    return table
+
+
+class SMFReader:
+    """
+    SMF のヘッダを読み、トラックごとのイベントを時刻順に流すリーダー。
+    パス（str / PathLike）を渡した場合はファイルを mmap するので、使い終わったら close() するか with 文で使う。
+    """
+
+    def __init__(self, source: Union[str, "os.PathLike", bytes, bytearray, memoryview]):
+        self._mmap = None
+        if isinstance(source, str) or hasattr(source, "__fspath__"):
+            with open(os.fspath(source), "rb") as f:
+                try:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:  # 空ファイルは mmap できない
+                    pass
+            self.data = memoryview(self._mmap if self._mmap is not None else b"")
+        else:
+            self.data = memoryview(source)
+        try:
+            self._read_header()
+        except BaseException:
+            self.close()
+            raise
+
+    def _read_header(self):
+        data = self.data
+        if len(data) < 14 or bytes(data[0:4]) != b"MThd":
+            raise MidiFormatError("MThd header not found")
+        header_length = int.from_bytes(data[4:8], "big")
+        self.format = int.from_bytes(data[8:10], "big")
+        self.track_count = int.from_bytes(data[10:12], "big")
+        division = int.from_bytes(data[12:14], "big")
+        if division & 0x8000:
+            # SMPTE: 上位バイトが負のフレームレート、下位バイトがフレームあたりのティック数
+            fps = 256 - (division >> 8)
+            self.ticks_per_quarter = None
+            self.ticks_per_second = fps * (division & 0xFF)
+            if self.ticks_per_second <= 0:
+                raise MidiFormatError("SMPTE division has 0 ticks per frame")
+        else:
+            if division == 0:
+                raise MidiFormatError("division (ticks per quarter note) is 0")
+            self.ticks_per_quarter = division
+            self.ticks_per_second = None
+
+        # トラックチャンクの位置だけを先に集める（中身はイベントを読むときに参照する）
+        self.tracks: List[Tuple[int, int]] = []
+        pos = 8 + header_length
+        while pos + 8 <= len(data):
+            chunk_type = bytes(data[pos:pos + 4])
+            length = int.from_bytes(data[pos + 4:pos + 8], "big")
+            if chunk_type == b"MTrk":
+                self.tracks.append((pos + 8, min(pos + 8 + length, len(data))))
+            pos += 8 + length
+
+    def close(self):
+        """mmap したファイルを閉じる（バイト列から作った場合は何もしない）。何度呼んでもよい"""
+        self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> "SMFReader":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def iter_track(self, index: int) -> Iterator[Tuple[int, int, int, int, int, int]]:
+        """
+        1トラックのイベントを (絶対ティック, 種別, トラック番号, トラック内の通し番号, 値1, 値2) で順に返す。
+        タプルの並びがそのまま合流時の順序（同時刻は NOTE_OFF -> メタ -> NOTE_ON、次にトラック順）になる。
+          NOTE_ON / NOTE_OFF: 値1 = チャンネル, 値2 = ノート番号
+          TEMPO            : 値1 = 4分音符あたりのマイクロ秒
+          KEY_SIGNATURE    : 値1 = シャープ（負ならフラット）の数, 値2 = 短調なら 1
+        """
+        try:
+            yield from self._parse_track(index)
+        except IndexError:
+            raise MidiFormatError(f"track {index} is truncated") from None
+
+    def _parse_track(self, index: int):
+        data = self.data
+        pos, end = self.tracks[index]
+        tick = 0
+        status = 0
+        seq = 0
+        while pos < end:
+            # デルタタイム（可変長）
+            delta = 0
+            while True:
+                byte = data[pos]
+                pos += 1
+                delta = (delta << 7) | (byte & 0x7F)
+                if not byte & 0x80:
+                    break
+            tick += delta
+
+            byte = data[pos]
+            if byte & 0x80:
+                status = byte
+                pos += 1
+            elif not status:
+                raise MidiFormatError(f"running status without a previous status byte in track {index}")
+            # それ以外はランニングステータス（直前のステータスを使い回す）
+
+            kind = status & 0xF0
+            if kind == 0x90:
+                note, velocity = data[pos], data[pos + 1]
+                pos += 2
+                yield (tick, NOTE_ON if velocity else NOTE_OFF, index, seq, status & 0x0F, note)
+            elif kind == 0x80:
+                note = data[pos]
+                pos += 2
+                yield (tick, NOTE_OFF, index, seq, status & 0x0F, note)
+            elif kind in (0xA0, 0xB0, 0xE0):
+                pos += 2
+            elif kind in (0xC0, 0xD0):
+                pos += 1
+            elif status == 0xFF:
+                meta_type = data[pos]
+                pos += 1
+                length = 0
+                while True:
+                    byte = data[pos]
+                    pos += 1
+                    length = (length << 7) | (byte & 0x7F)
+                    if not byte & 0x80:
+                        break
+                if meta_type == 0x51 and length == 3:
+                    yield (tick, TEMPO, index, seq, int.from_bytes(data[pos:pos + 3], "big"), 0)
+                elif meta_type == 0x59 and length == 2:
+                    sharps = data[pos] - 256 if data[pos] > 127 else data[pos]
+                    yield (tick, KEY_SIGNATURE, index, seq, sharps, data[pos + 1])
+                elif meta_type == 0x2F:
+                    return
+                pos += length
+                # メタイベントはランニングステータスを解除する
+                status = 0
+            elif status in (0xF0, 0xF7):
+                length = 0
+                while True:
+                    byte = data[pos]
+                    pos += 1
+                    length = (length << 7) | (byte & 0x7F)
+                    if not byte & 0x80:
+                        break
+                pos += length
+                status = 0
+            else:
+                raise MidiFormatError(f"unknown status byte 0x{status:02X} in track {index}")
+            seq += 1
+
+    def iter_events(self) -> Iterator[Tuple[int, int, int, int, int, int]]:
+        """全トラックのイベントを iter_track と同じ形で時刻順に合流させて返す"""
+        return heapq.merge(*(self.iter_track(i) for i in range(len(self.tracks))))
+
+
+def iter_chord_segments(source: Union[str, "os.PathLike", bytes, bytearray, memoryview], key: Optional[str] = None,
+                        include_drums: bool = False) -> Iterator[ChordSegment]:
+    """
+    SMF を読み、オンセットが変わるたびに ChordSegment を順次 yield する。
+    key を省略すると調号イベント（なければ C）に従って綴り、曲中の転調にも追従する。
+    チャンネル10（ドラム）は既定で除外する。無音の区間は出力しない。
+    読み終えたとき（途中で反復をやめたときも）ファイルを閉じる。
+    """
+    with SMFReader(source) as reader:
+        yield from _iter_segments(reader, key, include_drums)
+
+
+def _iter_segments(reader: SMFReader, key: Optional[str], include_drums: bool) -> Iterator[ChordSegment]:
+    current_key = key or "C"
+    table = spelling_table(current_key)
+
+    tempo = 500000  # 4分音符あたりのマイクロ秒（SMF の既定値は 120 BPM）
+    last_tick = 0
+    seconds = 0.0
+
+    def elapsed(tick: int) -> float:
+        if reader.ticks_per_second:
+            return seconds + (tick - last_tick) / reader.ticks_per_second
+        return seconds + (tick - last_tick) * tempo / (reader.ticks_per_quarter * 1_000_000)
+
+    sounding = {}  # (チャンネル, ノート番号) -> 重ねて鳴らされている数
+    pending = None  # 閉じていない区間: (開始ティック, 開始秒, 音, Key)
+    onset_tick = None
+    tick = 0
+
+    for tick, kind, _track, _seq, a, b in reader.iter_events():
+        if onset_tick is not None and tick != onset_tick:
+            # 直前の時刻にオンセットがあった: その時刻のイベントをすべて処理した後の発音中の音で区間を開く
+            if pending is not None:
+                yield ChordSegment(pending[0], onset_tick, pending[1], pending[2], pending[3])
+            pending = _snapshot(onset_tick, elapsed(onset_tick), sounding, table, current_key)
+            onset_tick = None
+
+        if kind == NOTE_ON:
+            if a == DRUM_CHANNEL and not include_drums:
+                continue
+            sounding[(a, b)] = sounding.get((a, b), 0) + 1
+            onset_tick = tick
+        elif kind == NOTE_OFF:
+            count = sounding.get((a, b))
+            if count:
+                if count == 1:
+                    del sounding[(a, b)]
+                    if not sounding and pending is not None:
+                        # すべての音が止まった: 区間はここで終わり、次のオンセットまでは休符
+                        yield ChordSegment(pending[0], tick, pending[1], pending[2], pending[3])
+                        pending = None
+                else:
+                    sounding[(a, b)] = count - 1
+        elif kind == TEMPO:
+            seconds = elapsed(tick)
+            last_tick = tick
+            tempo = a
+        elif kind == KEY_SIGNATURE and key is None:
+            current_key = key_name_from_signature(a, bool(b))
+            table = spelling_table(current_key)
+
+    # ファイル末尾: 鳴り終わっていない区間は最後のイベントの時刻で閉じる
+    if onset_tick is not None:
+        if pending is not None:
+            yield ChordSegment(pending[0], onset_tick, pending[1], pending[2], pending[3])
+        pending = _snapshot(onset_tick, elapsed(onset_tick), sounding, table, current_key)
+    if pending is not None:
+        yield ChordSegment(pending[0], tick, pending[1], pending[2], pending[3])
+
+
+def _snapshot(tick: int, seconds: float, sounding: dict, table: List[Note], key_name: str):
+    if not sounding:
+        return None
+    numbers = sorted({number for _channel, number in sounding})
+    return (tick, seconds, [table[number] for number in numbers], key_name)